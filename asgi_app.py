@@ -0,0 +1,272 @@
+"""ASGI entry point: upstream-bound routes run on asyncio, everything else is served by the Flask app
+
+/test-isbn, /test-image-url, /add-manual-book and /save-book are handled
+here with async HTTP clients, so a slow Google Books or Notion call holds a
+socket instead of a thread. Every decision and response is built by the
+same helpers in main.py as the Flask routes use; the functions here only
+do the I/O in between, awaiting it or moving blocking work to a thread.
+
+    uvicorn asgi_app:app --host 0.0.0.0 --port 8080
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+import main
+from async_upstream import AsyncNotionScheduler, AsyncUpstreamClients
+from singleflight import AsyncSingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Connections kept per upstream; each in-flight call needs one
+ASYNC_MAX_CONNECTIONS = int(os.environ.get('ASYNC_MAX_CONNECTIONS', 200))
+# Threads serving the routes left to the Flask app, like gunicorn's --threads
+WSGI_THREADS = int(os.environ.get('GUNICORN_THREADS', 8))
+
+clients = AsyncUpstreamClients(
+    main.GOOGLE_BOOKS_API_URL,
+    main.NOTION_API_URL,
+    notion_token=main.NOTION_TOKEN,
+    max_connections=ASYNC_MAX_CONNECTIONS,
+    open_library_url=main.OPEN_LIBRARY_API_URL,
+    observer=main.observe_upstream,
+    breakers=main.circuit_breakers
+)
+# Shares the Flask side's token bucket, so both modes together respect Notion's limit
+notion_api = AsyncNotionScheduler(main.notion_api, clients.notion)
+
+book_lookup_flights = AsyncSingleFlight()
+image_check_flights = AsyncSingleFlight()
+
+
+class ThreadPoolWsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi running each request on a thread pool
+
+    asgiref's adapter runs every WSGI request on one shared thread, so a long
+    /sync or streamed /bulk-import would hold up /health and the home page.
+    """
+
+    def __init__(self, wsgi_application, threads):
+        super().__init__(wsgi_application)
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        await ThreadPoolWsgiToAsgiInstance(self.wsgi_application, self.executor)(scope, receive, send)
+
+
+class ThreadPoolWsgiToAsgiInstance(WsgiToAsgiInstance):
+    def __init__(self, wsgi_application, executor):
+        super().__init__(wsgi_application)
+        self.executor = executor
+
+    async def run_wsgi_app(self, body):
+        # The base class wraps it in sync_to_async(thread_sensitive=True); run the plain function instead
+        run = WsgiToAsgiInstance.__dict__['run_wsgi_app'].func
+        await sync_to_async(run, thread_sensitive=False, executor=self.executor)(self, body)
+
+
+flask_app = ThreadPoolWsgiToAsgi(main.app, WSGI_THREADS)
+
+
+async def lookup_book(isbn, bypass_cache=False):
+    """main.lookup_book() with the providers called on the event loop"""
+    if not bypass_cache:
+        # A cache read also updates last_access and commits under the cache lock; keep it off the event loop
+        hit, cached_book = await asyncio.to_thread(main.cached_lookup, isbn)
+        if hit:
+            return cached_book, True
+
+    try:
+        return await book_lookup_flights.do(isbn, fetch_and_cache_book, isbn), False
+    except Exception as e:
+        return await asyncio.to_thread(main.stale_book_or_raise, isbn, e), True
+
+
+async def fetch_and_cache_book(isbn):
+    book_data = await main.book_lookup_engine.lookup_async(isbn, clients.provider_clients())
+    # SQLite writes can wait on the WAL lock; keep them off the event loop
+    return await asyncio.to_thread(main.cache_fetched_book, isbn, book_data)
+
+
+async def check_image_url(url):
+    """main.check_image_url(), sharing its validation cache"""
+    url, cached = main.cached_image_check(url)
+    if cached is not None:
+        return cached
+
+    return await image_check_flights.do(url, probe_image_url, url)
+
+
+async def probe_image_url(url):
+    try:
+        response = await clients.images.head(url, timeout=5)
+    except Exception as e:
+        return main.image_check_failed(url, e)
+    return main.remember_image_check(url, *main.classify_image_response(url, response))
+
+
+async def resolve_cover(book_data):
+    """main.resolve_cover() with the candidates probed as tasks"""
+    probe = main.CoverProbe(book_data)
+    if not probe.needed:
+        return probe.choice
+
+    # Probes left running past the budget still fill the validation cache
+    tasks = {asyncio.ensure_future(check_image_url(url)): rank for rank, url in enumerate(probe.candidates)}
+    pending = set(tasks)
+    while pending and not probe.best and probe.remaining() > 0:
+        done, pending = await asyncio.wait(pending, timeout=probe.remaining(), return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            probe.record(tasks[task], *task.result())
+
+    return probe.settle(probes_pending=bool(pending))
+
+
+async def prepare_notion_page(book_data):
+    """main.prepare_notion_page(); the cover store and schema fetch are blocking, so they run in threads"""
+    cover_url, mirrored_url = await asyncio.to_thread(main.find_mirrored_cover, book_data)
+    if not cover_url:
+        cover_url = await resolve_cover(book_data)
+        mirrored_url = await asyncio.to_thread(main.mirror_cover, cover_url)
+    if main.NOTION_SCHEMA_ENABLED and not main.notion_schema.is_fresh():
+        await asyncio.to_thread(main.notion_schema.refresh)
+    return main.notion_page_payload(book_data, cover_url, mirrored_url)
+
+
+async def add_book_to_notion(book_data, skip_duplicates=False):
+    """main.add_book_to_notion() with the cover probes and page creation on the event loop"""
+    skip, result = main.skipped_notion_save(book_data, skip_duplicates)
+    if skip:
+        return result
+
+    try:
+        payload = await prepare_notion_page(book_data)
+        response = await notion_api.post(f"{clients.notion_url}/pages", json=payload, timeout=15)
+        notion_page, _ = main.notion_page_result(book_data, response)
+        return notion_page
+    except Exception as e:
+        logger.error(f"Notion error: {str(e)}")
+        return None
+
+
+async def isbn_lookup_response(isbn, options):
+    """main.isbn_lookup_response()"""
+    isbn, error = main.canonical_lookup_isbn(isbn)
+    if error:
+        return error
+
+    book, from_cache = await lookup_book(isbn, bypass_cache=options.get('bypass_cache', False))
+
+    book_data, skip_duplicates, response = main.lookup_response(book, isbn, from_cache, options)
+    if response is None:
+        main.record_lookup_save(book_data, await add_book_to_notion(book_data, skip_duplicates=skip_duplicates))
+        response = book_data
+    return response
+
+
+async def test_isbn(data):
+    isbn = data.get('isbn', '').strip()
+    if not isbn:
+        return {'success': False, 'error': 'ISBN required'}
+    return await isbn_lookup_response(isbn, data)
+
+
+async def add_manual_book(data):
+    book_data, skip_duplicates, response = main.manual_book_request(data)
+    if response is None:
+        notion_result = await add_book_to_notion(book_data, skip_duplicates=skip_duplicates)
+        response = main.manual_book_response(book_data, notion_result)
+    return response
+
+
+async def save_book(data):
+    book_data, skip_duplicates, response = main.save_book_request(data)
+    if response is None:
+        notion_result = await add_book_to_notion(book_data, skip_duplicates=skip_duplicates)
+        main.record_saved_lookup(book_data, notion_result, data['lookup_token'])
+        response = book_data
+    return response
+
+
+async def test_image_url(data):
+    url = data.get('url')
+    if not url:
+        return {'success': False, 'error': 'URL required'}
+    validated_url, reason = await check_image_url(url)
+    return main.image_check_response(url, validated_url, reason)
+
+
+ASYNC_ROUTES = {
+    '/test-isbn': test_isbn,
+    '/test-image-url': test_image_url,
+    '/add-manual-book': add_manual_book,
+    '/save-book': save_book
+}
+
+
+async def read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+async def send_json(send, payload, status=200):
+    body = json.dumps(payload).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def handle_async_route(path, handler, receive, send):
+    """Run a JSON route, with the same error contract and metrics as the Flask routes"""
+    started = time.monotonic()
+    main.http_in_flight.inc()
+    try:
+        try:
+            data = json.loads(await read_body(receive) or b'null')
+            if not isinstance(data, dict):
+                raise ValueError('Request body must be a JSON object')
+            result = await handler(data)
+        except Exception as e:
+            logger.error(f"Error handling {path}: {str(e)}")
+            result = {'success': False, 'error': str(e)}
+        await send_json(send, result)
+    finally:
+        main.http_in_flight.dec()
+        main.http_requests.inc(route=path, method='POST', status=200)
+        main.http_request_duration.observe(time.monotonic() - started, route=path, method='POST')
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await clients.aclose()
+            flask_app.executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+
+    handler = ASYNC_ROUTES.get(scope.get('path'))
+    if scope['type'] == 'http' and scope['method'] == 'POST' and handler is not None:
+        return await handle_async_route(scope['path'], handler, receive, send)
+
+    return await flask_app(scope, receive, send)
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import time
+
+import httpx
+
+from circuit_breaker import is_failure
+from notion_scheduler import SchedulerFull
+from upstream import NOTION_VERSION, upstream_breaker
+
+logger = logging.getLogger(__name__)
+
+
+class ObservedTransport(httpx.AsyncBaseTransport):
+    """Async transport that reports each call and guards it with a circuit breaker, like upstream.ObservedAdapter"""
+
+    def __init__(self, name, observer, transport, breakers=None, per_host=False):
+        self.name = name
+        self.observer = observer
+        self.transport = transport
+        self.breakers = breakers
+        self.per_host = per_host
+
+    async def handle_async_request(self, request):
+        breaker = upstream_breaker(self.breakers, self.name, str(request.url), self.per_host)
+        if breaker is not None:
+            breaker.before_call()
+
+        started = time.monotonic()
+        status = 'error'
+        try:
+            response = await self.transport.handle_async_request(request)
+            status = response.status_code
+            return response
+        finally:
+            if breaker is not None:
+                if status == 'error' or is_failure(status):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            if self.observer is not None:
+                try:
+                    self.observer(self.name, time.monotonic() - started, status)
+                except Exception as e:
+                    logger.warning(f"Upstream observer failed: {e}")
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+def create_async_client(max_connections, headers=None, name=None, observer=None, breakers=None, per_host=False):
+    """Create an httpx.AsyncClient with a keep-alive pool of up to ``max_connections`` per client"""
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    transport = httpx.AsyncHTTPTransport(limits=limits)
+    if observer is not None or breakers is not None:
+        transport = ObservedTransport(name, observer, transport, breakers, per_host)
+    return httpx.AsyncClient(transport=transport, headers=headers, follow_redirects=True)
+
+
+class AsyncUpstreamClients:
+    """Async counterparts of UpstreamClients' sessions, for the ASGI serving mode
+
+    Each client multiplexes many in-flight calls over its pool on one event
+    loop, so slow upstreams tie up sockets rather than threads.
+    """
+
+    def __init__(self, google_books_url, notion_url, notion_token='', max_connections=200,
+                 open_library_url='https://openlibrary.org', observer=None, breakers=None):
+        self.google_books_url = google_books_url.rstrip('/')
+        self.open_library_url = open_library_url.rstrip('/')
+        self.notion_url = notion_url.rstrip('/')
+
+        self.google_books = create_async_client(max_connections, name='google_books', observer=observer,
+                                                breakers=breakers)
+        self.open_library = create_async_client(max_connections, name='open_library', observer=observer,
+                                                breakers=breakers)
+        self.notion = create_async_client(max_connections, headers={
+            'Authorization': f'Bearer {notion_token}',
+            'Content-Type': 'application/json',
+            'Notion-Version': NOTION_VERSION
+        }, name='notion', observer=observer, breakers=breakers)
+        self.images = create_async_client(max_connections, name='images', observer=observer,
+                                          breakers=breakers, per_host=True)
+
+    def provider_clients(self):
+        """Clients keyed by book provider name, for HedgedLookup.lookup_async()"""
+        return {'google': self.google_books, 'openlibrary': self.open_library}
+
+    async def aclose(self):
+        for client in [self.google_books, self.open_library, self.notion, self.images]:
+            await client.aclose()
+
+
+class AsyncNotionScheduler:
+    """Async front end to a NotionScheduler
+
+    Waits for tokens with asyncio.sleep instead of blocking a thread, but
+    shares the scheduler's token bucket, 429 pause and stats, so sync and
+    async callers together stay under Notion's rate limit.
+    """
+
+    def __init__(self, scheduler, client):
+        self.scheduler = scheduler
+        self.client = client
+
+    async def request(self, method, url, **kwargs):
+        """Send a request through the shared rate limiter, retrying on HTTP 429"""
+        attempt = 0
+        while True:
+            await self._acquire()
+            response = await self.client.request(method, url, **kwargs)
+            if response.status_code != 429 or attempt >= self.scheduler.max_retries:
+                return response
+
+            attempt += 1
+            self.scheduler.rate_limited(response, attempt)
+
+    async def get(self, url, **kwargs):
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request('POST', url, **kwargs)
+
+    async def patch(self, url, **kwargs):
+        return await self.request('PATCH', url, **kwargs)
+
+    async def _acquire(self):
+        start = time.monotonic()
+        self.scheduler.begin_wait()
+        acquired = False
+        try:
+            while True:
+                delay = self.scheduler.try_acquire()
+                if not delay:
+                    acquired = True
+                    return
+                waited = time.monotonic() - start
+                if waited + delay > self.scheduler.max_wait:
+                    raise SchedulerFull(f"Timed out after {waited:.1f}s waiting for a Notion slot")
+                await asyncio.sleep(delay)
+        finally:
+            self.scheduler.end_wait(time.monotonic() - start, acquired)
@@ -0,0 +1,156 @@
+import io
+import logging
+from collections import Counter
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Run widths (space, bar, space, bar) of the EAN "L" digit codes; "G" codes are
+# the same widths reversed, and right-hand "R" codes match "L" starting with a bar
+L_WIDTHS = np.array([
+    [3, 2, 1, 1], [2, 2, 2, 1], [2, 1, 2, 2], [1, 4, 1, 1], [1, 1, 3, 2],
+    [1, 2, 3, 1], [1, 1, 1, 4], [1, 3, 1, 2], [1, 2, 1, 3], [3, 1, 1, 2]
+], dtype=float)
+G_WIDTHS = L_WIDTHS[:, ::-1]
+LEFT_PATTERNS = np.concatenate([L_WIDTHS, G_WIDTHS])  # indices 0-9 are L, 10-19 are G
+
+# Parity of the six left-hand digits (True = G code) encodes the first digit
+FIRST_DIGIT_PARITY = {
+    (False, False, False, False, False, False): 0,
+    (False, False, True, False, True, True): 1,
+    (False, False, True, True, False, True): 2,
+    (False, False, True, True, True, False): 3,
+    (False, True, False, False, True, True): 4,
+    (False, True, True, False, False, True): 5,
+    (False, True, True, True, False, False): 6,
+    (False, True, False, True, False, True): 7,
+    (False, True, False, True, True, False): 8,
+    (False, True, True, False, True, False): 9
+}
+
+# An EAN-13 symbol is 59 runs: 3 guard + 24 left + 5 middle + 24 right + 3 guard
+SYMBOL_RUNS = 59
+GUARD_RUNS = np.array([0, 1, 2, 27, 28, 29, 30, 31, 56, 57, 58])
+GUARD_BARS = np.array([0, 2, 28, 30, 56, 58])
+GUARD_SPACES = np.array([1, 27, 29, 31, 57])
+# Runs alternate bar/space from the first guard bar
+BAR_SIGN = np.where(np.arange(SYMBOL_RUNS) % 2 == 0, 1.0, -1.0)
+LEFT_RUNS = np.arange(3, 27).reshape(6, 4)
+RIGHT_RUNS = np.arange(32, 56).reshape(6, 4)
+
+MAX_DIMENSION = 1600
+SCANLINES = 40
+MAX_DIGIT_ERROR = 1.6
+MIN_CONTRAST = 40
+
+
+def ean13_checksum_ok(code):
+    digits = [int(c) for c in code]
+    total = sum(digits[i] * (3 if i % 2 else 1) for i in range(12))
+    return (10 - total % 10) % 10 == digits[12]
+
+
+def load_grayscale(image_bytes):
+    """Decode a JPEG/PNG into a float grayscale array, downscaled to a workable size"""
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        image = ImageOps.exif_transpose(image).convert('L')
+    except Exception as e:
+        raise ValueError(f"Could not read image: {str(e)}")
+    image.thumbnail((MAX_DIMENSION, MAX_DIMENSION))
+    return np.asarray(image, dtype=np.float32)
+
+
+def binarize(rows):
+    """Threshold scanlines midway between the local light and dark levels; True marks bars
+
+    Low-contrast stretches (blank paper, flat backgrounds) are treated as light.
+    """
+    window = max(15, rows.shape[1] // 12) | 1
+    # Light smoothing suppresses single-pixel sensor and JPEG noise
+    smoothed = (rows + np.roll(rows, 1, axis=1) + np.roll(rows, -1, axis=1)) / 3
+    padded = np.pad(smoothed, ((0, 0), (window // 2, window // 2)), mode='edge')
+    neighbourhood = sliding_window_view(padded, window, axis=1)
+    local_max = neighbourhood.max(axis=-1)
+    local_min = neighbourhood.min(axis=-1)
+    return (smoothed < (local_max + local_min) / 2) & (local_max - local_min > MIN_CONTRAST)
+
+
+def run_lengths(bits):
+    """Run widths and colours (True = bar) of a binarized scanline"""
+    changes = np.flatnonzero(bits[1:] != bits[:-1]) + 1
+    starts = np.concatenate(([0], changes))
+    widths = np.diff(np.concatenate((starts, [bits.size])))
+    return widths.astype(float), bits[starts]
+
+
+def match_digits(groups, patterns):
+    """Nearest pattern index and error for each 4-run group, after scaling to 7 modules"""
+    normalized = groups * (7.0 / groups.sum(axis=-1, keepdims=True))
+    errors = np.abs(normalized[..., None, :] - patterns).sum(axis=-1)
+    best = errors.argmin(axis=-1)
+    return best, np.take_along_axis(errors, best[..., None], axis=-1)[..., 0]
+
+
+def decode_runs(widths, colors):
+    """Find EAN-13 codes in one scanline's runs, checking all 59-run windows at once"""
+    if widths.size < SYMBOL_RUNS:
+        return []
+
+    windows = sliding_window_view(widths, SYMBOL_RUNS)
+    starts_dark = colors[:windows.shape[0]]
+    module = windows.sum(axis=1) / 95.0
+
+    # Ink spread and blur widen bars at the expense of spaces; the one-module
+    # guard bars and spaces show by how much, so undo it before matching
+    spread = (windows[:, GUARD_BARS].mean(axis=1) - windows[:, GUARD_SPACES].mean(axis=1)) / 2
+    windows = np.maximum(windows - spread[:, None] * BAR_SIGN, 0.1)
+
+    # Guard bars must each be about one module wide
+    guard_ratio = windows[:, GUARD_RUNS] / module[:, None]
+    candidates = np.flatnonzero(starts_dark & np.all(np.abs(guard_ratio - 1) < 0.6, axis=1))
+    if candidates.size == 0:
+        return []
+
+    windows = windows[candidates]
+    left, left_errors = match_digits(windows[:, LEFT_RUNS], LEFT_PATTERNS)
+    right, right_errors = match_digits(windows[:, RIGHT_RUNS], L_WIDTHS)
+    ok = np.all(left_errors < MAX_DIGIT_ERROR, axis=1) & np.all(right_errors < MAX_DIGIT_ERROR, axis=1)
+
+    codes = []
+    for row in np.flatnonzero(ok):
+        parity = tuple(bool(p) for p in left[row] >= 10)
+        first = FIRST_DIGIT_PARITY.get(parity)
+        if first is None:
+            continue
+        code = str(first) + ''.join(str(d % 10) for d in left[row]) + ''.join(str(d) for d in right[row])
+        if ean13_checksum_ok(code):
+            codes.append(code)
+    return codes
+
+
+def decode_ean13(image_bytes):
+    """Decode an EAN-13 barcode from a photo, returning the 13-digit code or None
+
+    Scanlines are taken across the image in both orientations and read in
+    both directions; the code read most often wins.
+    """
+    gray = load_grayscale(image_bytes)
+    votes = Counter()
+
+    for plane in (gray, gray.T):
+        height = plane.shape[0]
+        rows = np.linspace(height * 0.1, height * 0.9, SCANLINES).astype(int)
+        bits = binarize(plane[rows])
+        for line in np.concatenate((bits, bits[:, ::-1])):
+            widths, colors = run_lengths(line)
+            votes.update(decode_runs(widths, colors))
+
+    if not votes:
+        return None
+    code, count = votes.most_common(1)[0]
+    logger.info(f"Decoded barcode {code} from {count} scanlines")
+    return code
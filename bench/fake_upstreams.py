@@ -0,0 +1,279 @@
+"""Local stand-ins for Google Books, Open Library, Notion and cover image hosts
+
+Everything is served from one threaded HTTP server under different path
+prefixes, so the app can be pointed at it with the usual *_URL variables:
+
+    GOOGLE_BOOKS_API_URL=http://127.0.0.1:PORT/books/v1
+    OPEN_LIBRARY_API_URL=http://127.0.0.1:PORT/openlibrary
+    OPEN_LIBRARY_COVERS_URL=http://127.0.0.1:PORT/covers/isbn
+    NOTION_API_URL=http://127.0.0.1:PORT/notion/v1
+"""
+import argparse
+import json
+import logging
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+# Cover checks only look at the status and Content-Type, so any JPEG-ish bytes will do
+TINY_JPEG = b'\xff\xd8\xff\xe0' + b'\x00' * 60 + b'\xff\xd9'
+
+# The library database's columns, as returned by GET /databases/{id}
+NOTION_DATABASE_PROPERTIES = {
+    name: {'id': name, 'name': name, 'type': prop_type}
+    for name, prop_type in [('BookName', 'title'), ('ISBN', 'rich_text'), ('Author', 'rich_text'),
+                            ('Publisher', 'rich_text'), ('Page Count', 'number'), ('Cover image', 'url'),
+                            ('Cover PNG', 'files'), ('Published Date', 'date'), ('Descriptions', 'rich_text'),
+                            ('Category', 'rich_text')]
+}
+
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    """Threaded server that doesn't print tracebacks when a client hangs up"""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+class UpstreamBehavior:
+    """Latency, failure and rate-limit settings for one fake upstream"""
+
+    def __init__(self, latency=0.05, jitter=0.02, error_rate=0.0, not_found_rate=0.0,
+                 rate_limit=0.0, retry_after=1.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.not_found_rate = not_found_rate
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._tokens = max(rate_limit, 1.0)
+        self._last = time.monotonic()
+
+    def delay(self, rng):
+        time.sleep(max(0.0, self.latency + rng.uniform(-self.jitter, self.jitter)))
+
+    def take_token(self):
+        """Token bucket like Notion's ~3 requests/second; False means answer 429"""
+        if self.rate_limit <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(max(self.rate_limit, 1.0), self._tokens + (now - self._last) * self.rate_limit)
+            self._last = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+class FakeUpstreams:
+    """Threaded HTTP server answering like the real upstreams, with configurable behavior"""
+
+    def __init__(self, host='127.0.0.1', port=0, google=None, openlibrary=None, notion=None,
+                 images=None, seed=1):
+        self.behaviors = {
+            'google': google or UpstreamBehavior(),
+            'openlibrary': openlibrary or UpstreamBehavior(not_found_rate=1.0),
+            'notion': notion or UpstreamBehavior(latency=0.15, rate_limit=3.0),
+            'images': images or UpstreamBehavior(latency=0.02)
+        }
+        self.counts = {}
+        self._counts_lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.server = QuietHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def env(self):
+        """Environment variables pointing the app at these stand-ins"""
+        return {
+            'GOOGLE_BOOKS_API_URL': f'{self.url}/books/v1',
+            'OPEN_LIBRARY_API_URL': f'{self.url}/openlibrary',
+            'OPEN_LIBRARY_COVERS_URL': f'{self.url}/covers/isbn',
+            'NOTION_API_URL': f'{self.url}/notion/v1'
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Fake upstreams listening on {self.url}")
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, upstream, outcome):
+        with self._counts_lock:
+            key = f'{upstream}:{outcome}'
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def roll(self):
+        with self._rng_lock:
+            return self._rng.random()
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def send_json(self, status, payload, headers=None):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def read_body(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                return json.loads(self.rfile.read(length) or b'{}') if length else {}
+
+            def route(self):
+                path = urlparse(self.path).path
+                for prefix, upstream in [('/books/v1', 'google'), ('/openlibrary', 'openlibrary'),
+                                         ('/notion/v1', 'notion'), ('/covers', 'images')]:
+                    if path.startswith(prefix):
+                        return upstream, path[len(prefix):]
+                return None, path
+
+            def handle_any(self, method):
+                upstream, path = self.route()
+                if upstream is None:
+                    return self.send_json(404, {'error': 'unknown path'})
+                if method == 'POST':
+                    payload = self.read_body()
+                else:
+                    payload = None
+
+                behavior = fake.behaviors[upstream]
+                behavior.delay(fake._rng)
+
+                if not behavior.take_token():
+                    fake.count(upstream, '429')
+                    return self.send_json(429, {'object': 'error', 'code': 'rate_limited'},
+                                          headers={'Retry-After': str(behavior.retry_after)})
+                if fake.roll() < behavior.error_rate:
+                    fake.count(upstream, '503')
+                    return self.send_json(503, {'error': 'injected failure'})
+
+                fake.count(upstream, 'ok')
+                getattr(self, f'answer_{upstream}')(method, path, payload, behavior)
+
+            def answer_google(self, method, path, payload, behavior):
+                query = parse_qs(urlparse(self.path).query).get('q', [''])[0]
+                isbn = query.split(':', 1)[-1]
+                if fake.roll() < behavior.not_found_rate:
+                    return self.send_json(200, {'kind': 'books#volumes', 'totalItems': 0})
+                covers = f'{fake.url}/covers/google/{isbn}'
+                self.send_json(200, {'kind': 'books#volumes', 'totalItems': 1, 'items': [{'volumeInfo': {
+                    'title': f'Benchmark Book {isbn}',
+                    'authors': ['Ada Author', 'Bob Writer'],
+                    'publisher': 'Fake Press',
+                    'publishedDate': '2020-05-17',
+                    'pageCount': 321,
+                    'categories': ['Fiction'],
+                    'description': 'A book served by the benchmark stand-in. ' * 20,
+                    'language': 'en',
+                    'imageLinks': {
+                        'large': f'{covers}-L.jpg',
+                        'thumbnail': f'{covers}-M.jpg',
+                        'smallThumbnail': f'{covers}-S.jpg'
+                    }
+                }}]})
+
+            def answer_openlibrary(self, method, path, payload, behavior):
+                bibkeys = parse_qs(urlparse(self.path).query).get('bibkeys', [''])[0]
+                if fake.roll() < behavior.not_found_rate:
+                    return self.send_json(200, {})
+                self.send_json(200, {bibkeys: {
+                    'title': f'Open Library Book {bibkeys}',
+                    'authors': [{'name': 'Ada Author'}],
+                    'publishers': [{'name': 'Fake Press'}],
+                    'publish_date': 'May 17, 2020',
+                    'number_of_pages': 321
+                }})
+
+            def answer_notion(self, method, path, payload, behavior):
+                if method == 'POST' and path == '/pages':
+                    return self.send_json(200, {'object': 'page', 'id': str(uuid.uuid4())})
+                if method == 'POST' and path.endswith('/query'):
+                    return self.send_json(200, {'object': 'list', 'results': [], 'has_more': False,
+                                                'next_cursor': None})
+                if method == 'GET' and path.startswith('/databases/'):
+                    return self.send_json(200, {'object': 'database', 'id': path.rsplit('/', 1)[-1],
+                                                'properties': NOTION_DATABASE_PROPERTIES})
+                self.send_json(404, {'object': 'error', 'code': 'object_not_found'})
+
+            def answer_images(self, method, path, payload, behavior):
+                if fake.roll() < behavior.not_found_rate:
+                    return self.send_json(404, {'error': 'no cover'})
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/jpeg')
+                self.send_header('Content-Length', str(len(TINY_JPEG)))
+                self.end_headers()
+                if method == 'GET':
+                    self.wfile.write(TINY_JPEG)
+
+            def do_GET(self):
+                self.handle_any('GET')
+
+            def do_HEAD(self):
+                self.handle_any('HEAD')
+
+            def do_POST(self):
+                self.handle_any('POST')
+
+            def do_PATCH(self):
+                self.handle_any('PATCH')
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the fake upstreams on their own')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency', type=float, default=0.05, help='Google Books latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of Google Books calls failing with 503')
+    parser.add_argument('--notion-latency', type=float, default=0.15)
+    parser.add_argument('--notion-rate-limit', type=float, default=3.0, help='Notion requests/second before 429 (0 = unlimited)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    fake = FakeUpstreams(
+        port=args.port,
+        google=UpstreamBehavior(latency=args.latency, error_rate=args.error_rate),
+        notion=UpstreamBehavior(latency=args.notion_latency, rate_limit=args.notion_rate_limit)
+    )
+    for name, value in fake.env().items():
+        print(f'{name}={value}')
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
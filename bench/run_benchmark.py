@@ -0,0 +1,392 @@
+"""Load-test the app against local upstream stand-ins and record latency percentiles
+
+Starts bench/fake_upstreams.py in-process, launches the app (gunicorn if
+installed, otherwise the Flask server; --server uvicorn for the ASGI mode)
+pointed at it, drives the chosen scenarios at a fixed concurrency and
+writes the results as JSON:
+
+    python bench/run_benchmark.py --requests 200 --concurrency 8 --output results.json
+    python bench/run_benchmark.py --compare results.json
+
+Nothing leaves the machine: every upstream URL points at the stand-ins.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from book_cache import BookCache  # noqa: E402
+from book_providers import empty_book  # noqa: E402
+from fake_upstreams import FakeUpstreams, UpstreamBehavior  # noqa: E402
+from isbn import isbn13_check_digit  # noqa: E402
+from metrics import percentile  # noqa: E402
+
+logger = logging.getLogger('benchmark')
+
+SCENARIOS = ['lookup', 'lookup_cached', 'manual', 'lookup_and_save', 'save_async', 'lookup_outage',
+             'fallback_routes']
+
+# Scenarios whose saves probe covers, so the image stand-in must see traffic
+COVER_SCENARIOS = {'lookup_and_save', 'save_async', 'fallback_routes'}
+
+# ISBNs per /sync batch in the fallback_routes scenario
+FALLBACK_BATCH_SIZE = 4
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def make_isbns(count, seed):
+    """Distinct valid ISBN-13s, reproducible for a given seed"""
+    rng = random.Random(seed)
+    isbns = set()
+    while len(isbns) < count:
+        first12 = '978' + ''.join(rng.choice('0123456789') for _ in range(9))
+        isbns.add(first12 + isbn13_check_digit(first12))
+    return sorted(isbns)
+
+
+def summarize(name, latencies, failures, elapsed, concurrency):
+    latencies = sorted(latencies)
+    total = len(latencies) + failures
+
+    def ms(value):
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        'scenario': name,
+        'requests': total,
+        'failures': failures,
+        'concurrency': concurrency,
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput_rps': round(total / elapsed, 2) if elapsed else None,
+        'latency_ms': {
+            'p50': ms(percentile(latencies, 50)),
+            'p95': ms(percentile(latencies, 95)),
+            'p99': ms(percentile(latencies, 99)),
+            'mean': ms(sum(latencies) / len(latencies)) if latencies else None,
+            'max': ms(latencies[-1]) if latencies else None
+        }
+    }
+
+
+class AppProcess:
+    """The app under test, running in a subprocess with benchmark settings"""
+
+    def __init__(self, env, server='auto', threads=8):
+        self.port = free_port()
+        self.url = f'http://127.0.0.1:{self.port}'
+        self.env = dict(os.environ, **env, PORT=str(self.port), GUNICORN_THREADS=str(threads))
+        if server == 'auto':
+            server = 'gunicorn' if shutil.which('gunicorn') else 'flask'
+        self.server = server
+        self.threads = threads
+        self.process = None
+
+    def start(self, timeout=30):
+        if self.server == 'gunicorn':
+            command = ['gunicorn', '--bind', f'127.0.0.1:{self.port}', '--workers', '1',
+                       '--threads', str(self.threads), '--timeout', '0', 'main:app']
+        elif self.server == 'uvicorn':
+            command = [sys.executable, '-m', 'uvicorn', 'asgi_app:app', '--host', '127.0.0.1',
+                       '--port', str(self.port), '--no-access-log']
+        else:
+            command = [sys.executable, 'main.py']
+        self.log = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(command, cwd=REPO_DIR, env=self.env,
+                                        stdout=self.log, stderr=subprocess.STDOUT)
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"App exited during startup:\n{self.output()}")
+            try:
+                if requests.get(f'{self.url}/health', timeout=1).ok:
+                    logger.info(f"App ({self.server}) is up on {self.url}")
+                    return self
+            except requests.RequestException:
+                time.sleep(0.2)
+        raise RuntimeError(f"App did not become healthy within {timeout}s:\n{self.output()}")
+
+    def output(self):
+        self.log.seek(0)
+        return self.log.read().decode(errors='replace')[-4000:]
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+class Scenario:
+    """Drives one request flow; run() returns (ok, seconds) for a single iteration"""
+
+    def __init__(self, name, base_url, isbns):
+        self.name = name
+        self.base_url = base_url
+        self.isbns = isbns
+        self._local = threading.local()
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def next_isbn(self):
+        with self._lock:
+            isbn = self.isbns[self._counter % len(self.isbns)]
+            self._counter += 1
+            return isbn
+
+    def post(self, path, payload):
+        response = self.session.post(f'{self.base_url}{path}', json=payload, timeout=120)
+        response.raise_for_status()
+        return response.json()
+
+    def run(self):
+        started = time.monotonic()
+        try:
+            ok = getattr(self, f'run_{self.name}')()
+        except (requests.RequestException, ValueError) as e:
+            logger.debug(f"{self.name} request failed: {e}")
+            ok = False
+        return ok, time.monotonic() - started
+
+    def run_lookup(self):
+        return self.post('/test-isbn', {'isbn': self.next_isbn(), 'bypass_cache': True}).get('success', False)
+
+    def run_lookup_cached(self):
+        return self.post('/test-isbn', {'isbn': self.isbns[0]}).get('success', False)
+
+    def run_manual(self):
+        isbn = self.next_isbn()
+        return self.post('/add-manual-book', {
+            'title': f'Manual Benchmark Book {isbn}',
+            'author': 'Ada Author',
+            'isbn': isbn,
+            'publisher': 'Fake Press',
+            'published_date': '2020-05-17',
+            'page_count': 321
+        }).get('success', False)
+
+    def run_lookup_and_save(self):
+        book = self.post('/test-isbn', {'isbn': self.next_isbn(), 'bypass_cache': True})
+        if not book.get('lookup_token'):
+            return False
+        return self.post('/save-book', {'lookup_token': book['lookup_token']}).get('saved_to_notion', False)
+
+    def run_lookup_outage(self):
+        # Only a lookup answered from the expired cache entry counts (see upstream_outage)
+        result = self.post('/test-isbn', {'isbn': self.next_isbn()})
+        return result.get('success', False) and result.get('from_cache', False)
+
+    def run_fallback_routes(self):
+        # /health has to answer while a /sync batch is still running; in ASGI mode both go through the WSGI fallback
+        # Fresh ids, since /sync answers a repeated id from its remembered result
+        items = [{'id': uuid.uuid4().hex, 'isbn': self.next_isbn()} for _ in range(FALLBACK_BATCH_SIZE)]
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            batch = executor.submit(self.post, '/sync', {'items': items, 'skip_duplicates': False})
+            time.sleep(0.1)
+            health = self.session.get(f'{self.base_url}/health', timeout=120)
+            answered_during_batch = not batch.done()
+            synced = batch.result().get('success', False)
+        return health.ok and answered_during_batch and synced
+
+    def run_save_async(self):
+        result = self.post('/test-isbn', {'isbn': self.next_isbn(), 'bypass_cache': True,
+                                          'save_to_notion': True, 'async': True})
+        return bool(result.get('job_id'))
+
+
+@contextmanager
+def upstream_outage(fake, cache_path, isbns):
+    """Google Books failing every call, with an expired cache entry for each of ``isbns``
+
+    Open Library still answers "not found", so a lookup succeeds only if the
+    app falls back to the stale entry once Google's circuit breaker opens,
+    rather than caching the miss.
+    """
+    cache = BookCache(cache_path, ttl=-3600)
+    for isbn in isbns:
+        book = empty_book(isbn)
+        book['title'] = f'Cached Book {isbn}'
+        cache.set(isbn, book)
+
+    google = fake.behaviors['google']
+    error_rate, google.error_rate = google.error_rate, 1.0
+    try:
+        yield
+    finally:
+        google.error_rate = error_rate
+
+
+def run_scenario(name, base_url, isbns, total, concurrency):
+    scenario = Scenario(name, base_url, isbns)
+    latencies, failures = [], 0
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for ok, seconds in executor.map(lambda _: scenario.run(), range(total)):
+            if ok:
+                latencies.append(seconds)
+            else:
+                failures += 1
+    result = summarize(name, latencies, failures, time.monotonic() - started, concurrency)
+    logger.info(f"{name}: {result['throughput_rps']} req/s, p50 {result['latency_ms']['p50']} ms, "
+                f"p95 {result['latency_ms']['p95']} ms, p99 {result['latency_ms']['p99']} ms, "
+                f"{failures} failed")
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, current):
+    """Print per-scenario throughput and p95 changes against a previous results file"""
+    previous = {result['scenario']: result for result in baseline.get('results', [])}
+    for result in current['results']:
+        before = previous.get(result['scenario'])
+        if not before:
+            continue
+        for label, old, new in [
+            ('throughput', before['throughput_rps'], result['throughput_rps']),
+            ('p95', before['latency_ms']['p95'], result['latency_ms']['p95']),
+            ('p99', before['latency_ms']['p99'], result['latency_ms']['p99'])
+        ]:
+            if old and new is not None:
+                print(f"{result['scenario']:>16} {label:>10}: {old} -> {new} ({(new - old) / old * 100:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenarios', default='lookup,lookup_cached,manual,lookup_and_save',
+                        help=f"Comma-separated scenarios from: {', '.join(SCENARIOS)}")
+    parser.add_argument('--requests', type=int, default=200, help='Requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--threads', type=int, default=8, help='App request threads (GUNICORN_THREADS)')
+    parser.add_argument('--server', choices=['auto', 'gunicorn', 'flask', 'uvicorn'], default='auto')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--google-latency', type=float, default=0.08)
+    parser.add_argument('--google-error-rate', type=float, default=0.0)
+    parser.add_argument('--google-not-found-rate', type=float, default=0.0)
+    parser.add_argument('--openlibrary-latency', type=float, default=0.15)
+    parser.add_argument('--image-latency', type=float, default=0.03)
+    parser.add_argument('--notion-latency', type=float, default=0.2)
+    parser.add_argument('--notion-error-rate', type=float, default=0.0)
+    parser.add_argument('--notion-rate-limit', type=float, default=3.0,
+                        help='Notion requests/second before the stand-in answers 429 (0 = unlimited)')
+    parser.add_argument('--notion-retry-after', type=float, default=1.0)
+    parser.add_argument('--app-env', action='append', default=[], metavar='NAME=VALUE',
+                        help='Extra environment for the app, e.g. --app-env NOTION_RATE_LIMIT=10')
+    parser.add_argument('--output', default=os.path.join(BENCH_DIR, 'results', 'latest.json'))
+    parser.add_argument('--compare', metavar='BASELINE_JSON', help='Print changes against an earlier results file')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(message)s')
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    fake = FakeUpstreams(
+        google=UpstreamBehavior(latency=args.google_latency, error_rate=args.google_error_rate,
+                                not_found_rate=args.google_not_found_rate),
+        openlibrary=UpstreamBehavior(latency=args.openlibrary_latency, not_found_rate=1.0),
+        notion=UpstreamBehavior(latency=args.notion_latency, error_rate=args.notion_error_rate,
+                                rate_limit=args.notion_rate_limit, retry_after=args.notion_retry_after),
+        images=UpstreamBehavior(latency=args.image_latency),
+        seed=args.seed
+    ).start()
+
+    cache_dir = tempfile.mkdtemp(prefix='book-scanner-bench-')
+    app_env = dict(fake.env(), **{
+        'NOTION_TOKEN': 'benchmark-token',
+        'NOTION_DATABASE_ID': 'benchmark-database',
+        'GOOGLE_BOOKS_API_KEY': '',
+        'BOOK_CACHE_PATH': os.path.join(cache_dir, 'cache.sqlite3'),
+        'UPSTREAM_WARMUP': 'false',
+        # The cover stand-in only speaks plain http
+        'IMAGE_FORCE_HTTPS': 'false'
+    })
+    for item in args.app_env:
+        name, _, value = item.partition('=')
+        app_env[name] = value
+
+    app = AppProcess(app_env, server=args.server, threads=args.threads)
+    results = []
+    try:
+        app.start()
+        isbns = make_isbns(args.requests * len(scenarios), args.seed)
+        for index, name in enumerate(scenarios):
+            chunk = isbns[index * args.requests:(index + 1) * args.requests]
+            outage = upstream_outage(fake, app_env['BOOK_CACHE_PATH'], chunk) if name == 'lookup_outage' else nullcontext()
+            concurrency = args.concurrency
+            if name == 'fallback_routes':
+                # Each iteration holds two app threads, the batch and the /health call
+                concurrency = max(1, min(concurrency, args.threads // 2))
+            with outage:
+                results.append(run_scenario(name, app.url, chunk, args.requests, concurrency))
+    finally:
+        app.stop()
+        fake.stop()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'server': app.server,
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'upstream_calls': dict(sorted(fake.counts.items())),
+        'results': results
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+    if COVER_SCENARIOS & set(scenarios) and not any(key.startswith('images:') for key in fake.counts):
+        # Cover probes went somewhere else (or nowhere), so the results don't measure cover validation
+        logger.error("No cover image requests reached the stand-in")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class BookCache:
+    """Persistent SQLite cache mapping ISBN to extracted book data
+
+    Found books and "not found" results are stored with separate TTLs. The
+    table is bounded to ``max_entries`` rows, evicting the least recently
+    used entries first. Expired books are kept for another ``stale_ttl``
+    seconds so get_stale() can answer while the metadata providers are down.
+    """
+
+    def __init__(self, path, ttl=30 * 24 * 3600, negative_ttl=24 * 3600,
+                 max_entries=10000, enabled=True, stale_ttl=30 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if self.enabled:
+            try:
+                self._conn = sqlite3.connect(path, check_same_thread=False)
+                self._conn.execute('PRAGMA journal_mode=WAL')
+                self._conn.execute('''
+                    CREATE TABLE IF NOT EXISTS books (
+                        isbn TEXT PRIMARY KEY,
+                        book_json TEXT,
+                        expires_at REAL NOT NULL,
+                        last_access REAL NOT NULL
+                    )
+                ''')
+                self._conn.execute(
+                    'CREATE INDEX IF NOT EXISTS books_last_access ON books (last_access)')
+                self._conn.commit()
+                logger.info(f"Book cache opened at {path}")
+            except sqlite3.Error as e:
+                logger.error(f"Could not open book cache at {path}, caching disabled: {e}")
+                self._conn = None
+                self.enabled = False
+
+    def get(self, isbn):
+        """Return (hit, book_data); book_data is None for a cached "not found" """
+        if not self.enabled:
+            return False, None
+
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    'SELECT book_json, expires_at FROM books WHERE isbn = ?', (isbn,)
+                ).fetchone()
+                if row is None:
+                    return False, None
+                if row[1] <= now:
+                    if row[1] + self.stale_ttl <= now:
+                        self._conn.execute('DELETE FROM books WHERE isbn = ?', (isbn,))
+                        self._conn.commit()
+                    return False, None
+                self._conn.execute(
+                    'UPDATE books SET last_access = ? WHERE isbn = ?', (now, isbn))
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Book cache read failed for {isbn}: {e}")
+            return False, None
+
+        return True, json.loads(row[0]) if row[0] is not None else None
+
+    def get_stale(self, isbn):
+        """Return (hit, book_data) for a found book even if expired, within the stale grace period"""
+        if not self.enabled:
+            return False, None
+
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    'SELECT book_json FROM books WHERE isbn = ? AND book_json IS NOT NULL AND expires_at > ?',
+                    (isbn, time.time() - self.stale_ttl)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Book cache read failed for {isbn}: {e}")
+            return False, None
+
+        return (True, json.loads(row[0])) if row is not None else (False, None)
+
+    def set(self, isbn, book_data):
+        """Store book data for an ISBN; pass None to remember a "not found" result"""
+        if not self.enabled:
+            return
+
+        now = time.time()
+        if book_data is None:
+            book_json, ttl = None, self.negative_ttl
+        else:
+            book_json, ttl = json.dumps(book_data), self.ttl
+
+        try:
+            with self._lock:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO books (isbn, book_json, expires_at, last_access) '
+                    'VALUES (?, ?, ?, ?)',
+                    (isbn, book_json, now + ttl, now))
+                self._evict(now)
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Book cache write failed for {isbn}: {e}")
+
+    def set_default(self, isbn, book_data):
+        """Store book data only if the ISBN has no live entry; returns True if it was stored"""
+        if not self.enabled:
+            return False
+
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute('DELETE FROM books WHERE isbn = ? AND expires_at <= ?', (isbn, now))
+                cursor = self._conn.execute(
+                    'INSERT OR IGNORE INTO books (isbn, book_json, expires_at, last_access) '
+                    'VALUES (?, ?, ?, ?)',
+                    (isbn, json.dumps(book_data), now + self.ttl, now))
+                if cursor.rowcount:
+                    self._evict(now)
+                self._conn.commit()
+                return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            logger.warning(f"Book cache write failed for {isbn}: {e}")
+            return False
+
+    def _evict(self, now):
+        """Remove rows past their stale grace period, then least recently used rows over the size bound"""
+        self._conn.execute('DELETE FROM books WHERE expires_at <= ?', (now - self.stale_ttl,))
+        count = self._conn.execute('SELECT COUNT(*) FROM books').fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                'DELETE FROM books WHERE isbn IN '
+                '(SELECT isbn FROM books ORDER BY last_access ASC LIMIT ?)',
+                (excess,))
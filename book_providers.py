@@ -0,0 +1,440 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+from metrics import percentile
+
+logger = logging.getLogger(__name__)
+
+# Values providers use for "unknown"; merging treats them as missing
+MISSING_VALUES = (None, '', 'Unknown Title', 'Unknown Author')
+
+BOOK_FIELDS = ['title', 'author', 'publisher', 'published_date', 'page_count',
+               'categories', 'description', 'language']
+
+
+def empty_book(isbn):
+    return {
+        'isbn': isbn,
+        'title': 'Unknown Title',
+        'author': 'Unknown Author',
+        'publisher': '',
+        'published_date': '',
+        'page_count': None,
+        'categories': '',
+        'description': '',
+        'language': 'en',
+        'cover_image': None,
+        'cover_candidates': []
+    }
+
+
+def truncate_description(description):
+    return description[:200] + '...' if description else ''
+
+
+def merge_books(primary, secondary):
+    """Fill fields missing from primary with values from secondary"""
+    merged = dict(primary)
+    for field in BOOK_FIELDS:
+        if merged.get(field) in MISSING_VALUES and secondary.get(field) not in MISSING_VALUES:
+            merged[field] = secondary[field]
+    merged['cover_candidates'] = list(dict.fromkeys(
+        (primary.get('cover_candidates') or []) + (secondary.get('cover_candidates') or [])))
+    if not merged.get('cover_image') and merged['cover_candidates']:
+        merged['cover_image'] = merged['cover_candidates'][0]
+    return merged
+
+
+def is_complete(book):
+    return all(book.get(field) not in MISSING_VALUES for field in BOOK_FIELDS) and bool(book.get('cover_image'))
+
+
+class BookProvider:
+    """A source of book metadata; fetch() returns book data, None if not found, or raises"""
+
+    name = 'provider'
+
+    def fetch(self, isbn):
+        raise NotImplementedError
+
+    async def fetch_async(self, client, isbn):
+        """Async fetch through an httpx.AsyncClient; providers without HTTP calls just fetch()"""
+        return self.fetch(isbn)
+
+
+class HttpBookProvider(BookProvider):
+    """A provider answering from one JSON GET per ISBN, usable with blocking or async clients"""
+
+    timeout = 10
+
+    def url(self, isbn):
+        raise NotImplementedError
+
+    def parse(self, data, isbn):
+        raise NotImplementedError
+
+    def fetch(self, isbn):
+        response = self.session.get(self.url(isbn), timeout=self.timeout)
+        response.raise_for_status()
+        return self.parse(response.json(), isbn)
+
+    async def fetch_async(self, client, isbn):
+        response = await client.get(self.url(isbn), timeout=self.timeout)
+        response.raise_for_status()
+        return self.parse(response.json(), isbn)
+
+
+class GoogleBooksProvider(HttpBookProvider):
+    name = 'google'
+
+    def __init__(self, session, base_url, api_key='', timeout=10):
+        self.session = session
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def url(self, isbn):
+        url = f"{self.base_url}/volumes?q=isbn:{isbn}"
+        if self.api_key and self.api_key not in ['', 'dummy_token']:
+            url += f"&key={self.api_key}"
+        return url
+
+    def parse(self, api_data, isbn):
+        if api_data.get('totalItems', 0) == 0:
+            return None
+
+        book_info = api_data['items'][0]['volumeInfo']
+
+        book_data = empty_book(isbn)
+        book_data.update({
+            'title': book_info.get('title', 'Unknown Title'),
+            'author': ', '.join(book_info.get('authors', ['Unknown Author'])),
+            'publisher': book_info.get('publisher', ''),
+            'published_date': book_info.get('publishedDate', ''),
+            'page_count': book_info.get('pageCount'),
+            'categories': ', '.join(book_info.get('categories', [])),
+            'description': truncate_description(book_info.get('description', '')),
+            'language': book_info.get('language', 'en')
+        })
+
+        # Cover candidates, best first; the first one is shown in the UI
+        image_links = book_info.get('imageLinks', {})
+        book_data['cover_candidates'] = [
+            image_links[size]
+            for size in ['extraLarge', 'large', 'medium', 'small', 'thumbnail', 'smallThumbnail']
+            if image_links.get(size)
+        ]
+        if book_data['cover_candidates']:
+            book_data['cover_image'] = book_data['cover_candidates'][0]
+
+        return book_data
+
+
+class OpenLibraryProvider(HttpBookProvider):
+    name = 'openlibrary'
+
+    def __init__(self, session, base_url='https://openlibrary.org', timeout=10):
+        self.session = session
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def url(self, isbn):
+        return f"{self.base_url}/api/books?bibkeys=ISBN:{isbn}&format=json&jscmd=data"
+
+    def parse(self, data, isbn):
+        record = data.get(f'ISBN:{isbn}')
+        if not record:
+            return None
+
+        book_data = empty_book(isbn)
+        book_data.update({
+            'title': record.get('title') or 'Unknown Title',
+            'author': ', '.join(a['name'] for a in record.get('authors', []) if a.get('name')) or 'Unknown Author',
+            'publisher': ', '.join(p['name'] for p in record.get('publishers', []) if p.get('name')),
+            'published_date': self._normalize_date(record.get('publish_date', '')),
+            'page_count': record.get('number_of_pages'),
+            'categories': ', '.join(s['name'] for s in record.get('subjects', [])[:5] if s.get('name')),
+            'description': truncate_description(self._notes(record))
+        })
+
+        cover = record.get('cover', {})
+        book_data['cover_candidates'] = [cover[size] for size in ['large', 'medium', 'small'] if cover.get(size)]
+        if book_data['cover_candidates']:
+            book_data['cover_image'] = book_data['cover_candidates'][0]
+
+        return book_data
+
+    @staticmethod
+    def _notes(record):
+        notes = record.get('notes', '')
+        if isinstance(notes, dict):
+            notes = notes.get('value', '')
+        return notes or ''
+
+    @staticmethod
+    def _normalize_date(value):
+        """Convert Open Library dates like "October 1, 2019" to YYYY-MM-DD"""
+        for fmt in ['%B %d, %Y', '%b %d, %Y', '%d %B %Y', '%B %Y', '%b %Y']:
+            try:
+                parsed = datetime.strptime(value, fmt)
+            except ValueError:
+                continue
+            return parsed.strftime('%Y-%m-%d' if '%d' in fmt else '%Y-%m')
+        return value
+
+
+class LocalFileProvider(BookProvider):
+    """Serves books from a JSON file, either {isbn: book} or a list of books with an "isbn" field"""
+
+    name = 'local'
+
+    def __init__(self, path, key_fn=None):
+        self.path = path
+        self.key_fn = key_fn or (lambda isbn: isbn.replace('-', '').replace(' ', '').upper())
+        with open(path) as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            data = {book['isbn']: book for book in data if book.get('isbn')}
+        self.books = {self.key_fn(isbn) or isbn: book for isbn, book in data.items()}
+        logger.info(f"Loaded {len(self.books)} books from {path}")
+
+    def fetch(self, isbn):
+        book = self.books.get(self.key_fn(isbn) or isbn)
+        if book is None:
+            return None
+        book_data = empty_book(isbn)
+        book_data.update(book)
+        book_data['isbn'] = isbn
+        if not book_data.get('cover_candidates') and book_data.get('cover_image'):
+            book_data['cover_candidates'] = [book_data['cover_image']]
+        return book_data
+
+
+class ProviderStats:
+    """Rolling latency and outcome counts for one provider"""
+
+    def __init__(self, window=200):
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.found = 0
+        self.not_found = 0
+        self.errors = 0
+
+    def record(self, latency, outcome):
+        with self._lock:
+            self._latencies.append(latency)
+            if outcome == 'found':
+                self.found += 1
+            elif outcome == 'not_found':
+                self.not_found += 1
+            else:
+                self.errors += 1
+
+    def sample_count(self):
+        with self._lock:
+            return len(self._latencies)
+
+    def percentile(self, pct):
+        with self._lock:
+            samples = sorted(self._latencies)
+        return percentile(samples, pct)
+
+    def snapshot(self):
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            'found': self.found,
+            'not_found': self.not_found,
+            'errors': self.errors,
+            'p50_seconds': round(p50, 3) if p50 is not None else None,
+            'p95_seconds': round(p95, 3) if p95 is not None else None
+        }
+
+
+class HedgedLookup:
+    """Query metadata providers in order, hedging slow ones with the next provider
+
+    The next provider is started when the previous one fails, finds nothing,
+    or hasn't answered within its hedge delay (its recent p90 latency, clamped).
+    The first answer wins; answers arriving within ``merge_window`` seconds are
+    merged in to fill missing fields.
+    """
+
+    def __init__(self, providers, workers=8, default_hedge_delay=1.0, min_hedge_delay=0.2,
+                 max_hedge_delay=3.0, merge_window=0.3, timeout=12, min_samples=20):
+        self.providers = providers
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self.merge_window = merge_window
+        self.timeout = timeout
+        self.min_samples = min_samples
+        self.stats = {provider.name: ProviderStats() for provider in providers}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='book-provider')
+
+    def hedge_delay(self, provider):
+        stats = self.stats[provider.name]
+        if stats.sample_count() < self.min_samples:
+            return self.default_hedge_delay
+        return min(self.max_hedge_delay, max(self.min_hedge_delay, stats.percentile(90)))
+
+    def stats_snapshot(self):
+        return {name: stats.snapshot() for name, stats in self.stats.items()}
+
+    def _record(self, provider, started, book=None, failed=False):
+        outcome = 'error' if failed else 'found' if book else 'not_found'
+        self.stats[provider.name].record(time.monotonic() - started, outcome)
+
+    def _call(self, provider, isbn):
+        started = time.monotonic()
+        try:
+            book = provider.fetch(isbn)
+        except Exception:
+            self._record(provider, started, failed=True)
+            raise
+        self._record(provider, started, book)
+        return book
+
+    async def _call_async(self, provider, client, isbn):
+        started = time.monotonic()
+        try:
+            book = await provider.fetch_async(client, isbn)
+        except Exception:
+            self._record(provider, started, failed=True)
+            raise
+        self._record(provider, started, book)
+        return book
+
+    def lookup(self, isbn):
+        """Return merged book data, or None if every provider answered that it doesn't have the book
+
+        Raises if no provider found the book and any of them failed or timed
+        out, so an outage is never mistaken for (and cached as) "not found".
+        """
+        attempt = _HedgedAttempt(self, isbn)
+        futures = {}
+        pending = set()
+
+        while True:
+            provider = attempt.provider_to_start(running=len(pending))
+            if provider is not None:
+                future = self._executor.submit(self._call, provider, isbn)
+                futures[future] = provider
+                pending.add(future)
+
+            timeout = attempt.wait_timeout()
+            if not pending or timeout <= 0:
+                return attempt.result()
+
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if attempt.record(futures[future], None if error else future.result(), error):
+                    return attempt.result()
+
+    async def lookup_async(self, isbn, clients):
+        """Async lookup() for the ASGI mode; ``clients`` maps provider names to httpx.AsyncClients
+
+        The hedging decisions are lookup()'s (_HedgedAttempt); providers still
+        running when the answer is settled are cancelled.
+        """
+        attempt = _HedgedAttempt(self, isbn)
+        tasks = {}
+        pending = set()
+
+        try:
+            while True:
+                provider = attempt.provider_to_start(running=len(pending))
+                if provider is not None:
+                    task = asyncio.ensure_future(self._call_async(provider, clients.get(provider.name), isbn))
+                    tasks[task] = provider
+                    pending.add(task)
+
+                timeout = attempt.wait_timeout()
+                if not pending or timeout <= 0:
+                    return attempt.result()
+
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    error = task.exception()
+                    if attempt.record(tasks[task], None if error else task.result(), error):
+                        return attempt.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+class _HedgedAttempt:
+    """The decisions of one hedged lookup: when to start the next provider, how long to wait, what to return
+
+    HedgedLookup.lookup() and lookup_async() only run the provider calls, on
+    threads or as tasks, and report each outcome here.
+    """
+
+    def __init__(self, lookup, isbn):
+        self.providers = lookup.providers
+        self.hedge_delay = lookup.hedge_delay
+        self.merge_window = lookup.merge_window
+        self.timeout = lookup.timeout
+        self.isbn = isbn
+        self.deadline = time.monotonic() + lookup.timeout
+        self.next_start = time.monotonic()
+        self.started = 0
+        self.answer = None
+        self.answer_at = None
+        self.not_found = 0
+        self.errors = []
+
+    def provider_to_start(self, running):
+        """The provider to launch now, or None: the next one starts at its hedge time or when nothing else is running"""
+        now = time.monotonic()
+        if self.answer is not None or self.started >= len(self.providers):
+            return None
+        if now < self.next_start and running:
+            return None
+        provider = self.providers[self.started]
+        self.started += 1
+        self.next_start = now + self.hedge_delay(provider)
+        return provider
+
+    def wait_timeout(self):
+        """Seconds to wait for running providers before deciding again; <= 0 means stop"""
+        if self.answer is not None:
+            wait_until = min(self.answer_at + self.merge_window, self.deadline)
+        elif self.started < len(self.providers):
+            wait_until = min(self.next_start, self.deadline)
+        else:
+            wait_until = self.deadline
+        return wait_until - time.monotonic()
+
+    def record(self, provider, book, error=None):
+        """Take one provider's outcome; returns True once the answer is complete"""
+        if error is not None:
+            logger.warning(f"Provider {provider.name} failed for {self.isbn}: {str(error)}")
+            self.errors.append(error)
+            return False
+        if not book:
+            self.not_found += 1
+            return False
+        if self.answer is None:
+            self.answer, self.answer_at = book, time.monotonic()
+            logger.info(f"Provider {provider.name} answered first for {self.isbn}")
+        else:
+            self.answer = merge_books(self.answer, book)
+        return is_complete(self.answer)
+
+    def result(self):
+        """The merged answer, None if every started provider answered not-found, or raise"""
+        if self.answer is not None:
+            return self.answer
+        # "Not found" is only certain when no provider failed or timed out
+        if self.errors:
+            raise self.errors[-1]
+        if self.not_found == self.started:
+            return None
+        raise TimeoutError(f"No book provider answered for ISBN {self.isbn} within {self.timeout}s")
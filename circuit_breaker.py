@@ -0,0 +1,165 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open"""
+
+    def __init__(self, name, retry_after):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"{name} is unavailable (circuit open, retrying in {retry_after:.0f}s)")
+
+
+class CircuitBreaker:
+    """Stops calling a failing upstream, then probes it again after a cool-down
+
+    Closed: calls go through; ``failure_threshold`` failures in a row open
+    the breaker. Open: calls fail at once with CircuitOpenError for
+    ``reset_timeout`` seconds. Half-open: up to ``half_open_max_calls``
+    probe calls go through; a success closes the breaker, a failure opens
+    it again.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30, half_open_max_calls=1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._probes = 0
+        self._rejected = 0
+        self._times_opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpenError"""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and self._probes < self.half_open_max_calls:
+                self._state = HALF_OPEN
+                self._probes += 1
+                return
+            self._rejected += 1
+            raise CircuitOpenError(self.name, self._retry_after(now))
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info(f"Circuit breaker for {self.name} closed")
+            self._state = CLOSED
+            self._failures = 0
+            self._probes = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._open(time.monotonic())
+
+    def retry_after(self):
+        """Seconds until calls (or a probe) may go through again; 0 if they may now"""
+        with self._lock:
+            now = time.monotonic()
+            if self._current_state(now) == CLOSED:
+                return 0
+            return self._retry_after(now)
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            return {
+                'state': self._current_state(now),
+                'consecutive_failures': self._failures,
+                'retry_after_seconds': round(self._retry_after(now), 1) if self._state != CLOSED else 0,
+                'rejected': self._rejected,
+                'times_opened': self._times_opened
+            }
+
+    def _open(self, now):
+        if self._state != OPEN:
+            self._times_opened += 1
+            logger.warning(f"Circuit breaker for {self.name} opened after {self._failures} failures")
+        self._state = OPEN
+        self._opened_at = now
+        self._probes = 0
+
+    def _current_state(self, now):
+        # An open breaker turns half-open once the cool-down has passed
+        if self._state == OPEN and now - self._opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return self._state
+
+    def _retry_after(self, now):
+        if self._state == HALF_OPEN or self._current_state(now) == HALF_OPEN:
+            # A probe is in flight (or allowed); others wait for its outcome
+            return 0 if self._probes < self.half_open_max_calls else 1
+        return max(0.0, self._opened_at + self.reset_timeout - now)
+
+
+class CircuitBreakers:
+    """Circuit breakers created on first use, one per upstream name, sharing settings
+
+    Per-host breakers (those requested with a ``shared`` fallback name) are
+    capped at ``max_host_breakers``; further hosts share the fallback
+    breaker, so arbitrary URLs can't grow the set without bound.
+    """
+
+    def __init__(self, enabled=True, max_host_breakers=50, **settings):
+        self.enabled = enabled
+        self.max_host_breakers = max_host_breakers
+        self.settings = settings
+        self._breakers = {}
+        self._host_breakers = 0
+        self._lock = threading.Lock()
+
+    def get(self, name, shared=None):
+        """The breaker for ``name`` (or ``shared`` once the per-host cap is reached), or None if breakers are disabled"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None and shared is not None and self._host_breakers >= self.max_host_breakers:
+                name = shared
+                breaker = self._breakers.get(name)
+            if breaker is None:
+                if shared is not None and name != shared:
+                    self._host_breakers += 1
+                breaker = self._breakers[name] = CircuitBreaker(name, **self.settings)
+            return breaker
+
+    def is_open(self, name):
+        """True while calls to ``name`` are being rejected"""
+        breaker = self.get(name)
+        return breaker is not None and breaker.retry_after() > 0
+
+    def retry_after(self, name):
+        breaker = self.get(name)
+        return breaker.retry_after() if breaker is not None else 0
+
+    def stats(self):
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.stats() for breaker in breakers}
+
+
+def is_failure(status):
+    """Whether an upstream response status counts against its breaker (5xx; 4xx are the caller's problem)"""
+    return status >= 500
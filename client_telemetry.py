@@ -0,0 +1,123 @@
+import re
+import threading
+import time
+from collections import deque
+
+from metrics import percentile
+
+# Timings the frontend reports, with the largest value accepted for each
+CLIENT_METRICS = {
+    'camera_init_ms': 60000,       # startScanning() until Quagga.init() calls back
+    'first_detection_ms': 600000,  # camera ready until the first accepted barcode
+    'decode_fps': 240,             # frames Quagga processed per second while scanning
+    'lookup_ms': 120000            # /test-isbn round trip as seen by the browser
+}
+
+PERCENTILES = (50, 90, 95, 99)
+
+PLATFORM_PATTERNS = [
+    ('ios', re.compile(r'iPhone|iPad|iPod')),
+    ('android', re.compile(r'Android')),
+    ('chromeos', re.compile(r'CrOS')),
+    ('windows', re.compile(r'Windows')),
+    ('macos', re.compile(r'Macintosh|Mac OS X')),
+    ('linux', re.compile(r'Linux'))
+]
+
+# Order matters: Edge and Samsung Internet also claim to be Chrome, and Chrome claims to be Safari
+BROWSER_PATTERNS = [
+    ('edge', re.compile(r'Edg(e|A|iOS)?/')),
+    ('samsung', re.compile(r'SamsungBrowser/')),
+    ('firefox', re.compile(r'Firefox/|FxiOS/')),
+    ('chrome', re.compile(r'Chrome/|CriOS/')),
+    ('safari', re.compile(r'Safari/'))
+]
+
+
+def device_class(user_agent, cores=None, memory=None):
+    """Coarse device class, e.g. 'android/chrome/8-core/4gb', from the User-Agent and device hints
+
+    Only the platform, browser family, CPU core count and memory class are
+    kept, so the number of classes stays small and no class identifies a user.
+    """
+    user_agent = user_agent or ''
+    platform = next((name for name, pattern in PLATFORM_PATTERNS if pattern.search(user_agent)), 'other')
+    browser = next((name for name, pattern in BROWSER_PATTERNS if pattern.search(user_agent)), 'other')
+    parts = [platform, browser]
+    if isinstance(cores, int) and not isinstance(cores, bool) and 0 < cores <= 256:
+        parts.append(f"{min(cores, 16)}-core")
+    if isinstance(memory, (int, float)) and not isinstance(memory, bool) and 0 < memory <= 1024:
+        # navigator.deviceMemory is already rounded to a power of two (0.25 to 8)
+        parts.append(f"{memory:g}gb")
+    return '/'.join(parts)
+
+
+class ClientTelemetry:
+    """Rolling percentiles of frontend timings, per device class and metric
+
+    Each (device class, metric) pair keeps its last ``window`` samples. Once
+    ``max_classes`` device classes have been seen, new ones are counted under
+    'other' so a flood of odd User-Agents can't grow memory without bound.
+    """
+
+    def __init__(self, window=1000, max_classes=100):
+        self.window = window
+        self.max_classes = max_classes
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._counts = {}
+        self._classes = set()
+        self._last_seen = {}
+        self.rejected = 0
+
+    def record(self, device, events):
+        """Add a batch of {'metric': name, 'value': number} events; returns the metrics of those accepted"""
+        accepted = []
+        for event in events:
+            metric = event.get('metric') if isinstance(event, dict) else None
+            value = event.get('value') if isinstance(event, dict) else None
+            limit = CLIENT_METRICS.get(metric)
+            if limit is None or isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= limit:
+                continue
+            accepted.append((metric, float(value)))
+
+        with self._lock:
+            self.rejected += len(events) - len(accepted)
+            if device not in self._classes:
+                if len(self._classes) >= self.max_classes:
+                    device = 'other'
+                self._classes.add(device)
+            for metric, value in accepted:
+                key = (device, metric)
+                samples = self._samples.get(key)
+                if samples is None:
+                    samples = self._samples[key] = deque(maxlen=self.window)
+                samples.append(value)
+                self._counts[key] = self._counts.get(key, 0) + 1
+            if accepted:
+                self._last_seen[device] = time.time()
+        return [metric for metric, _ in accepted]
+
+    def summary(self):
+        """{device class: {'last_seen': ts, 'metrics': {metric: {count, samples, p50, p90, p95, p99}}}}"""
+        with self._lock:
+            samples = {key: sorted(values) for key, values in self._samples.items()}
+            counts = dict(self._counts)
+            last_seen = dict(self._last_seen)
+
+        summary = {}
+        for (device, metric), values in sorted(samples.items()):
+            stats = {'count': counts[(device, metric)], 'samples': len(values)}
+            for pct in PERCENTILES:
+                stats[f"p{pct}"] = round(percentile(values, pct), 1)
+            entry = summary.setdefault(device, {'last_seen': last_seen.get(device), 'metrics': {}})
+            entry['metrics'][metric] = stats
+        return summary
+
+    def stats(self):
+        with self._lock:
+            return {
+                'device_classes': len(self._classes),
+                'events': sum(self._counts.values()),
+                'rejected': self.rejected
+            }
@@ -0,0 +1,175 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Without Pillow covers are mirrored as-is, with no thumbnails
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Stored file names: <sha256>.<ext> for originals, <sha256>-<width>.jpg for thumbnails
+NAME_PATTERN = re.compile(r'^[0-9a-f]{64}(-[0-9]+)?\.(jpg|png|gif|webp)$')
+
+FORMAT_EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+CONTENT_TYPE_EXTENSIONS = {'image/jpeg': 'jpg', 'image/png': 'png', 'image/gif': 'gif', 'image/webp': 'webp'}
+MIMETYPES = {'jpg': 'image/jpeg', 'png': 'image/png', 'gif': 'image/gif', 'webp': 'image/webp'}
+
+
+class CoverMirrorError(Exception):
+    """A cover could not be downloaded or is not a usable image"""
+
+
+class CoverStore:
+    """Content-addressed local copies of cover images, with resized thumbnails
+
+    Each cover is downloaded once and stored under the SHA-256 of its bytes,
+    so editions sharing a cover share one file. A small pointer file per
+    source URL records what it was stored as, so a URL is never fetched again,
+    even after a restart.
+    """
+
+    def __init__(self, root, session, thumbnail_widths=(128, 320, 600), max_bytes=5 * 1024 * 1024,
+                 timeout=10, jpeg_quality=85):
+        self.root = root
+        self.session = session
+        self.thumbnail_widths = sorted(set(thumbnail_widths))
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.jpeg_quality = jpeg_quality
+        self._lock = threading.Lock()
+        self._stats = {'mirrored': 0, 'reused': 0, 'failed': 0}
+        os.makedirs(os.path.join(root, 'urls'), exist_ok=True)
+
+    def lookup(self, url):
+        """The stored record for a source URL ({'original': name, 'thumbnails': {width: name}}), or None"""
+        try:
+            with open(self._pointer_path(url)) as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        record['thumbnails'] = {int(width): name for width, name in record['thumbnails'].items()}
+        if not os.path.exists(self._file_path(record['original'])):
+            return None
+        return record
+
+    def mirror(self, url):
+        """Download a cover, store it and its thumbnails, and return its record
+
+        Raises CoverMirrorError if the URL doesn't serve a usable image.
+        """
+        record = self.lookup(url)
+        if record is not None:
+            return record
+
+        try:
+            content, content_type = self._download(url)
+            record = self._store(content, content_type)
+        except CoverMirrorError:
+            self._count('failed')
+            raise
+        except Exception as e:
+            self._count('failed')
+            raise CoverMirrorError(f"Could not mirror {url}: {e}") from e
+
+        self._write(self._pointer_path(url), json.dumps(record).encode())
+        logger.info(f"Mirrored cover {url} as {record['original']}")
+        return record
+
+    def path(self, name):
+        """Filesystem path of a stored file, or None for unknown or malformed names"""
+        if not NAME_PATTERN.match(name or ''):
+            return None
+        path = self._file_path(name)
+        return path if os.path.exists(path) else None
+
+    @staticmethod
+    def mimetype(name):
+        return MIMETYPES[name.rsplit('.', 1)[1]]
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def _download(self, url):
+        with self.session.get(url, timeout=self.timeout, stream=True) as response:
+            if response.status_code != 200:
+                raise CoverMirrorError(f"Cover URL returned status {response.status_code}: {url}")
+            content_type = response.headers.get('content-type', '').split(';')[0].strip().lower()
+            if not content_type.startswith('image/'):
+                raise CoverMirrorError(f"URL does not return an image: {content_type}")
+
+            content = b''
+            for chunk in response.iter_content(64 * 1024):
+                content += chunk
+                if len(content) > self.max_bytes:
+                    raise CoverMirrorError(f"Cover is larger than {self.max_bytes} bytes: {url}")
+        return content, content_type
+
+    def _store(self, content, content_type):
+        digest = hashlib.sha256(content).hexdigest()
+        image = None
+        if Image is not None:
+            try:
+                image = Image.open(io.BytesIO(content))
+                image.load()
+            except Exception as e:
+                raise CoverMirrorError(f"Not a readable image: {e}") from e
+            extension = FORMAT_EXTENSIONS.get(image.format)
+        else:
+            extension = CONTENT_TYPE_EXTENSIONS.get(content_type)
+        if extension is None:
+            raise CoverMirrorError(f"Unsupported image type: {image.format if image else content_type}")
+
+        record = {'original': f"{digest}.{extension}", 'thumbnails': {}}
+        if os.path.exists(self._file_path(record['original'])):
+            self._count('reused')
+        else:
+            self._write(self._file_path(record['original']), content)
+            self._count('mirrored')
+
+        if image is not None:
+            image = ImageOps.exif_transpose(image).convert('RGB')
+            for width in self.thumbnail_widths:
+                if width >= image.width:
+                    break
+                name = f"{digest}-{width}.jpg"
+                if not os.path.exists(self._file_path(name)):
+                    self._write(self._file_path(name), self._thumbnail(image, width))
+                record['thumbnails'][width] = name
+        return record
+
+    def _thumbnail(self, image, width):
+        height = max(1, round(image.height * width / image.width))
+        output = io.BytesIO()
+        image.resize((width, height), Image.LANCZOS).save(
+            output, 'JPEG', quality=self.jpeg_quality, optimize=True, progressive=True)
+        return output.getvalue()
+
+    def _file_path(self, name):
+        return os.path.join(self.root, name[:2], name)
+
+    def _pointer_path(self, url):
+        return os.path.join(self.root, 'urls', hashlib.sha256(url.encode()).hexdigest())
+
+    def _write(self, path, content):
+        """Write atomically, so readers and concurrent writers never see a partial file"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
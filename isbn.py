@@ -0,0 +1,68 @@
+BOOK_PREFIXES = ('978', '979')
+
+
+class InvalidISBN(ValueError):
+    """Raised when a string is not a valid book ISBN"""
+
+
+def clean(isbn):
+    """Strip hyphens and spaces from an ISBN and upper-case a trailing x"""
+    return str(isbn).replace('-', '').replace(' ', '').strip().upper()
+
+
+def isbn10_check_digit(first9):
+    total = sum((10 - i) * int(d) for i, d in enumerate(first9))
+    check = (11 - total % 11) % 11
+    return 'X' if check == 10 else str(check)
+
+
+def isbn13_check_digit(first12):
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(first12))
+    return str((10 - total % 10) % 10)
+
+
+def isbn10_to_isbn13(isbn):
+    isbn = clean(isbn)
+    first12 = '978' + isbn[:9]
+    return first12 + isbn13_check_digit(first12)
+
+
+def isbn13_to_isbn10(isbn):
+    """ISBN-10 form of an ISBN-13, or None for 979 ISBNs which have no ISBN-10"""
+    isbn = clean(isbn)
+    if not isbn.startswith('978'):
+        return None
+    return isbn[3:12] + isbn10_check_digit(isbn[3:12])
+
+
+def canonicalize(isbn):
+    """Return the canonical ISBN-13 for an ISBN-10 or ISBN-13; raises InvalidISBN"""
+    isbn = clean(isbn)
+
+    if len(isbn) == 10:
+        if not (isbn[:9].isdigit() and (isbn[9].isdigit() or isbn[9] == 'X')):
+            raise InvalidISBN('ISBN-10 must be 9 digits followed by a digit or X')
+        if isbn10_check_digit(isbn[:9]) != isbn[9]:
+            raise InvalidISBN('ISBN check digit is wrong')
+        return isbn10_to_isbn13(isbn)
+
+    if len(isbn) == 13:
+        if not isbn.isdigit():
+            raise InvalidISBN('ISBN-13 must be 13 digits')
+        if not isbn.startswith(BOOK_PREFIXES):
+            raise InvalidISBN('Barcode is not a book ISBN (must start with 978 or 979)')
+        if isbn13_check_digit(isbn[:12]) != isbn[12]:
+            raise InvalidISBN('ISBN check digit is wrong')
+        return isbn
+
+    raise InvalidISBN('ISBN must be 10 or 13 characters')
+
+
+def canonical_or_none(isbn):
+    """Canonical ISBN-13, or None if the value is not a valid ISBN"""
+    if not isbn:
+        return None
+    try:
+        return canonicalize(isbn)
+    except InvalidISBN:
+        return None
@@ -1,21 +1,346 @@
 import os
+import csv
+import io
 import json
 import logging
-import requests
-from flask import Flask, request, render_template_string, jsonify
+import queue
+import secrets
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from flask import Flask, Response, g, request, render_template_string, jsonify, send_file, stream_with_context
+
+from book_cache import BookCache
+from book_providers import GoogleBooksProvider, HedgedLookup, LocalFileProvider, OpenLibraryProvider, empty_book
+from circuit_breaker import CircuitBreakers, CircuitOpenError
+from client_telemetry import ClientTelemetry, device_class
+from cover_store import CoverMirrorError, CoverStore
+from isbn import InvalidISBN, canonical_or_none, canonicalize
+import metrics
+from notion_index import NotionIsbnIndex, property_text
+from notion_queue import NotionWriteQueue
+from notion_scheduler import NotionScheduler
+from notion_schema import NotionSchema
+from singleflight import SingleFlight
+from static_assets import CompressedBody, StaticAssets
+
+try:
+    import barcode_decoder
+except ImportError:  # NumPy and Pillow are only needed for /decode-barcode
+    barcode_decoder = None
+from ttl_cache import TTLCache
+from upstream import UpstreamClients
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize Flask app
-app = Flask(__name__)
+# Initialize Flask app; static files are served by StaticAssets instead
+app = Flask(__name__, static_folder=None)
 
 # Environment variables
 NOTION_TOKEN = os.environ.get('NOTION_TOKEN', '')
 NOTION_DATABASE_ID = os.environ.get('NOTION_DATABASE_ID', '')
 GOOGLE_BOOKS_API_KEY = os.environ.get('GOOGLE_BOOKS_API_KEY', '')
 
+# Upstream HTTP client settings
+GOOGLE_BOOKS_API_URL = os.environ.get('GOOGLE_BOOKS_API_URL', 'https://www.googleapis.com/books/v1')
+OPEN_LIBRARY_API_URL = os.environ.get('OPEN_LIBRARY_API_URL', 'https://openlibrary.org')
+NOTION_API_URL = os.environ.get('NOTION_API_URL', 'https://api.notion.com/v1')
+UPSTREAM_POOL_SIZE = int(os.environ.get('UPSTREAM_POOL_SIZE', os.environ.get('GUNICORN_THREADS', 8)))
+UPSTREAM_WARMUP = os.environ.get('UPSTREAM_WARMUP', 'false').lower() in ['1', 'true', 'yes']
+UPSTREAM_WARMUP_CONNECTIONS = int(os.environ.get('UPSTREAM_WARMUP_CONNECTIONS', 1))
+
+# Prometheus metrics exported on /metrics
+metrics_registry = metrics.Registry()
+http_requests = metrics_registry.counter(
+    'book_scanner_http_requests_total', 'HTTP requests by route, method and status code',
+    ['route', 'method', 'status'])
+http_request_duration = metrics_registry.histogram(
+    'book_scanner_http_request_duration_seconds', 'Time to produce a response, by route',
+    ['route', 'method'])
+http_in_flight = metrics_registry.gauge(
+    'book_scanner_http_requests_in_flight', 'Requests currently being handled')
+metrics_registry.gauge(
+    'book_scanner_worker_threads', 'Request-handling threads configured for gunicorn',
+    callback=lambda: int(os.environ.get('GUNICORN_THREADS', 1)))
+metrics_registry.gauge(
+    'book_scanner_process_threads', 'Live threads in the process, including background workers',
+    callback=threading.active_count)
+upstream_requests = metrics_registry.counter(
+    'book_scanner_upstream_requests_total', 'Upstream HTTP calls by upstream and status code',
+    ['upstream', 'status'])
+upstream_request_duration = metrics_registry.histogram(
+    'book_scanner_upstream_request_duration_seconds', 'Upstream HTTP call latency',
+    ['upstream'])
+cache_lookups = metrics_registry.counter(
+    'book_scanner_cache_lookups_total', 'Cache lookups by cache and result (hit or miss)',
+    ['cache', 'result'])
+metrics_registry.gauge(
+    'book_scanner_notion_scheduler_queue_depth', 'Notion calls waiting for a rate-limit token',
+    callback=lambda: notion_api.stats()['queue_depth'])
+metrics_registry.gauge(
+    'book_scanner_notion_write_queue_depth', 'Background Notion saves waiting to run',
+    callback=lambda: notion_write_queue.depth())
+metrics_registry.gauge(
+    'book_scanner_coalesced_requests', 'Requests served by joining an identical in-flight call',
+    ['kind'], callback=lambda: {
+        ('book_lookup',): book_lookup_flights.shared,
+        ('image_check',): image_check_flights.shared
+    })
+
+def observe_upstream(name, seconds, status):
+    """Record one upstream HTTP call (called by the pooled sessions)"""
+    upstream_requests.inc(upstream=name, status=status)
+    upstream_request_duration.observe(seconds, upstream=name)
+
+def count_cache_lookup(cache, hit):
+    cache_lookups.inc(cache=cache, result='hit' if hit else 'miss')
+
+# Circuit breakers: an upstream failing repeatedly is skipped for a cool-down, then probed again
+CIRCUIT_BREAKERS_ENABLED = os.environ.get('CIRCUIT_BREAKERS_ENABLED', 'true').lower() not in ['0', 'false', 'no']
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', 5))
+CIRCUIT_RESET_TIMEOUT = float(os.environ.get('CIRCUIT_RESET_TIMEOUT', 30))
+CIRCUIT_MAX_HOST_BREAKERS = int(os.environ.get('CIRCUIT_MAX_HOST_BREAKERS', 50))
+
+circuit_breakers = CircuitBreakers(
+    enabled=CIRCUIT_BREAKERS_ENABLED,
+    max_host_breakers=CIRCUIT_MAX_HOST_BREAKERS,
+    failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=CIRCUIT_RESET_TIMEOUT
+)
+metrics_registry.gauge(
+    'book_scanner_circuit_breaker_open', 'Whether calls to an upstream are being rejected (1) or not (0)',
+    ['upstream'], callback=lambda: {
+        (name,): int(stats['state'] == 'open') for name, stats in circuit_breakers.stats().items()
+    })
+
+def notion_unavailable():
+    """True while Notion's circuit breaker is rejecting calls; saves are queued instead"""
+    return circuit_breakers.is_open('notion')
+
+upstream = UpstreamClients(
+    GOOGLE_BOOKS_API_URL,
+    NOTION_API_URL,
+    notion_token=NOTION_TOKEN,
+    pool_size=UPSTREAM_POOL_SIZE,
+    open_library_url=OPEN_LIBRARY_API_URL,
+    observer=observe_upstream,
+    breakers=circuit_breakers
+)
+if UPSTREAM_WARMUP:
+    upstream.warm_up(connections=UPSTREAM_WARMUP_CONNECTIONS)
+
+# All Notion traffic goes through one rate-limited scheduler
+NOTION_RATE_LIMIT = float(os.environ.get('NOTION_RATE_LIMIT', 3))
+NOTION_RATE_BURST = int(os.environ.get('NOTION_RATE_BURST', 3))
+NOTION_MAX_WAITING = int(os.environ.get('NOTION_MAX_WAITING', 50))
+NOTION_MAX_WAIT = float(os.environ.get('NOTION_MAX_WAIT', 60))
+NOTION_MAX_RETRIES = int(os.environ.get('NOTION_MAX_RETRIES', 4))
+
+notion_api = NotionScheduler(
+    upstream.notion,
+    rate=NOTION_RATE_LIMIT,
+    burst=NOTION_RATE_BURST,
+    max_waiting=NOTION_MAX_WAITING,
+    max_wait=NOTION_MAX_WAIT,
+    max_retries=NOTION_MAX_RETRIES
+)
+
+# ISBN metadata cache settings
+BOOK_CACHE_ENABLED = os.environ.get('BOOK_CACHE_ENABLED', 'true').lower() not in ['0', 'false', 'no']
+BOOK_CACHE_PATH = os.environ.get('BOOK_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'book_scanner_cache.sqlite3'))
+BOOK_CACHE_TTL = int(os.environ.get('BOOK_CACHE_TTL', 30 * 24 * 3600))
+BOOK_CACHE_NEGATIVE_TTL = int(os.environ.get('BOOK_CACHE_NEGATIVE_TTL', 24 * 3600))
+BOOK_CACHE_MAX_ENTRIES = int(os.environ.get('BOOK_CACHE_MAX_ENTRIES', 10000))
+BOOK_CACHE_STALE_TTL = int(os.environ.get('BOOK_CACHE_STALE_TTL', 30 * 24 * 3600))
+
+book_cache = BookCache(
+    BOOK_CACHE_PATH,
+    ttl=BOOK_CACHE_TTL,
+    negative_ttl=BOOK_CACHE_NEGATIVE_TTL,
+    max_entries=BOOK_CACHE_MAX_ENTRIES,
+    enabled=BOOK_CACHE_ENABLED,
+    stale_ttl=BOOK_CACHE_STALE_TTL
+)
+
+# Looked-up books awaiting an "Add to Notion" click, keyed by lookup token
+PENDING_BOOK_TTL = int(os.environ.get('PENDING_BOOK_TTL', 900))
+PENDING_BOOK_MAX_ENTRIES = int(os.environ.get('PENDING_BOOK_MAX_ENTRIES', 1000))
+
+pending_books = TTLCache(maxsize=PENDING_BOOK_MAX_ENTRIES, ttl=PENDING_BOOK_TTL)
+
+# Cover image validation results, keyed by optimized image URL
+IMAGE_CACHE_TTL = int(os.environ.get('IMAGE_CACHE_TTL', 24 * 3600))
+IMAGE_CACHE_FAILURE_TTL = int(os.environ.get('IMAGE_CACHE_FAILURE_TTL', 600))
+IMAGE_CACHE_MAX_ENTRIES = int(os.environ.get('IMAGE_CACHE_MAX_ENTRIES', 5000))
+# Notion wants https covers; only turned off to point cover hosts at plain-http stand-ins
+IMAGE_FORCE_HTTPS = os.environ.get('IMAGE_FORCE_HTTPS', 'true').lower() not in ['0', 'false', 'no']
+
+image_validation_cache = TTLCache(maxsize=IMAGE_CACHE_MAX_ENTRIES, ttl=IMAGE_CACHE_TTL)
+
+# Concurrent requests for the same ISBN or cover URL share one upstream call
+book_lookup_flights = SingleFlight()
+image_check_flights = SingleFlight()
+
+# Local ISBN -> Notion page index used for duplicate detection
+NOTION_INDEX_ENABLED = os.environ.get('NOTION_INDEX_ENABLED', 'true').lower() not in ['0', 'false', 'no']
+NOTION_INDEX_REFRESH = int(os.environ.get('NOTION_INDEX_REFRESH', 3600))
+SKIP_DUPLICATE_SAVES = os.environ.get('SKIP_DUPLICATE_SAVES', 'false').lower() in ['1', 'true', 'yes']
+
+# Database schema, fetched to fit each page's properties to the columns that exist
+NOTION_SCHEMA_ENABLED = os.environ.get('NOTION_SCHEMA_ENABLED', 'true').lower() not in ['0', 'false', 'no']
+NOTION_SCHEMA_REFRESH = int(os.environ.get('NOTION_SCHEMA_REFRESH', 600))
+# JSON object renaming the app's properties to this database's columns, e.g. {"BookName": "Title"}
+NOTION_PROPERTY_NAMES = json.loads(os.environ.get('NOTION_PROPERTY_NAMES') or '{}')
+
+# Properties written by notion_page_payload(), and their types
+BOOK_PROPERTY_TYPES = {
+    'BookName': 'title',
+    'ISBN': 'rich_text',
+    'Author': 'rich_text',
+    'Publisher': 'rich_text',
+    'Page Count': 'number',
+    'Cover image': 'url',
+    'Cover PNG': 'files',
+    'Published Date': 'date',
+    'Descriptions': 'rich_text',
+    'Category': 'rich_text'
+}
+
+notion_schema = NotionSchema(
+    notion_api,
+    f"{upstream.notion_url}/databases/{NOTION_DATABASE_ID}",
+    BOOK_PROPERTY_TYPES,
+    renames=NOTION_PROPERTY_NAMES,
+    refresh_interval=NOTION_SCHEMA_REFRESH
+)
+
+# Books already in Notion preload the lookup and cover caches while the index is built
+NOTION_WARMUP_ENABLED = os.environ.get('NOTION_WARMUP_ENABLED', 'true').lower() not in ['0', 'false', 'no']
+NOTION_WARMUP_MAX_BOOKS = int(os.environ.get('NOTION_WARMUP_MAX_BOOKS', 5000))
+
+notion_isbn_index = NotionIsbnIndex(
+    notion_api,
+    f"{upstream.notion_url}/databases/{NOTION_DATABASE_ID}",
+    key_fn=canonical_or_none,
+    isbn_property=NOTION_PROPERTY_NAMES.get('ISBN', 'ISBN'),
+    on_page=lambda isbn, page: warm_caches_from_page(isbn, page)
+)
+notion_warmup_stats = {'pages_seen': 0, 'books_cached': 0, 'covers_cached': 0}
+
+# Server-side barcode decoding
+BARCODE_MAX_IMAGE_BYTES = int(os.environ.get('BARCODE_MAX_IMAGE_BYTES', 10 * 1024 * 1024))
+
+# Bulk import limits
+BULK_IMPORT_CONCURRENCY = int(os.environ.get('BULK_IMPORT_CONCURRENCY', 4))
+BULK_IMPORT_MAX_ITEMS = int(os.environ.get('BULK_IMPORT_MAX_ITEMS', 5000))
+
+# Offline scan sync batches from the frontend
+SYNC_MAX_ITEMS = int(os.environ.get('SYNC_MAX_ITEMS', 50))
+SYNC_RESULT_TTL = int(os.environ.get('SYNC_RESULT_TTL', 24 * 3600))
+SYNC_RESULT_MAX_ENTRIES = int(os.environ.get('SYNC_RESULT_MAX_ENTRIES', 5000))
+
+# Final results per client item id, so a resent batch gets them back instead of saving again
+sync_results = TTLCache(maxsize=SYNC_RESULT_MAX_ENTRIES, ttl=SYNC_RESULT_TTL)
+sync_item_flights = SingleFlight()
+
+# Scanner timings reported by the frontend, summarized per device class on GET /telemetry
+TELEMETRY_ENABLED = os.environ.get('TELEMETRY_ENABLED', 'true').lower() not in ['0', 'false', 'no']
+TELEMETRY_MAX_EVENTS = int(os.environ.get('TELEMETRY_MAX_EVENTS', 100))
+TELEMETRY_WINDOW = int(os.environ.get('TELEMETRY_WINDOW', 1000))
+TELEMETRY_MAX_DEVICE_CLASSES = int(os.environ.get('TELEMETRY_MAX_DEVICE_CLASSES', 100))
+
+client_telemetry = ClientTelemetry(window=TELEMETRY_WINDOW, max_classes=TELEMETRY_MAX_DEVICE_CLASSES)
+client_telemetry_events = metrics_registry.counter(
+    'book_scanner_client_telemetry_events_total', 'Scanner timings reported by the frontend, by metric',
+    ['metric'])
+
+# Book metadata providers, queried in order with hedged requests
+LOCAL_BOOKS_FILE = os.environ.get('LOCAL_BOOKS_FILE', '')
+BOOK_PROVIDERS = os.environ.get('BOOK_PROVIDERS', 'local,google,openlibrary' if LOCAL_BOOKS_FILE else 'google,openlibrary')
+PROVIDER_HEDGE_DELAY = float(os.environ.get('PROVIDER_HEDGE_DELAY', 1.0))
+PROVIDER_MIN_HEDGE_DELAY = float(os.environ.get('PROVIDER_MIN_HEDGE_DELAY', 0.2))
+PROVIDER_MAX_HEDGE_DELAY = float(os.environ.get('PROVIDER_MAX_HEDGE_DELAY', 3.0))
+PROVIDER_MERGE_WINDOW = float(os.environ.get('PROVIDER_MERGE_WINDOW', 0.3))
+PROVIDER_TIMEOUT = float(os.environ.get('PROVIDER_TIMEOUT', 12))
+
+def build_book_providers(names):
+    """Create the configured metadata providers, in query order"""
+    providers = []
+    for name in [n.strip().lower() for n in names.split(',') if n.strip()]:
+        if name == 'google':
+            providers.append(GoogleBooksProvider(upstream.google_books, upstream.google_books_url, GOOGLE_BOOKS_API_KEY))
+        elif name == 'openlibrary':
+            providers.append(OpenLibraryProvider(upstream.open_library, upstream.open_library_url))
+        elif name == 'local' and LOCAL_BOOKS_FILE:
+            providers.append(LocalFileProvider(LOCAL_BOOKS_FILE, key_fn=canonical_or_none))
+        else:
+            logger.warning(f"Ignoring unknown or unconfigured book provider: {name}")
+    return providers
+
+book_lookup_engine = HedgedLookup(
+    build_book_providers(BOOK_PROVIDERS),
+    workers=UPSTREAM_POOL_SIZE,
+    default_hedge_delay=PROVIDER_HEDGE_DELAY,
+    min_hedge_delay=PROVIDER_MIN_HEDGE_DELAY,
+    max_hedge_delay=PROVIDER_MAX_HEDGE_DELAY,
+    merge_window=PROVIDER_MERGE_WINDOW,
+    timeout=PROVIDER_TIMEOUT
+)
+
+# Concurrent probing of cover image candidates
+COVER_PROBE_WORKERS = int(os.environ.get('COVER_PROBE_WORKERS', 8))
+COVER_PROBE_BUDGET = float(os.environ.get('COVER_PROBE_BUDGET', 3))
+OPEN_LIBRARY_COVERS_URL = os.environ.get('OPEN_LIBRARY_COVERS_URL', 'https://covers.openlibrary.org/b/isbn')
+
+cover_probe_executor = ThreadPoolExecutor(max_workers=COVER_PROBE_WORKERS, thread_name_prefix='cover-probe')
+cover_choices = TTLCache(maxsize=IMAGE_CACHE_MAX_ENTRIES, ttl=IMAGE_CACHE_TTL)
+
+# Optional local mirror of chosen covers, served from /covers/ at PUBLIC_BASE_URL
+COVER_MIRROR_ENABLED = os.environ.get('COVER_MIRROR_ENABLED', 'false').lower() in ['1', 'true', 'yes']
+COVER_MIRROR_DIR = os.environ.get('COVER_MIRROR_DIR', os.path.join(tempfile.gettempdir(), 'book_scanner_covers'))
+COVER_THUMBNAIL_WIDTHS = [int(w) for w in os.environ.get('COVER_THUMBNAIL_WIDTHS', '128,320,600').split(',') if w.strip()]
+COVER_NOTION_WIDTH = int(os.environ.get('COVER_NOTION_WIDTH', 600))
+COVER_MIRROR_MAX_BYTES = int(os.environ.get('COVER_MIRROR_MAX_BYTES', 5 * 1024 * 1024))
+PUBLIC_BASE_URL = os.environ.get('PUBLIC_BASE_URL', '').rstrip('/')
+
+cover_store = None
+if COVER_MIRROR_ENABLED and not PUBLIC_BASE_URL:
+    logger.warning("COVER_MIRROR_ENABLED needs PUBLIC_BASE_URL so Notion can reach the mirrored covers; mirroring disabled")
+elif COVER_MIRROR_ENABLED:
+    cover_store = CoverStore(
+        COVER_MIRROR_DIR,
+        upstream.images,
+        thumbnail_widths=COVER_THUMBNAIL_WIDTHS,
+        max_bytes=COVER_MIRROR_MAX_BYTES
+    )
+cover_mirror_flights = SingleFlight()
+
+# Background Notion writes for requests sent with "async": true
+NOTION_WRITE_WORKERS = int(os.environ.get('NOTION_WRITE_WORKERS', 2))
+NOTION_WRITE_QUEUE_SIZE = int(os.environ.get('NOTION_WRITE_QUEUE_SIZE', 1000))
+NOTION_JOB_TTL = int(os.environ.get('NOTION_JOB_TTL', 3600))
+
+notion_write_queue = NotionWriteQueue(
+    lambda book_data, **options: add_book_to_notion(book_data, **options),
+    workers=NOTION_WRITE_WORKERS,
+    max_queued=NOTION_WRITE_QUEUE_SIZE,
+    job_ttl=NOTION_JOB_TTL,
+    hold_fn=lambda: circuit_breakers.retry_after('notion')
+)
+
+# Batch saves (/add-manual-books): pages created at once, and the largest batch
+NOTION_BATCH_CONCURRENCY = int(os.environ.get('NOTION_BATCH_CONCURRENCY', 3))
+NOTION_BATCH_MAX_ITEMS = int(os.environ.get('NOTION_BATCH_MAX_ITEMS', 100))
+
+# Static assets (CSS, JS, vendored libraries) with content-hashed URLs
+STATIC_DIR = os.environ.get('STATIC_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'))
+QUAGGA_CDN_URL = 'https://cdnjs.cloudflare.com/ajax/libs/quagga/0.12.1/quagga.min.js'
+
+static_assets = StaticAssets(STATIC_DIR)
+
 # HTML template with Figma-inspired design
 HTML_TEMPLATE = '''
 <!DOCTYPE html>
@@ -24,367 +349,7 @@ HTML_TEMPLATE = '''
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Book Scanner</title>
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/quagga/0.12.1/quagga.min.js"></script>
-    <style>
-        :root {
-            --font-size: 14px;
-            --background: #ffffff;
-            --foreground: oklch(0.145 0 0);
-            --card: #ffffff;
-            --card-foreground: oklch(0.145 0 0);
-            --primary: #030213;
-            --primary-foreground: oklch(1 0 0);
-            --secondary: oklch(0.95 0.0058 264.53);
-            --secondary-foreground: #030213;
-            --muted: #ececf0;
-            --muted-foreground: #717182;
-            --accent: #e9ebef;
-            --accent-foreground: #030213;
-            --destructive: #d4183d;
-            --destructive-foreground: #ffffff;
-            --border: rgba(0, 0, 0, 0.1);
-            --input-background: #f3f3f5;
-            --font-weight-medium: 500;
-            --font-weight-normal: 400;
-            --radius: 0.625rem;
-        }
-
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            font-size: var(--font-size);
-            background-color: var(--background);
-            color: var(--foreground);
-            line-height: 1.5;
-            min-height: 100vh;
-            padding: 1rem;
-        }
-
-        .container {
-            max-width: 28rem;
-            margin: 0 auto;
-            space-y: 1.5rem;
-        }
-
-        .header {
-            text-align: center;
-            margin-bottom: 2rem;
-        }
-
-        .header-icon {
-            width: 3rem;
-            height: 3rem;
-            margin: 0 auto 1rem;
-            background: var(--primary);
-            border-radius: var(--radius);
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            color: var(--primary-foreground);
-        }
-
-        h1 {
-            font-size: 1.5rem;
-            font-weight: var(--font-weight-medium);
-            margin-bottom: 0.5rem;
-        }
-
-        .subtitle {
-            color: var(--muted-foreground);
-            font-size: 0.875rem;
-        }
-
-        .card {
-            background: var(--card);
-            border: 1px solid var(--border);
-            border-radius: var(--radius);
-            overflow: hidden;
-            margin-bottom: 1rem;
-            transition: all 0.2s ease;
-        }
-
-        .card:hover {
-            background: var(--accent);
-        }
-
-        .card-content {
-            padding: 1.5rem;
-        }
-
-        .option-card {
-            cursor: pointer;
-            display: flex;
-            align-items: center;
-            gap: 1rem;
-        }
-
-        .option-icon {
-            width: 3rem;
-            height: 3rem;
-            background: oklch(0.95 0.02 264.53);
-            border-radius: var(--radius);
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            color: var(--primary);
-            flex-shrink: 0;
-        }
-
-        .option-content h3 {
-            font-weight: var(--font-weight-medium);
-            margin-bottom: 0.25rem;
-        }
-
-        .option-content p {
-            color: var(--muted-foreground);
-            font-size: 0.875rem;
-        }
-
-        .scanner-header {
-            display: flex;
-            align-items: center;
-            gap: 1rem;
-            margin-bottom: 1.5rem;
-        }
-
-        .back-button {
-            width: 2rem;
-            height: 2rem;
-            background: none;
-            border: none;
-            border-radius: 0.375rem;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            color: var(--muted-foreground);
-            cursor: pointer;
-            transition: background-color 0.2s;
-        }
-
-        .back-button:hover {
-            background: var(--muted);
-        }
-
-        .scanner-title {
-            font-size: 1.25rem;
-            font-weight: var(--font-weight-medium);
-        }
-
-        .input-group {
-            margin-bottom: 1rem;
-        }
-
-        label {
-            display: block;
-            font-weight: var(--font-weight-medium);
-            margin-bottom: 0.5rem;
-            color: var(--foreground);
-        }
-
-        input[type="text"], input[type="number"], textarea {
-            width: 100%;
-            padding: 0.75rem;
-            background: var(--input-background);
-            border: 1px solid var(--border);
-            border-radius: var(--radius);
-            font-size: inherit;
-            transition: all 0.2s;
-            font-family: inherit;
-        }
-
-        input[type="text"]:focus, input[type="number"]:focus, textarea:focus {
-            outline: none;
-            border-color: var(--primary);
-            background: var(--background);
-        }
-
-        textarea {
-            resize: vertical;
-            min-height: 4rem;
-        }
-
-        .button {
-            display: inline-flex;
-            align-items: center;
-            justify-content: center;
-            gap: 0.5rem;
-            padding: 0.75rem 1.5rem;
-            background: var(--primary);
-            color: var(--primary-foreground);
-            border: none;
-            border-radius: var(--radius);
-            font-weight: var(--font-weight-medium);
-            cursor: pointer;
-            transition: all 0.2s;
-            width: 100%;
-            margin-bottom: 0.75rem;
-        }
-
-        .button:hover {
-            opacity: 0.9;
-            transform: translateY(-1px);
-        }
-
-        .button:disabled {
-            opacity: 0.5;
-            cursor: not-allowed;
-            transform: none;
-        }
-
-        .button-secondary {
-            background: var(--secondary);
-            color: var(--secondary-foreground);
-        }
-
-        #scanner-container {
-            display: none;
-            margin: 1.5rem 0;
-        }
-
-        .scanner-overlay {
-            position: relative;
-            aspect-ratio: 4/3;
-            background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%);
-            border-radius: var(--radius);
-            display: flex;
-            flex-direction: column;
-            align-items: center;
-            justify-content: center;
-            gap: 1rem;
-            border: 1px solid var(--border);
-        }
-
-        .scanner-frame {
-            width: 12rem;
-            height: 8rem;
-            border: 2px dashed var(--primary);
-            border-radius: 0.5rem;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-        }
-
-        .scanner-icon {
-            width: 2rem;
-            height: 2rem;
-            color: var(--primary);
-        }
-
-        .scanner-progress {
-            width: 12rem;
-            height: 0.5rem;
-            background: var(--muted);
-            border-radius: 0.25rem;
-            overflow: hidden;
-        }
-
-        .scanner-progress-bar {
-            height: 100%;
-            background: var(--primary);
-            transition: width 0.2s;
-            border-radius: 0.25rem;
-        }
-
-        .result {
-            padding: 1rem;
-            border-radius: var(--radius);
-            margin: 1rem 0;
-        }
-
-        .result-success {
-            background: #d1f7c4;
-            color: #15803d;
-            border: 1px solid #bbf7d0;
-        }
-
-        .result-error {
-            background: #fee2e2;
-            color: #dc2626;
-            border: 1px solid #fecaca;
-        }
-
-        .result-loading {
-            background: #fef3c7;
-            color: #d97706;
-            border: 1px solid #fed7aa;
-        }
-
-        .book-preview {
-            display: flex;
-            gap: 1rem;
-            margin: 1rem 0;
-            padding: 1rem;
-            background: var(--card);
-            border: 1px solid var(--border);
-            border-radius: var(--radius);
-        }
-
-        .book-cover {
-            width: 4rem;
-            height: 6rem;
-            background: var(--muted);
-            border-radius: 0.375rem;
-            object-fit: cover;
-            flex-shrink: 0;
-        }
-
-        .book-cover-placeholder {
-            width: 4rem;
-            height: 6rem;
-            background: var(--muted);
-            border-radius: 0.375rem;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            color: var(--muted-foreground);
-            font-size: 0.75rem;
-            text-align: center;
-        }
-
-        .book-info h3 {
-            font-weight: var(--font-weight-medium);
-            margin-bottom: 0.25rem;
-            line-height: 1.4;
-        }
-
-        .book-info p {
-            color: var(--muted-foreground);
-            font-size: 0.875rem;
-            margin-bottom: 0.25rem;
-        }
-
-        .animate-pulse {
-            animation: pulse 1s ease-in-out infinite;
-        }
-
-        .animate-spin {
-            animation: spin 1s linear infinite;
-        }
-
-        @keyframes pulse {
-            0%, 100% { opacity: 1; }
-            50% { opacity: 0.5; }
-        }
-
-        @keyframes spin {
-            from { transform: rotate(0deg); }
-            to { transform: rotate(360deg); }
-        }
-
-        @media (max-width: 640px) {
-            body {
-                padding: 0.75rem;
-            }
-            .card-content {
-                padding: 1rem;
-            }
-        }
-    </style>
+    <link rel="stylesheet" href="{{ asset_url('css/app.css') }}">
 </head>
 <body>
     <div class="container">
@@ -474,6 +439,11 @@ HTML_TEMPLATE = '''
 
             <div id="scanner-container"></div>
 
+            <label class="continuous-toggle">
+                <input type="checkbox" id="continuous-scan">
+                Scan a stack: keep the camera on and collect books
+            </label>
+
             <button class="button" onclick="startScanning()" id="scan-button">
                 <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
                     <path d="M14.5 4h-5L7 7H4a2 2 0 0 0-2 2v9a2 2 0 0 0 2 2h16a2 2 0 0 0 2-2V9a2 2 0 0 0-2-2h-3l-2.5-3z"></path>
@@ -482,6 +452,16 @@ HTML_TEMPLATE = '''
                 Start Scanning
             </button>
 
+            <input type="file" id="photo-input" accept="image/*" capture="environment" style="display: none;" onchange="decodePhoto(this)">
+            <button class="button button-secondary" onclick="document.getElementById('photo-input').click()" id="photo-button">
+                <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
+                    <rect x="3" y="3" width="18" height="18" rx="2" ry="2"></rect>
+                    <circle cx="8.5" cy="8.5" r="1.5"></circle>
+                    <path d="M21 15l-5-5L5 21"></path>
+                </svg>
+                Take Photo of Barcode
+            </button>
+
             <button class="button" onclick="addToNotion()" id="add-notion-scanner-button" style="display: none;">
                 <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
                     <path d="M12 5v14"></path>
@@ -490,6 +470,11 @@ HTML_TEMPLATE = '''
                 Add to Notion Library
             </button>
 
+            <div id="scan-batch" class="scan-batch" style="display: none;">
+                <div id="scan-batch-list"></div>
+                <button class="button" onclick="saveScanBatch()" id="scan-batch-save-button"></button>
+            </div>
+
             <p style="text-align: center; color: var(--muted-foreground); font-size: 0.875rem;">
                 Point your camera at the book's barcode
             </p>
@@ -598,6 +583,23 @@ HTML_TEMPLATE = '''
                         </svg>
                         Add Book to Notion
                     </button>
+
+                    <button class="button button-secondary" onclick="addManualBookToBatch()" id="manual-batch-add-button" style="margin-top: 0.75rem;">
+                        <svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
+                            <path d="M8 6h13"></path>
+                            <path d="M8 12h13"></path>
+                            <path d="M8 18h13"></path>
+                            <path d="M3 6h.01"></path>
+                            <path d="M3 12h.01"></path>
+                            <path d="M3 18h.01"></path>
+                        </svg>
+                        Add to Batch &amp; Enter Another
+                    </button>
+
+                    <div id="manual-batch" class="manual-batch" style="display: none;">
+                        <div id="manual-batch-list"></div>
+                        <button class="button" onclick="saveManualBatch()" id="manual-batch-save-button"></button>
+                    </div>
                 </div>
             </div>
 
@@ -606,482 +608,74 @@ HTML_TEMPLATE = '''
             </div>
         </div>
 
+        <!-- Offline scans waiting to sync -->
+        <div id="sync-status" class="sync-status" style="display: none;"></div>
+
         <!-- Results -->
         <div id="results"></div>
     </div>
 
-    <script>
-        var scanner = null;
-        var currentBook = null;
-        var scannerInitialized = false;
-
-        function showHome() {
-            document.getElementById('home-view').style.display = 'block';
-            document.getElementById('scanner-view').style.display = 'none';
-            document.getElementById('manual-view').style.display = 'none';
-            document.getElementById('manual-book-form').style.display = 'none';
-            stopScanner();
-            clearResults();
-        }
-
-        function showScanner() {
-            document.getElementById('home-view').style.display = 'none';
-            document.getElementById('scanner-view').style.display = 'block';
-            document.getElementById('manual-view').style.display = 'none';
-            document.getElementById('manual-book-form').style.display = 'none';
-            clearResults();
-        }
-
-        function showManualEntry() {
-            document.getElementById('home-view').style.display = 'none';
-            document.getElementById('scanner-view').style.display = 'none';
-            document.getElementById('manual-view').style.display = 'block';
-            document.getElementById('manual-book-form').style.display = 'none';
-            clearResults();
-            document.getElementById('isbn-input').value = '';
-        }
-
-        function showManualBookForm() {
-            document.getElementById('home-view').style.display = 'none';
-            document.getElementById('scanner-view').style.display = 'none';
-            document.getElementById('manual-view').style.display = 'none';
-            document.getElementById('manual-book-form').style.display = 'block';
-            clearManualForm();
-        }
-
-        function hideManualBookForm() {
-            var isbn = document.getElementById('isbn-input').value.trim();
-            if (isbn) {
-                showManualEntry();
-            } else {
-                showHome();
-            }
-        }
-
-        function clearManualForm() {
-            document.getElementById('manual-title').value = '';
-            document.getElementById('manual-author').value = '';
-            document.getElementById('manual-isbn').value = '';
-            document.getElementById('manual-publisher').value = '';
-            document.getElementById('manual-published-date').value = '';
-            document.getElementById('manual-page-count').value = '';
-            document.getElementById('manual-categories').value = '';
-            document.getElementById('manual-description').value = '';
-            
-            var addButton = document.getElementById('manual-add-button');
-            addButton.disabled = false;
-            addButton.innerHTML = '<svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M12 5v14"></path><path d="M5 12h14"></path></svg>Add Book to Notion';
-        }
-
-        function clearResults() {
-            document.getElementById('results').innerHTML = '';
-            currentBook = null;
-            resetAddNotionButton();
-        }
-
-        function resetAddNotionButton() {
-            var addButton = document.getElementById('add-notion-button');
-            addButton.style.display = 'none';
-            addButton.disabled = false;
-            addButton.innerHTML = '<svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M12 5v14"></path><path d="M5 12h14"></path></svg>Add to Notion Library';
-            
-            var scannerButton = document.getElementById('add-notion-scanner-button');
-            scannerButton.style.display = 'none';
-            scannerButton.disabled = false;
-            scannerButton.innerHTML = '<svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M12 5v14"></path><path d="M5 12h14"></path></svg>Add to Notion Library';
-        }
-
-        function handleEnterKey(event) {
-            if (event.key === 'Enter') {
-                lookupBook();
-            }
-        }
-
-        function startScanning() {
-            var container = document.getElementById('scanner-container');
-            var overlay = document.getElementById('scanner-overlay');
-            var scanButton = document.getElementById('scan-button');
-            var status = document.getElementById('scanner-status');
-            var progress = document.getElementById('scanner-progress');
-
-            if (typeof Quagga === 'undefined') {
-                showResult('Camera scanner not available. Please use manual ISBN entry instead.', 'error');
-                return;
-            }
-
-            container.style.display = 'block';
-            overlay.style.display = 'none';
-            progress.style.display = 'block';
-            scanButton.disabled = true;
-            scanButton.innerHTML = '<svg class="animate-spin" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M21 12a9 9 0 11-6.219-8.56"/></svg>Starting...';
-            status.textContent = 'Starting camera...';
-
-            if (navigator.mediaDevices && navigator.mediaDevices.getUserMedia) {
-                Quagga.init({
-                    inputStream: {
-                        name: "Live",
-                        type: "LiveStream",
-                        target: container,
-                        constraints: {
-                            width: 400,
-                            height: 300,
-                            facingMode: "environment"
-                        },
-                    },
-                    locator: {
-                        patchSize: "medium",
-                        halfSample: true
-                    },
-                    numOfWorkers: 2,
-                    decoder: {
-                        readers: ["ean_reader", "ean_8_reader", "code_128_reader", "code_39_reader", "codabar_reader"]
-                    },
-                    locate: true
-                }, function(err) {
-                    if (err) {
-                        console.error('Quagga init error:', err);
-                        showResult('Camera error: ' + err.message + '. Please try manual entry.', 'error');
-                        resetScanButton();
-                        overlay.style.display = 'flex';
-                        container.style.display = 'none';
-                        return;
-                    }
-                    
-                    console.log('Quagga initialized successfully');
-                    Quagga.start();
-                    status.textContent = 'Camera ready! Point at a barcode.';
-                    simulateProgress();
-                    scannerInitialized = true;
-                });
-
-                Quagga.onDetected(function(result) {
-                    var isbn = result.codeResult.code;
-                    console.log('Barcode detected:', isbn);
-                    document.getElementById('isbn-input').value = isbn;
-                    stopScanner();
-                    showResult('Barcode detected: ' + isbn, 'success');
-                    setTimeout(function() {
-                        lookupBookByISBN(isbn, 'scanner');
-                    }, 1000);
-                });
-            } else {
-                showResult('Camera not supported. Please use manual entry.', 'error');
-                resetScanButton();
-                overlay.style.display = 'flex';
-                container.style.display = 'none';
-            }
-        }
-
-        function simulateProgress() {
-            var progressBar = document.getElementById('progress-bar');
-            var width = 0;
-            var interval = setInterval(function() {
-                if (width >= 100 || !scannerInitialized) {
-                    clearInterval(interval);
-                    return;
-                }
-                width += Math.random() * 10;
-                if (width > 100) width = 100;
-                progressBar.style.width = width + '%';
-            }, 200);
-        }
-
-        function stopScanner() {
-            try {
-                if (typeof Quagga !== 'undefined' && Quagga.stop) {
-                    Quagga.stop();
-                }
-            } catch (e) {
-                console.log('Error stopping scanner:', e);
-            }
-            
-            scannerInitialized = false;
-            document.getElementById('scanner-container').style.display = 'none';
-            document.getElementById('scanner-overlay').style.display = 'flex';
-            document.getElementById('scanner-progress').style.display = 'none';
-            resetScanButton();
-        }
-
-        function resetScanButton() {
-            var scanButton = document.getElementById('scan-button');
-            scanButton.disabled = false;
-            scanButton.innerHTML = '<svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M14.5 4h-5L7 7H4a2 2 0 0 0-2 2v9a2 2 0 0 0 2 2h16a2 2 0 0 0 2-2V9a2 2 0 0 0-2-2h-3l-2.5-3z"></path><circle cx="12" cy="13" r="3"></circle></svg>Start Scanning';
-            document.getElementById('scanner-status').textContent = 'Position barcode within the frame';
-            document.getElementById('progress-bar').style.width = '0%';
-        }
-
-        function lookupBook() {
-            var isbn = document.getElementById('isbn-input').value.trim();
-            if (!isbn) {
-                showResult('Please enter an ISBN', 'error');
-                return;
-            }
-
-            if (!isValidISBN(isbn)) {
-                showResult('Invalid ISBN format. Please enter 10 or 13 digits.', 'error');
-                return;
-            }
-
-            lookupBookByISBN(isbn, 'manual');
-        }
-
-        function lookupBookByISBN(isbn, source) {
-            showResult('Looking up book details...', 'loading');
-            resetAddNotionButton();
-            
-            fetch('/test-isbn', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({isbn: isbn})
-            })
-            .then(function(response) {
-                return response.json();
-            })
-            .then(function(result) {
-                if (result.success) {
-                    currentBook = result;
-                    displayBook(result);
-                    
-                    if (source === 'scanner') {
-                        document.getElementById('add-notion-scanner-button').style.display = 'inline-flex';
-                    } else {
-                        document.getElementById('add-notion-button').style.display = 'inline-flex';
-                    }
-                } else {
-                    showBookNotFoundResult(result.error, source);
-                }
-            })
-            .catch(function(error) {
-                showResult('Network error: ' + error.message, 'error');
-            });
-        }
-
-        function showBookNotFoundResult(error, source) {
-            var results = document.getElementById('results');
-            var html = '<div class="result result-error">' +
-                '<strong>Book Not Found</strong>' +
-                '<p>' + error + '</p>' +
-                '<button class="button button-secondary" onclick="showManualBookForm()" style="margin-top: 1rem; width: auto; display: inline-flex;">' +
-                '<svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">' +
-                '<path d="M12 5v14"></path>' +
-                '<path d="M5 12h14"></path>' +
-                '</svg>' +
-                'Add Book Manually' +
-                '</button>' +
-                '</div>';
-            
-            results.innerHTML = html;
-        }
-
-        function addToNotion() {
-            if (!currentBook) {
-                showResult('No book selected', 'error');
-                return;
-            }
-
-            var addButton = document.getElementById('add-notion-button');
-            var scannerAddButton = document.getElementById('add-notion-scanner-button');
-            var activeButton = addButton.style.display !== 'none' ? addButton : scannerAddButton;
-
-            activeButton.disabled = true;
-            activeButton.innerHTML = '<svg class="animate-spin" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M21 12a9 9 0 11-6.219-8.56"/></svg>Adding to Notion...';
-
-            fetch('/test-isbn', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({
-                    isbn: currentBook.isbn,
-                    save_to_notion: true
-                })
-            })
-            .then(function(response) {
-                return response.json();
-            })
-            .then(function(result) {
-                if (result.success && result.saved_to_notion) {
-                    displayBookWithNotion(result, true);
-                    activeButton.innerHTML = '<svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M20 6L9 17l-5-5"></path></svg>Added to Notion!';
-                    activeButton.disabled = true;
-                } else {
-                    showResult('Failed to add to Notion. Please check your configuration.', 'error');
-                    activeButton.disabled = false;
-                    activeButton.innerHTML = '<svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M12 5v14"></path><path d="M5 12h14"></path></svg>Add to Notion Library';
-                }
-            })
-            .catch(function(error) {
-                showResult('Network error: ' + error.message, 'error');
-                activeButton.disabled = false;
-                activeButton.innerHTML = '<svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M12 5v14"></path><path d="M5 12h14"></path></svg>Add to Notion Library';
-            });
-        }
-
-        function addManualBookToNotion() {
-            var title = document.getElementById('manual-title').value.trim();
-            var author = document.getElementById('manual-author').value.trim();
-            
-            if (!title || !author) {
-                showResult('Please fill in the required fields (Title and Author)', 'error');
-                return;
-            }
-
-            var manualBook = {
-                title: title,
-                author: author,
-                isbn: document.getElementById('manual-isbn').value.trim() || 'Manual Entry',
-                publisher: document.getElementById('manual-publisher').value.trim(),
-                published_date: document.getElementById('manual-published-date').value.trim(),
-                page_count: parseInt(document.getElementById('manual-page-count').value) || null,
-                categories: document.getElementById('manual-categories').value.trim(),
-                description: document.getElementById('manual-description').value.trim(),
-                language: 'en',
-                cover_image: null
-            };
-
-            var addButton = document.getElementById('manual-add-button');
-            addButton.disabled = true;
-            addButton.innerHTML = '<svg class="animate-spin" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M21 12a9 9 0 11-6.219-8.56"/></svg>Adding to Notion...';
-
-            fetch('/add-manual-book', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify(manualBook)
-            })
-            .then(function(response) {
-                return response.json();
-            })
-            .then(function(result) {
-                if (result.success) {
-                    showResult('Successfully added "' + manualBook.title + '" to your Notion library!', 'success');
-                    addButton.innerHTML = '<svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M20 6L9 17l-5-5"></path></svg>Added to Notion!';
-                    addButton.disabled = true;
-                } else {
-                    showResult('Failed to add book: ' + result.error, 'error');
-                    addButton.disabled = false;
-                    addButton.innerHTML = '<svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M12 5v14"></path><path d="M5 12h14"></path></svg>Add Book to Notion';
-                }
-            })
-            .catch(function(error) {
-                showResult('Network error: ' + error.message, 'error');
-                addButton.disabled = false;
-                addButton.innerHTML = '<svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M12 5v14"></path><path d="M5 12h14"></path></svg>Add Book to Notion';
-            });
-        }
-
-        function isValidISBN(isbn) {
-            var cleaned = isbn.replace(/[-\\s]/g, '');
-            return /^\\d{10}$|^\\d{13}$/.test(cleaned);
-        }
-
-        function showResult(message, type) {
-            var results = document.getElementById('results');
-            var className = 'result result-' + type;
-            results.innerHTML = '<div class="' + className + '">' + message + '</div>';
-        }
-
-        function displayBook(book) {
-            var results = document.getElementById('results');
-            var coverImg = book.cover_image ? 
-                '<img src="' + book.cover_image + '" alt="Cover" class="book-cover">' : 
-                '<div class="book-cover-placeholder">No Cover</div>';
-            
-            var html = '<div class="result result-success">' +
-                '<strong>Book Found!</strong>' +
-                '<div class="book-preview">' +
-                coverImg +
-                '<div class="book-info">' +
-                '<h3>' + book.title + '</h3>' +
-                '<p><strong>Author:</strong> ' + book.author + '</p>' +
-                '<p><strong>ISBN:</strong> ' + book.isbn + '</p>';
-                
-            if (book.publisher) {
-                html += '<p><strong>Publisher:</strong> ' + book.publisher + '</p>';
-            }
-            if (book.published_date) {
-                html += '<p><strong>Published:</strong> ' + book.published_date + '</p>';
-            }
-            if (book.page_count) {
-                html += '<p><strong>Pages:</strong> ' + book.page_count + '</p>';
-            }
-            
-            html += '</div></div></div>';
-            
-            results.innerHTML = html;
-        }
-
-        function displayBookWithNotion(book, saved) {
-            var results = document.getElementById('results');
-            var coverImg = book.cover_image ? 
-                '<img src="' + book.cover_image + '" alt="Cover" class="book-cover">' : 
-                '<div class="book-cover-placeholder">No Cover</div>';
-            
-            var message = saved ? 'Successfully added to your Notion library!' : 'Failed to save to Notion';
-            var statusClass = saved ? 'success' : 'error';
-            
-            var html = '<div class="result result-' + statusClass + '">' +
-                '<strong>' + message + '</strong>' +
-                '<div class="book-preview">' +
-                coverImg +
-                '<div class="book-info">' +
-                '<h3>' + book.title + '</h3>' +
-                '<p><strong>Author:</strong> ' + book.author + '</p>';
-                
-            if (book.publisher) {
-                html += '<p><strong>Publisher:</strong> ' + book.publisher + '</p>';
-            }
-            
-            html += '</div></div>';
-            
-            if (saved) {
-                html += '<p style="margin-top: 1rem; text-align: center; color: var(--muted-foreground); font-size: 0.875rem;">Check your Notion database to see the book!</p>';
-            }
-            
-            html += '</div>';
-            
-            results.innerHTML = html;
-        }
-
-        // Enhanced ISBN input handling
-        document.addEventListener('DOMContentLoaded', function() {
-            var isbnInput = document.getElementById('isbn-input');
-            
-            isbnInput.addEventListener('input', function() {
-                resetAddNotionButton();
-                currentBook = null;
-                document.getElementById('results').innerHTML = '';
-            });
-            
-            isbnInput.addEventListener('input', function(e) {
-                var value = e.target.value.replace(/\\D/g, '');
-                if (value.length <= 13) {
-                    e.target.value = value;
-                }
-            });
-        });
-
-        window.addEventListener('beforeunload', function() {
-            stopScanner();
-        });
-
-        document.addEventListener('visibilitychange', function() {
-            if (document.hidden) {
-                stopScanner();
-            }
-        });
-    </script>
+    {% if quagga_url %}
+    <script src="{{ quagga_url }}" defer></script>
+    {% endif %}
+    <script src="{{ asset_url('js/scan-queue.js') }}" id="scan-queue-script" defer></script>
+    <script src="{{ asset_url('js/telemetry.js') }}" defer></script>
+    <script src="{{ asset_url('js/app.js') }}" defer></script>
 </body>
 </html>
 '''
 
+def render_index_page():
+    """Render the main page once, precompressed; it only changes on deploy"""
+    if static_assets.has('vendor/quagga.min.js'):
+        quagga_url = static_assets.url('vendor/quagga.min.js')
+    else:
+        logger.warning("Vendored Quagga not found, loading it from the CDN")
+        quagga_url = QUAGGA_CDN_URL
+    
+    with app.app_context():
+        html = render_template_string(HTML_TEMPLATE, asset_url=static_assets.url, quagga_url=quagga_url)
+    return CompressedBody(html.encode('utf-8'), 'text/html; charset=utf-8')
+
+index_page = render_index_page()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.monotonic()
+    http_in_flight.inc()
+
+@app.after_request
+def record_request_metrics(response):
+    """Count the request and its latency (time to first byte for streamed responses)"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        http_in_flight.dec()
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        http_requests.inc(route=route, method=request.method, status=response.status_code)
+        http_request_duration.observe(time.monotonic() - started, route=route, method=request.method)
+    return response
+
 @app.route('/')
 def home():
     """Serve the main web interface"""
-    return HTML_TEMPLATE
+    # Revalidate on every load so a deploy is picked up; unchanged pages get a 304
+    return index_page.response(request, 'no-cache')
+
+@app.route('/assets/<path:filename>')
+def static_asset(filename):
+    """Serve a content-hashed static asset with long-lived caching"""
+    response = static_assets.serve(request, filename)
+    if response is None:
+        return jsonify({'success': False, 'error': 'Not found'}), 404
+    return response
+
+@app.route('/sw.js')
+def service_worker():
+    """Serve the service worker from the site root so it can control every page"""
+    response = static_assets.serve_unhashed(request, 'sw.js')
+    if response is None:
+        return jsonify({'success': False, 'error': 'Not found'}), 404
+    return response
 
 @app.route('/add-manual-book', methods=['POST'])
 def add_manual_book():
@@ -1089,256 +683,1122 @@ def add_manual_book():
     try:
         data = request.get_json()
         
-        # Validate required fields
-        if not data.get('title') or not data.get('author'):
-            return jsonify({'success': False, 'error': 'Title and Author are required'})
+        book_data, skip_duplicates, response = manual_book_request(data)
+        if response is None:
+            notion_result = add_book_to_notion(book_data, skip_duplicates=skip_duplicates)
+            response = manual_book_response(book_data, notion_result)
+        return jsonify(response)
+            
+    except Exception as e:
+        logger.error(f"Error adding manual book: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)})
+
+def manual_book_request(data):
+    """Validate an /add-manual-book request, returning (book_data, skip_duplicates, response)
+
+    ``response`` is the answer when no synchronous save is due: a validation
+    error, or the queued job when the save runs in the background. Otherwise
+    it's None and the caller saves the book and builds manual_book_response().
+    Shared with the ASGI app, which does the save asynchronously.
+    """
+    book_data, error = manual_book_from_request(data)
+    if error:
+        return None, None, {'success': False, 'error': error}
+    
+    skip_duplicates = data.get('skip_duplicates', SKIP_DUPLICATE_SAVES)
+    if data.get('async') or notion_unavailable():
+        return book_data, skip_duplicates, queue_notion_write(book_data, skip_duplicates=skip_duplicates)
+    return book_data, skip_duplicates, None
+
+def manual_book_from_request(data):
+    """Validate a manual entry and build its book data, returning (book_data, error)"""
+    # Validate required fields
+    if not data.get('title') or not data.get('author'):
+        return None, 'Title and Author are required'
+    
+    # Check if Notion is configured
+    if not is_notion_configured():
+        return None, 'Notion is not configured. Please check your environment variables.'
+    
+    # Create book data structure
+    return {
+        'title': data.get('title', '').strip(),
+        'author': data.get('author', '').strip(),
+        'isbn': data.get('isbn', '').strip() or 'Manual Entry',
+        'publisher': data.get('publisher', '').strip(),
+        'published_date': data.get('published_date', '').strip(),
+        'page_count': data.get('page_count'),
+        'categories': data.get('categories', '').strip(),
+        'description': data.get('description', '').strip(),
+        'language': 'en',
+        'cover_image': None
+    }, None
+
+def manual_book_response(book_data, notion_result):
+    """The /add-manual-book response for a finished Notion save"""
+    if notion_result and notion_result.get('duplicate'):
+        return {
+            'success': True,
+            'duplicate': True,
+            'message': f'"{book_data["title"]}" is already in your Notion library',
+            'notion_id': notion_result.get('id')
+        }
+    elif notion_result:
+        logger.info(f"Successfully added manual book to Notion: {book_data['title']}")
+        return {
+            'success': True,
+            'message': f'Successfully added "{book_data["title"]}" to your Notion library',
+            'notion_id': notion_result.get('id')
+        }
+    return {'success': False, 'error': 'Failed to add book to Notion database'}
+
+@app.route('/add-manual-books', methods=['POST'])
+def add_manual_books():
+    """Add many manually entered books to Notion in one request, with a result per book"""
+    try:
+        data = request.get_json()
+        entries = data.get('books') if isinstance(data, dict) else None
         
-        # Check if Notion is configured
+        if not isinstance(entries, list) or not entries:
+            return jsonify({'success': False, 'error': 'No books provided'})
+        if len(entries) > NOTION_BATCH_MAX_ITEMS:
+            return jsonify({'success': False, 'error': f'Too many books (maximum {NOTION_BATCH_MAX_ITEMS})'})
         if not is_notion_configured():
             return jsonify({'success': False, 'error': 'Notion is not configured. Please check your environment variables.'})
         
-        # Create book data structure
-        book_data = {
-            'title': data.get('title', '').strip(),
-            'author': data.get('author', '').strip(),
-            'isbn': data.get('isbn', '').strip() or 'Manual Entry',
-            'publisher': data.get('publisher', '').strip(),
-            'published_date': data.get('published_date', '').strip(),
-            'page_count': data.get('page_count'),
-            'categories': data.get('categories', '').strip(),
-            'description': data.get('description', '').strip(),
-            'language': 'en',
-            'cover_image': None
-        }
+        results = [None] * len(entries)
+        books, positions = [], []
+        for index, entry in enumerate(entries):
+            book_data, error = manual_book_from_request(entry if isinstance(entry, dict) else {})
+            if error:
+                results[index] = {'index': index, 'title': (entry or {}).get('title') if isinstance(entry, dict) else None,
+                                  'success': False, 'error': error}
+            else:
+                books.append(book_data)
+                positions.append(index)
         
-        # Add book to Notion
-        notion_result = add_book_to_notion(book_data)
+        skip_duplicates = data.get('skip_duplicates', SKIP_DUPLICATE_SAVES)
+        return jsonify(batch_save_response(results, books, positions, skip_duplicates))
         
-        if notion_result:
-            logger.info(f"Successfully added manual book to Notion: {book_data['title']}")
-            return jsonify({
-                'success': True,
-                'message': f'Successfully added "{book_data["title"]}" to your Notion library',
-                'notion_id': notion_result.get('id')
-            })
-        else:
-            return jsonify({'success': False, 'error': 'Failed to add book to Notion database'})
-            
     except Exception as e:
-        logger.error(f"Error adding manual book: {str(e)}")
+        logger.error(f"Error adding manual books: {str(e)}")
         return jsonify({'success': False, 'error': str(e)})
 
+def batch_save_response(results, books, positions, skip_duplicates):
+    """Save the valid books of a batch request and fill in their results at their original positions
+
+    ``results`` already holds the entries rejected before saving; ``positions``
+    maps each book to its index in the request.
+    """
+    for position, result in zip(positions, add_books_to_notion(books, skip_duplicates=skip_duplicates)):
+        result['index'] = position
+        if 'duplicate_of' in result:
+            result['duplicate_of'] = positions[result['duplicate_of']]
+        results[position] = result
+    
+    return {
+        'success': True,
+        'results': results,
+        'saved': sum(1 for r in results if r['success'] and not r.get('duplicate')),
+        'failed': sum(1 for r in results if not r['success'])
+    }
+
 @app.route('/test-isbn', methods=['POST'])
 def test_isbn():
     """Test Google Books API and optionally save to Notion"""
     try:
         data = request.get_json()
         isbn = data.get('isbn', '').strip()
-        save_to_notion = data.get('save_to_notion', False)
         
         if not isbn:
             return jsonify({'success': False, 'error': 'ISBN required'})
         
-        # Clean ISBN
-        isbn = isbn.replace('-', '').replace(' ', '').strip()
+        return jsonify(isbn_lookup_response(isbn, data))
         
-        # Test Google Books API
-        url = f"https://www.googleapis.com/books/v1/volumes?q=isbn:{isbn}"
-        if GOOGLE_BOOKS_API_KEY and GOOGLE_BOOKS_API_KEY not in ['', 'dummy_token']:
-            url += f"&key={GOOGLE_BOOKS_API_KEY}"
+    except Exception as e:
+        logger.error(f"Error: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/decode-barcode', methods=['POST'])
+def decode_barcode():
+    """Decode an EAN-13 barcode from an uploaded photo and look the book up"""
+    try:
+        if barcode_decoder is None:
+            return jsonify({'success': False, 'error': 'Barcode decoding is not available on this server'})
         
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
+        # Refuse oversized uploads before reading them; multipart bodies get room for their headers
+        if request.content_length is not None and request.content_length > BARCODE_MAX_IMAGE_BYTES + 64 * 1024:
+            return jsonify({'success': False, 'error': 'Image is too large'})
         
-        api_data = response.json()
+        if 'image' in request.files:
+            image_bytes = request.files['image'].read(BARCODE_MAX_IMAGE_BYTES + 1)
+            options = request.form.to_dict()
+        else:
+            image_bytes = request.stream.read(BARCODE_MAX_IMAGE_BYTES + 1)
+            options = request.args.to_dict()
         
-        if api_data.get('totalItems', 0) == 0:
-            return jsonify({'success': False, 'error': 'Book not found'})
+        if not image_bytes:
+            return jsonify({'success': False, 'error': 'Image required'})
+        if len(image_bytes) > BARCODE_MAX_IMAGE_BYTES:
+            return jsonify({'success': False, 'error': 'Image is too large'})
         
-        book_info = api_data['items'][0]['volumeInfo']
+        code = barcode_decoder.decode_ean13(image_bytes)
+        if not code:
+            return jsonify({'success': False, 'error': 'No barcode found in image'})
         
-        # Extract book information
-        book_data = {
-            'success': True,
-            'isbn': isbn,
-            'title': book_info.get('title', 'Unknown Title'),
-            'author': ', '.join(book_info.get('authors', ['Unknown Author'])),
-            'publisher': book_info.get('publisher', ''),
-            'published_date': book_info.get('publishedDate', ''),
-            'page_count': book_info.get('pageCount'),
-            'categories': ', '.join(book_info.get('categories', [])),
-            'description': book_info.get('description', '')[:200] + '...' if book_info.get('description', '') else '',
-            'language': book_info.get('language', 'en'),
-            'cover_image': None,
-            'saved_to_notion': False
-        }
+        logger.info(f"Decoded barcode from uploaded photo: {code}")
+        for flag in ['save_to_notion', 'async', 'skip_duplicates', 'bypass_cache']:
+            if flag in options:
+                options[flag] = options[flag].lower() in ['1', 'true', 'yes']
         
-        # Get cover image
-        image_links = book_info.get('imageLinks', {})
-        if image_links:
-            book_data['cover_image'] = (
-                image_links.get('large') or 
-                image_links.get('medium') or 
-                image_links.get('small') or 
-                image_links.get('thumbnail')
-            )
+        result = isbn_lookup_response(code, options)
+        result['barcode'] = code
+        return jsonify(result)
         
-        # Save to Notion if requested
-        if save_to_notion and is_notion_configured():
-            notion_result = add_book_to_notion(book_data)
-            if notion_result:
-                book_data['saved_to_notion'] = True
-                book_data['notion_id'] = notion_result.get('id')
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)})
+    except Exception as e:
+        logger.error(f"Error decoding barcode: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)})
+
+def isbn_lookup_response(isbn, options):
+    """Look up an ISBN and optionally save it, returning the /test-isbn response fields"""
+    isbn, error = canonical_lookup_isbn(isbn)
+    if error:
+        return error
+    
+    book, from_cache = lookup_book(isbn, bypass_cache=options.get('bypass_cache', False))
+    
+    book_data, skip_duplicates, response = lookup_response(book, isbn, from_cache, options)
+    if response is None:
+        record_lookup_save(book_data, add_book_to_notion(book_data, skip_duplicates=skip_duplicates))
+        response = book_data
+    return response
+
+def canonical_lookup_isbn(isbn):
+    """(canonical ISBN-13, None), or (None, error response) for an invalid ISBN"""
+    try:
+        return canonicalize(isbn), None
+    except InvalidISBN as e:
+        # Rejected locally: bad check digits and non-book barcodes never reach Google Books
+        return None, {'success': False, 'invalid_isbn': True, 'error': f'Invalid ISBN: {str(e)}'}
+
+def lookup_response(book, isbn, from_cache, options):
+    """The /test-isbn response for a finished lookup, as (book_data, skip_duplicates, response)
+
+    ``response`` is None when the options ask for a synchronous Notion save:
+    the caller saves book_data, passes the result to record_lookup_save() and
+    returns book_data. Otherwise the book is remembered for /save-book or its
+    save is queued, and ``response`` is final.
+    """
+    if not book:
+        return None, None, {'success': False, 'error': 'Book not found', 'isbn': isbn, 'from_cache': from_cache}
+    
+    book_data = book_lookup_fields(book, isbn, from_cache)
+    save_to_notion = options.get('save_to_notion', False) and is_notion_configured()
+    skip_duplicates = options.get('skip_duplicates', SKIP_DUPLICATE_SAVES)
+    
+    if save_to_notion and (options.get('async', False) or notion_unavailable()):
+        book_data.update(queue_notion_write(book, skip_duplicates=skip_duplicates))
+    elif save_to_notion:
+        return book_data, skip_duplicates, None
+    else:
+        remember_lookup(book, book_data)
+    return book_data, skip_duplicates, book_data
+
+def record_lookup_save(book_data, notion_result):
+    """Fill in the /test-isbn response fields after a synchronous Notion save"""
+    if notion_result and not notion_result.get('duplicate'):
+        book_data['saved_to_notion'] = True
+        book_data['notion_id'] = notion_result.get('id')
+
+def book_lookup_fields(book, isbn, from_cache):
+    """The /test-isbn response fields for a found book, before any save"""
+    book_data = dict(book)
+    book_data['success'] = True
+    book_data['saved_to_notion'] = False
+    book_data['from_cache'] = from_cache
+    book_data['existing_notion_id'] = notion_isbn_index.lookup(isbn)
+    book_data['duplicate'] = book_data['existing_notion_id'] is not None
+    return book_data
+
+def remember_lookup(book, book_data):
+    """Remember the lookup so /save-book can save it without another Google Books call"""
+    lookup_token = secrets.token_urlsafe(16)
+    pending_books.set(lookup_token, book)
+    book_data['lookup_token'] = lookup_token
+
+@app.route('/save-book', methods=['POST'])
+def save_book():
+    """Save a previously looked-up book to Notion using its lookup token"""
+    try:
+        data = request.get_json()
         
-        return jsonify(book_data)
+        book_data, skip_duplicates, response = save_book_request(data)
+        if response is None:
+            notion_result = add_book_to_notion(book_data, skip_duplicates=skip_duplicates)
+            record_saved_lookup(book_data, notion_result, data['lookup_token'])
+            response = book_data
+        return jsonify(response)
         
     except Exception as e:
-        logger.error(f"Error: {str(e)}")
+        logger.error(f"Error saving book: {str(e)}")
         return jsonify({'success': False, 'error': str(e)})
 
-def is_notion_configured():
-    """Check if Notion is configured"""
-    return (NOTION_TOKEN and NOTION_TOKEN not in ['', 'dummy_token'] and 
-            NOTION_DATABASE_ID and NOTION_DATABASE_ID not in ['', 'dummy_database_id'])
+def save_book_request(data):
+    """Resolve a /save-book request's lookup token, returning (book_data, skip_duplicates, response)
 
-def validate_and_optimize_image_url(url):
-    """Validate and optimize image URL for Notion compatibility"""
-    if not url:
-        return None
+    As with manual_book_request(), ``response`` is final unless a synchronous
+    save is due; then the caller saves book_data and calls record_saved_lookup().
+    """
+    lookup_token = data.get('lookup_token', '')
+    if not lookup_token:
+        return None, None, {'success': False, 'error': 'Lookup token required'}
+    
+    book = pending_books.get(lookup_token)
+    if book is None:
+        return None, None, {
+            'success': False,
+            'expired': True,
+            'error': 'Lookup has expired. Please look up the book again.'
+        }
+    
+    if not is_notion_configured():
+        return None, None, {'success': False, 'error': 'Notion is not configured. Please check your environment variables.'}
+    
+    book_data = dict(book)
+    book_data['success'] = True
+    book_data['saved_to_notion'] = False
+    
+    skip_duplicates = data.get('skip_duplicates', SKIP_DUPLICATE_SAVES)
+    if data.get('async') or notion_unavailable():
+        book_data.update(queue_notion_write(book, skip_duplicates=skip_duplicates))
+        return book_data, skip_duplicates, book_data
+    return book_data, skip_duplicates, None
+
+def record_saved_lookup(book_data, notion_result, lookup_token):
+    """Fill in the /save-book response fields after a Notion save, forgetting a saved lookup"""
+    if notion_result and notion_result.get('duplicate'):
+        book_data['duplicate'] = True
+        book_data['existing_notion_id'] = notion_result.get('id')
+    elif notion_result:
+        pending_books.pop(lookup_token)
+        book_data['saved_to_notion'] = True
+        book_data['notion_id'] = notion_result.get('id')
+        logger.info(f"Saved looked-up book to Notion: {book_data['title']}")
+
+@app.route('/save-books', methods=['POST'])
+def save_books():
+    """Save a batch of looked-up books (e.g. a scanned stack) to Notion, with a result per book"""
+    try:
+        data = request.get_json()
+        entries = data.get('books') if isinstance(data, dict) else None
+        
+        if not isinstance(entries, list) or not entries:
+            return jsonify({'success': False, 'error': 'No books provided'})
+        if len(entries) > NOTION_BATCH_MAX_ITEMS:
+            return jsonify({'success': False, 'error': f'Too many books (maximum {NOTION_BATCH_MAX_ITEMS})'})
+        if not is_notion_configured():
+            return jsonify({'success': False, 'error': 'Notion is not configured. Please check your environment variables.'})
         
+        results = [None] * len(entries)
+        books, positions, tokens = [], [], []
+        for index, entry in enumerate(entries):
+            entry = entry if isinstance(entry, dict) else {}
+            book, error = pending_books.get(entry.get('lookup_token') or ''), None
+            if book is None and entry.get('isbn'):
+                # The lookup expired; the book cache almost always still has it
+                try:
+                    book, _ = lookup_book(canonicalize(entry['isbn']))
+                except InvalidISBN as e:
+                    error = f'Invalid ISBN: {str(e)}'
+                except Exception as e:
+                    error = str(e)
+            if book is None:
+                results[index] = {'index': index, 'isbn': entry.get('isbn'), 'success': False,
+                                  'error': error or 'Book not found'}
+                continue
+            books.append(book)
+            positions.append(index)
+            tokens.append(entry.get('lookup_token'))
+        
+        skip_duplicates = data.get('skip_duplicates', SKIP_DUPLICATE_SAVES)
+        response = batch_save_response(results, books, positions, skip_duplicates)
+        for position, book, token in zip(positions, books, tokens):
+            results[position]['isbn'] = book.get('isbn')
+            if results[position]['success'] and token:
+                pending_books.pop(token)
+        return jsonify(response)
+        
+    except Exception as e:
+        logger.error(f"Error saving books: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Return the status of a queued Notion write"""
+    job = notion_write_queue.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'})
+    return jsonify({'success': True, 'job': job})
+
+@app.route('/jobs/status', methods=['POST'])
+def jobs_status():
+    """Return the status of several queued Notion writes at once"""
     try:
-        # Convert HTTP to HTTPS
-        if url.startswith('http://'):
-            url = url.replace('http://', 'https://')
+        data = request.get_json()
+        job_ids = data.get('job_ids', [])
         
-        # Optimize Google Books URLs
-        if 'books.google.com' in url:
-            # Request higher resolution
-            url = url.replace('zoom=1', 'zoom=0')
-            # Remove problematic parameters
-            url = url.replace('&edge=curl', '').replace('?edge=curl', '')
-            # Ensure we get the direct image
-            if '&img=1' not in url:
-                url += '&img=1'
+        if not isinstance(job_ids, list):
+            return jsonify({'success': False, 'error': 'job_ids must be a list'})
+        
+        return jsonify({
+            'success': True,
+            'jobs': {job_id: notion_write_queue.get(job_id) for job_id in job_ids}
+        })
         
-        # Test URL accessibility (with timeout)
-        response = requests.head(url, timeout=5, allow_redirects=True)
-        if response.status_code == 200:
-            # Check if it's actually an image
-            content_type = response.headers.get('content-type', '').lower()
-            if any(img_type in content_type for img_type in ['image/', 'jpeg', 'jpg', 'png', 'gif']):
-                logger.info(f"Image URL validated successfully: {url}")
-                return url
-            else:
-                logger.warning(f"URL does not return an image: {content_type}")
-        else:
-            logger.warning(f"Image URL returned status {response.status_code}: {url}")
-            
     except Exception as e:
-        logger.warning(f"Failed to validate image URL {url}: {str(e)}")
+        logger.error(f"Error reading job status: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)})
+
+def queue_notion_write(book_data, **options):
+    """Queue a Notion write and return the response fields describing the job"""
+    try:
+        job = notion_write_queue.submit(book_data, **options)
+    except queue.Full:
+        logger.warning(f"Notion write queue full, rejecting: {book_data.get('title')}")
+        return {'success': False, 'queued': False, 'error': 'Save queue is full. Please try again shortly.'}
     
-    return None
+    return {'success': True, 'queued': True, 'job_id': job['id'], 'job_status': job['status']}
 
-def add_book_to_notion(book_data):
-    """Add book to Notion database - working version with all columns"""
-    if not is_notion_configured():
-        logger.error("Notion not configured")
-        return None
+@app.route('/bulk-import', methods=['POST'])
+def bulk_import():
+    """Look up (and optionally save) many ISBNs, streaming per-item results as NDJSON"""
+    try:
+        isbns, save_to_notion, skip_duplicates = parse_bulk_import_request()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)})
+    
+    if not isbns:
+        return jsonify({'success': False, 'error': 'No ISBNs provided'})
+    if len(isbns) > BULK_IMPORT_MAX_ITEMS:
+        return jsonify({'success': False, 'error': f'Too many ISBNs (maximum {BULK_IMPORT_MAX_ITEMS})'})
+    if save_to_notion and not is_notion_configured():
+        return jsonify({'success': False, 'error': 'Notion is not configured. Please check your environment variables.'})
+    
+    logger.info(f"Bulk import of {len(isbns)} ISBNs (save_to_notion={save_to_notion})")
+    
+    def generate():
+        totals = {'total': len(isbns), 'found': 0, 'saved': 0, 'failed': 0}
+        executor = ThreadPoolExecutor(max_workers=BULK_IMPORT_CONCURRENCY)
+        try:
+            futures = {
+                executor.submit(process_bulk_item, isbn, save_to_notion, skip_duplicates): index
+                for index, isbn in enumerate(isbns)
+            }
+            for future in as_completed(futures):
+                item = future.result()
+                item['index'] = futures[future]
+                if item['success']:
+                    totals['found'] += 1
+                if item.get('error'):
+                    totals['failed'] += 1
+                if item.get('saved_to_notion'):
+                    totals['saved'] += 1
+                yield json.dumps(item) + '\n'
+        finally:
+            # Stop outstanding lookups if the client disconnects
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        totals['done'] = True
+        logger.info(f"Bulk import finished: {totals}")
+        yield json.dumps(totals) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def parse_bulk_import_request():
+    """Extract (isbns, save_to_notion, skip_duplicates) from a JSON, CSV body or CSV file upload"""
+    save_to_notion = request.args.get('save_to_notion', '').lower() in ['1', 'true', 'yes']
+    skip_duplicates = request.args.get('skip_duplicates', 'true').lower() in ['1', 'true', 'yes']
+    
+    if request.is_json:
+        data = request.get_json()
+        if isinstance(data, dict):
+            save_to_notion = bool(data.get('save_to_notion', save_to_notion))
+            skip_duplicates = bool(data.get('skip_duplicates', skip_duplicates))
+            data = data.get('isbns', [])
+        if not isinstance(data, list):
+            raise ValueError('Expected a list of ISBNs')
+        isbns = [str(isbn) for isbn in data]
+    else:
+        if 'file' in request.files:
+            text = request.files['file'].read().decode('utf-8-sig')
+        else:
+            text = request.get_data(as_text=True)
+        isbns = parse_isbn_csv(text)
     
+    isbns = [isbn.strip() for isbn in isbns]
+    return [isbn for isbn in isbns if isbn], save_to_notion, skip_duplicates
+
+def parse_isbn_csv(text):
+    """Read ISBNs from CSV text, using an "isbn" column if present, else the first column"""
+    rows = [row for row in csv.reader(io.StringIO(text)) if row]
+    if not rows:
+        return []
+    
+    header = [cell.strip().lower() for cell in rows[0]]
+    column = 0
+    for i, name in enumerate(header):
+        if 'isbn' in name:
+            column = i
+            rows = rows[1:]
+            break
+    
+    return [row[column] for row in rows if len(row) > column]
+
+def process_bulk_item(isbn, save_to_notion, skip_duplicates=True):
+    """Look up one ISBN for a bulk import and optionally save it to Notion"""
+    item = {'isbn': isbn, 'success': False, 'saved_to_notion': False}
     try:
-        url = "https://api.notion.com/v1/pages"
-        headers = {
-            "Authorization": f"Bearer {NOTION_TOKEN}",
-            "Content-Type": "application/json",
-            "Notion-Version": "2022-06-28"
-        }
+        isbn = item['isbn'] = canonicalize(isbn)
+        book, from_cache = lookup_book(isbn)
+        item['from_cache'] = from_cache
+        if not book:
+            item['error'] = 'Book not found'
+            return item
         
-        # Core automatic data from Google Books API
-        properties = {
-            "BookName": {"title": [{"text": {"content": book_data['title']}}]},
-            "ISBN": {"rich_text": [{"text": {"content": book_data['isbn']}}]},
-            "Author": {"rich_text": [{"text": {"content": book_data['author']}}]}
-        }
+        item['success'] = True
+        item['title'] = book['title']
+        item['author'] = book['author']
+        item['existing_notion_id'] = notion_isbn_index.lookup(isbn)
+        item['duplicate'] = item['existing_notion_id'] is not None
         
-        # Add Publisher (automatic)
-        if book_data.get('publisher'):
-            properties["Publisher"] = {"rich_text": [{"text": {"content": book_data['publisher']}}]}
+        if save_to_notion:
+            notion_result = add_book_to_notion(book, skip_duplicates=skip_duplicates)
+            if notion_result and notion_result.get('duplicate'):
+                item['duplicate'] = True
+                item['existing_notion_id'] = notion_result.get('id')
+            elif notion_result:
+                item['saved_to_notion'] = True
+                item['notion_id'] = notion_result.get('id')
+            else:
+                item['error'] = 'Failed to add book to Notion database'
+    except InvalidISBN as e:
+        item['invalid_isbn'] = True
+        item['error'] = f'Invalid ISBN: {str(e)}'
+    except Exception as e:
+        logger.error(f"Bulk import error for {isbn}: {str(e)}")
+        item['error'] = str(e)
+    
+    return item
+
+@app.route('/sync', methods=['POST'])
+def sync_scans():
+    """Save a batch of scans queued offline by the frontend, returning a result per item
+
+    Each item has a client ``id`` and either an ``isbn`` (looked up and saved)
+    or a manual ``book``. The final result of each id is remembered for
+    SYNC_RESULT_TTL, so a batch resent after a lost response gets the same
+    results back instead of creating the pages again.
+    """
+    try:
+        data = request.get_json()
+        items = data.get('items') if isinstance(data, dict) else None
         
-        # Add Page Count (automatic)
-        if book_data.get('page_count'):
-            properties["Page Count"] = {"number": book_data['page_count']}
+        if not isinstance(items, list) or not items:
+            return jsonify({'success': False, 'error': 'No items provided'})
+        if len(items) > SYNC_MAX_ITEMS:
+            return jsonify({'success': False, 'error': f'Too many items (maximum {SYNC_MAX_ITEMS})'})
+        if not is_notion_configured():
+            return jsonify({'success': False, 'error': 'Notion is not configured. Please check your environment variables.'})
         
-        # Add Cover images (both URL and Files & media types)
-        if book_data.get('cover_image'):
-            # Validate and optimize the image URL
-            validated_url = validate_and_optimize_image_url(book_data['cover_image'])
-            
-            if validated_url:
-                # Original Cover image as URL type
-                properties["Cover image"] = {"url": validated_url}
-                
-                # Create a clean filename
-                clean_title = "".join(c for c in book_data['title'] if c.isalnum() or c in (' ', '-', '_')).rstrip()
-                filename = f"{clean_title}_cover.jpg"
-                
-                # New Cover PNG as Files & media type with validated URL
-                properties["Cover PNG"] = {
-                    "files": [
-                        {
-                            "name": filename,
-                            "type": "external",
-                            "external": {
-                                "url": validated_url
-                            }
-                        }
-                    ]
-                }
-                
-                logger.info(f"Added validated cover image: {validated_url}")
-                logger.info(f"Cover filename: {filename}")
-            else:
-                logger.warning("Could not validate cover image URL, skipping cover images")
-        # Add Published Date (automatic)
-        if book_data.get('published_date'):
-            parsed_date = parse_date(book_data['published_date'])
-            if parsed_date:
-                properties["Published Date"] = {"date": {"start": parsed_date}}
+        skip_duplicates = data.get('skip_duplicates', True)
+        with ThreadPoolExecutor(max_workers=BULK_IMPORT_CONCURRENCY) as executor:
+            results = list(executor.map(lambda item: sync_item(item, skip_duplicates), items))
         
-        # Add Descriptions (automatic)
-        if book_data.get('description'):
-            properties["Descriptions"] = {"rich_text": [{"text": {"content": book_data['description']}}]}
+        logger.info(f"Synced {len(results)} offline scans, {sum(1 for r in results if r.get('error'))} failed")
+        return jsonify({
+            'success': True,
+            'results': results,
+            'saved': sum(1 for r in results if r.get('saved_to_notion')),
+            'failed': sum(1 for r in results if r.get('error'))
+        })
         
-        # Add Category (automatic)
-        if book_data.get('categories'):
-            properties["Category"] = {"rich_text": [{"text": {"content": book_data['categories']}}]}
+    except Exception as e:
+        logger.error(f"Error syncing scans: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)})
+
+def sync_item(item, skip_duplicates):
+    """process_sync_item(), once per client item id: repeats get the remembered result"""
+    item_id = item.get('id') if isinstance(item, dict) else None
+    if not isinstance(item_id, str) or not item_id:
+        return process_sync_item(item, skip_duplicates)
+    
+    cached = sync_results.get(item_id)
+    if cached is not None:
+        logger.info(f"Sync item {item_id} was already processed, returning its result")
+        return dict(cached)
+    # A resend arriving while the first batch is still running waits for its result
+    return dict(sync_item_flights.do(item_id, process_and_remember_sync_item, item, skip_duplicates))
+
+def process_and_remember_sync_item(item, skip_duplicates):
+    result = process_sync_item(item, skip_duplicates)
+    if not result.get('retryable'):
+        # Retryable failures stay unremembered so the client's retry runs them again
+        sync_results.set(item['id'], result)
+    return result
+
+def process_sync_item(item, skip_duplicates):
+    """Save one queued scan; ``retryable`` tells the client whether to keep it queued after a failure"""
+    if not isinstance(item, dict):
+        return {'success': False, 'error': 'Invalid item', 'retryable': False}
+    
+    if item.get('book'):
+        book = item['book'] if isinstance(item['book'], dict) else {}
+        book_data, error = manual_book_from_request(book)
+        if error:
+            result = {'success': False, 'error': error, 'retryable': False}
+        else:
+            notion_result = add_book_to_notion(book_data, skip_duplicates=skip_duplicates)
+            result = manual_book_response(book_data, notion_result)
+            result['title'] = book_data['title']
+            result['saved_to_notion'] = bool(result['success'] and not result.get('duplicate'))
+            result['retryable'] = not result['success']
+    elif item.get('isbn'):
+        result = process_bulk_item(str(item['isbn']), True, skip_duplicates)
+        # Unknown books and bad ISBNs won't succeed on a retry; Notion failures might
+        result['retryable'] = (bool(result.get('error')) and not result.get('invalid_isbn')
+                               and result['error'] != 'Book not found')
+    else:
+        result = {'success': False, 'error': 'Item needs an isbn or a book', 'retryable': False}
+    
+    result['id'] = item.get('id')
+    return result
+
+def lookup_book(isbn, bypass_cache=False):
+    """Look up book data by canonical ISBN-13, serving from the persistent cache when possible
+
+    Returns (book_data, from_cache); book_data is None if the book was not found.
+    A bypassed lookup still refreshes the cache with the fresh result. If every
+    provider fails, an expired cache entry is served rather than an error.
+    """
+    if not bypass_cache:
+        hit, cached_book = cached_lookup(isbn)
+        if hit:
+            return cached_book, True
+    
+    try:
+        return book_lookup_flights.do(isbn, fetch_and_cache_book, isbn), False
+    except Exception as e:
+        return stale_book_or_raise(isbn, e), True
+
+def cached_lookup(isbn):
+    """(hit, book_data) from the persistent cache; book_data is None for a cached "not found" """
+    hit, cached_book = book_cache.get(isbn)
+    count_cache_lookup('book', hit)
+    if hit:
+        logger.info(f"Book cache hit for ISBN {isbn}")
+    return hit, cached_book
+
+def stale_book_or_raise(isbn, error):
+    """The expired cache entry for an ISBN whose lookup failed, or re-raise the failure"""
+    hit, stale_book = book_cache.get_stale(isbn)
+    count_cache_lookup('book_stale', hit)
+    if not hit:
+        raise error
+    logger.warning(f"Lookup failed for ISBN {isbn} ({str(error)}), serving the expired cache entry")
+    return stale_book
+
+def fetch_and_cache_book(isbn):
+    """Fetch book data from the configured metadata providers and cache it"""
+    return cache_fetched_book(isbn, book_lookup_engine.lookup(isbn))
+
+def cache_fetched_book(isbn, book_data):
+    """Add the fallback cover to freshly fetched book data and store it (including not-found) in the cache"""
+    book_data = add_fallback_cover(book_data, isbn)
+    book_cache.set(isbn, book_data)
+    return book_data
+
+def add_fallback_cover(book_data, isbn):
+    """Append the Open Library covers URL as a last-resort cover candidate"""
+    if book_data is None:
+        return None
+    
+    if canonical_or_none(isbn):
+        # default=false makes Open Library return 404 instead of a blank placeholder
+        fallback_cover = f"{OPEN_LIBRARY_COVERS_URL}/{isbn}-L.jpg?default=false"
+        if fallback_cover not in book_data['cover_candidates']:
+            book_data['cover_candidates'].append(fallback_cover)
+    
+    return book_data
+
+def resolve_cover(book_data):
+    """Pick the best reachable cover for a book, probing all candidates concurrently
+
+    The highest-ranked candidate that validates within COVER_PROBE_BUDGET
+    seconds wins, and the choice is remembered per ISBN.
+    """
+    probe = CoverProbe(book_data)
+    if not probe.needed:
+        return probe.choice
+    
+    futures = {cover_probe_executor.submit(check_image_url, url): rank for rank, url in enumerate(probe.candidates)}
+    pending = set(futures)
+    while pending and not probe.best and probe.remaining() > 0:
+        done, pending = wait(pending, timeout=probe.remaining(), return_when=FIRST_COMPLETED)
+        for future in done:
+            probe.record(futures[future], *future.result())
+    
+    return probe.settle(probes_pending=bool(pending))
+
+def cover_candidates(book_data):
+    """Optimized cover URLs for a book, best first, and the key its chosen cover is remembered under"""
+    candidates = book_data.get('cover_candidates') or [book_data.get('cover_image')]
+    candidates = list(dict.fromkeys(optimize_image_url(url) for url in candidates if url))
+    return candidates, canonical_or_none(book_data.get('isbn')) or tuple(candidates)
+
+class CoverProbe:
+    """The decisions of one cover choice; resolve_cover() and the ASGI app only run the probes
+
+    ``needed`` is False when nothing has to be probed, with ``choice`` the
+    remembered cover (or None). Otherwise each probe's (validated_url,
+    failure_reason) is passed to record(), in any order, until ``best`` is
+    set or the COVER_PROBE_BUDGET runs out, and settle() returns the cover
+    to use.
+    """
+
+    def __init__(self, book_data):
+        self.book_data = book_data
+        self.candidates, self.choice_key = cover_candidates(book_data)
+        self.results = [None] * len(self.candidates)
+        self.unchecked = set()
+        self.deadline = time.monotonic() + COVER_PROBE_BUDGET
+        self.best = None
+        self.choice = None
+        self.needed = bool(self.candidates)
+        if self.needed:
+            remembered = cover_choices.get(self.choice_key)
+            count_cache_lookup('cover_choice', remembered is not None)
+            if remembered is not None:
+                self.needed = False
+                self.choice = remembered or None
+    
+    def remaining(self):
+        return self.deadline - time.monotonic()
+    
+    def record(self, rank, validated_url, reason=None):
+        self.results[rank] = validated_url or ''
+        if validated_url and reason:
+            # Passed unchecked because its host's breaker is open (see unchecked_cover)
+            self.unchecked.add(validated_url)
+        # The winner is the first candidate that validated once every better-ranked one failed
+        self.best = next((url for url in self.results if url is None or url), None)
+    
+    def settle(self, probes_pending):
+        """Fall back to any validated cover and remember the choice"""
+        best = self.best or next((url for url in self.results if url), None)
         
-        payload = {
-            "parent": {"database_id": NOTION_DATABASE_ID},
-            "properties": properties
-        }
+        if probes_pending and not best:
+            # Probes are still running; don't remember a miss that may only be slowness
+            logger.warning(f"No cover validated within {COVER_PROBE_BUDGET}s for {self.book_data.get('title')}")
+            return None
+        if best in self.unchecked:
+            # Not remembered, so the next save probes again once the host is back
+            return best
         
+        cover_choices.set(self.choice_key, best or '', ttl=IMAGE_CACHE_TTL if best else IMAGE_CACHE_FAILURE_TTL)
+        return best
+
+def find_mirrored_cover(book_data):
+    """(source_url, mirrored_url) if the book's top cover candidate is already mirrored, else (None, None)
+
+    A mirrored cover needs no validation probe: the local copy is known good.
+    """
+    if cover_store is None:
+        return None, None
+    
+    candidates, _ = cover_candidates(book_data)
+    if not candidates:
+        return None, None
+    record = cover_store.lookup(candidates[0])
+    count_cache_lookup('cover_mirror', record is not None)
+    if record is None:
+        return None, None
+    return candidates[0], mirrored_cover_url(record)
+
+def mirror_cover(url):
+    """Copy a validated cover into the local store and return its public URL, or None if mirroring is off or fails"""
+    if cover_store is None or not url:
+        return None
+    
+    try:
+        record = cover_mirror_flights.do(url, cover_store.mirror, url)
+    except CoverMirrorError as e:
+        logger.warning(f"Cover mirroring failed, linking the original: {str(e)}")
+        return None
+    return mirrored_cover_url(record)
+
+def mirrored_cover_url(record):
+    """Public URL of the stored file Notion should show: the COVER_NOTION_WIDTH thumbnail, or the original"""
+    name = record['thumbnails'].get(COVER_NOTION_WIDTH) or record['original']
+    return f"{PUBLIC_BASE_URL}/covers/{name}"
+
+def is_notion_configured():
+    """Check if Notion is configured"""
+    return (NOTION_TOKEN and NOTION_TOKEN not in ['', 'dummy_token'] and 
+            NOTION_DATABASE_ID and NOTION_DATABASE_ID not in ['', 'dummy_database_id'])
+
+def optimize_image_url(url):
+    """Rewrite an image URL into the form Notion handles best"""
+    # Convert HTTP to HTTPS
+    if IMAGE_FORCE_HTTPS and url.startswith('http://'):
+        url = url.replace('http://', 'https://')
+    
+    # Optimize Google Books URLs
+    if 'books.google.com' in url:
+        # Request higher resolution
+        url = url.replace('zoom=1', 'zoom=0')
+        # Remove problematic parameters
+        url = url.replace('&edge=curl', '').replace('?edge=curl', '')
+        # Ensure we get the direct image
+        if '&img=1' not in url:
+            url += '&img=1'
+    
+    return url
+
+def check_image_url(url):
+    """Optimize and validate an image URL, returning (validated_url, failure_reason)
+
+    Results are memoized by optimized URL; failures are kept for a shorter time.
+    """
+    url, cached = cached_image_check(url)
+    if cached is not None:
+        return cached
+    
+    return image_check_flights.do(url, probe_image_url, url)
+
+def cached_image_check(url):
+    """(optimized_url, memoized (validated_url, failure_reason)), the latter None if the URL needs a probe"""
+    if not url:
+        return None, (None, 'No URL')
+    
+    url = optimize_image_url(url)
+    
+    cached = image_validation_cache.get(url)
+    count_cache_lookup('image_validation', cached is not None)
+    return url, (cached['url'], cached['reason']) if cached is not None else None
+
+def probe_image_url(url):
+    """HEAD an optimized image URL and cache the (validated_url, failure_reason) outcome"""
+    try:
+        # Test URL accessibility (with timeout)
+        response = upstream.images.head(url, timeout=5, allow_redirects=True)
+    except Exception as e:
+        return image_check_failed(url, e)
+    return remember_image_check(url, *classify_image_response(url, response))
+
+def classify_image_response(url, response):
+    """(validated_url, failure_reason) for the response to an image HEAD request"""
+    if response.status_code != 200:
+        reason = f"Image URL returned status {response.status_code}"
+        logger.warning(f"{reason}: {url}")
+        return None, reason
+    
+    # Check if it's actually an image
+    content_type = response.headers.get('content-type', '').lower()
+    if any(img_type in content_type for img_type in ['image/', 'jpeg', 'jpg', 'png', 'gif']):
+        logger.info(f"Image URL validated successfully: {url}")
+        return url, None
+    
+    reason = f"URL does not return an image: {content_type}"
+    logger.warning(reason)
+    return None, reason
+
+def image_check_failed(url, error):
+    """The outcome of an image probe that raised: unchecked while the host's breaker is open, else a cached failure"""
+    if isinstance(error, CircuitOpenError):
+        return unchecked_cover(url, error)
+    logger.warning(f"Failed to validate image URL {url}: {str(error)}")
+    return remember_image_check(url, None, f"Failed to validate image URL: {str(error)}")
+
+def unchecked_cover(url, error):
+    """Use a cover unchecked while its host's circuit breaker is open
+
+    The reason set alongside the URL marks it as unchecked. Neither the
+    outcome nor a cover choice based on it is cached, so the cover is
+    checked once the host is back.
+    """
+    logger.warning(f"Skipping cover check for {url}: {str(error)}")
+    return url, f"Not checked: {str(error)}"
+
+def remember_image_check(url, validated_url, reason):
+    ttl = IMAGE_CACHE_TTL if validated_url else IMAGE_CACHE_FAILURE_TTL
+    image_validation_cache.set(url, {'url': validated_url, 'reason': reason}, ttl=ttl)
+    return validated_url, reason
+
+def add_book_to_notion(book_data, skip_duplicates=False):
+    """Add book to Notion database - working version with all columns
+
+    With skip_duplicates, a book whose ISBN is already in the library is not
+    saved again; {'id': existing_page_id, 'duplicate': True} is returned instead.
+    """
+    skip, result = skipped_notion_save(book_data, skip_duplicates)
+    if skip:
+        return result
+    
+    try:
+        notion_page, _ = create_notion_page(book_data, prepare_notion_page(book_data))
+        return notion_page
+    except Exception as e:
+        logger.error(f"Notion error: {str(e)}")
+        return None
+
+def skipped_notion_save(book_data, skip_duplicates):
+    """(True, result) when add_book_to_notion() creates no page, else (False, None)
+
+    The result is None when Notion isn't configured, and the existing page for
+    a duplicate when skip_duplicates is set.
+    """
+    if not is_notion_configured():
+        logger.error("Notion not configured")
+        return True, None
+    
+    existing_id = notion_isbn_index.lookup(book_data.get('isbn'))
+    if existing_id and skip_duplicates:
+        logger.info(f"Skipping duplicate save of {book_data['title']}, already in Notion as {existing_id}")
+        return True, {'id': existing_id, 'duplicate': True}
+    return False, None
+
+def prepare_notion_page(book_data):
+    """Pick the best validated cover among all candidates and build the page payload"""
+    cover_url, mirrored_url = find_mirrored_cover(book_data)
+    if not cover_url:
+        cover_url = resolve_cover(book_data)
+        mirrored_url = mirror_cover(cover_url)
+    return notion_page_payload(book_data, cover_url, mirrored_url)
+
+def create_notion_page(book_data, payload):
+    """Create a Notion page from a prepared payload, returning (notion_page, error)"""
+    try:
         logger.info(f"Adding book with all properties including Cover PNG: {book_data['title']}")
         logger.info(f"Database ID: {NOTION_DATABASE_ID}")
         
-        response = requests.post(url, headers=headers, json=payload, timeout=15)
-        
-        if response.status_code != 200:
-            logger.error(f"Response status: {response.status_code}")
-            logger.error(f"Response content: {response.text}")
-            
-        response.raise_for_status()
-        
-        logger.info(f"Successfully added to Notion with Cover PNG: {book_data['title']}")
-        return response.json()
+        response = notion_api.post(f"{upstream.notion_url}/pages", json=payload, timeout=15)
+        return notion_page_result(book_data, response)
         
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"HTTP Error: {e}")
-        logger.error(f"Response status: {e.response.status_code}")
-        logger.error(f"Response content: {e.response.text}")
-        return None
     except Exception as e:
         logger.error(f"Notion error: {str(e)}")
-        return None
+        return None, str(e)
+
+def notion_page_result(book_data, response):
+    """(notion_page, error) for Notion's answer to a page creation, indexing the page it created
+
+    Takes a requests or an httpx response, so the ASGI app shares it.
+    """
+    if response.status_code != 200:
+        logger.error(f"Response status: {response.status_code}")
+        logger.error(f"Response content: {response.text}")
+        if response.status_code == 400:
+            # Usually a property the database no longer has; map against a fresh schema next time
+            notion_schema.invalidate()
+        return None, notion_error_message(response)
+    
+    logger.info(f"Successfully added to Notion with Cover PNG: {book_data['title']}")
+    notion_page = response.json()
+    notion_isbn_index.add(book_data.get('isbn'), notion_page.get('id'))
+    return notion_page, None
+
+def notion_error_message(response):
+    """Human-readable error from a failed Notion API response"""
+    try:
+        message = response.json().get('message')
+    except ValueError:
+        message = None
+    # requests calls the status text ``reason``, httpx ``reason_phrase``
+    reason = getattr(response, 'reason', None) or getattr(response, 'reason_phrase', '')
+    return f"Notion returned {response.status_code}: {message or reason}"
+
+def add_books_to_notion(books, skip_duplicates=False):
+    """Save many books to Notion, returning a result per book in input order
+
+    Covers are probed and every page payload is built before any page is
+    created; pages are then created NOTION_BATCH_CONCURRENCY at a time through
+    the rate-limited scheduler. One book failing doesn't stop the others.
+    """
+    results = [{'index': index, 'title': book.get('title'), 'success': False, 'duplicate': False}
+               for index, book in enumerate(books)]
+    if not is_notion_configured():
+        for result in results:
+            result['error'] = 'Notion is not configured'
+        return results
+    
+    # A book repeated in the batch is saved once; later copies point at the first
+    first_seen = {}
+    to_prepare = []
+    for index, book in enumerate(books):
+        isbn_key = canonical_or_none(book.get('isbn'))
+        existing_id = notion_isbn_index.lookup(isbn_key) if isbn_key else None
+        if skip_duplicates and existing_id:
+            results[index].update({'success': True, 'duplicate': True, 'notion_id': existing_id})
+        elif skip_duplicates and isbn_key in first_seen:
+            results[index].update({'duplicate': True, 'duplicate_of': first_seen[isbn_key]})
+        else:
+            if isbn_key:
+                first_seen[isbn_key] = index
+            to_prepare.append(index)
+    
+    def prepare(index):
+        try:
+            return index, prepare_notion_page(books[index]), None
+        except Exception as e:
+            logger.error(f"Could not prepare Notion page for {books[index].get('title')}: {str(e)}")
+            return index, None, str(e)
+    
+    def create(index, payload):
+        notion_page, error = create_notion_page(books[index], payload)
+        if notion_page:
+            results[index].update({'success': True, 'notion_id': notion_page.get('id')})
+        else:
+            results[index]['error'] = error or 'Failed to add book to Notion database'
+    
+    with ThreadPoolExecutor(max_workers=NOTION_BATCH_CONCURRENCY) as executor:
+        prepared = list(executor.map(prepare, to_prepare))
+        for index, _, error in prepared:
+            if error:
+                results[index]['error'] = error
+        list(executor.map(lambda item: create(item[0], item[1]), [item for item in prepared if item[1]]))
+    
+    for result in results:
+        if 'duplicate_of' in result:
+            original = results[result['duplicate_of']]
+            result['success'] = original['success']
+            result['notion_id'] = original.get('notion_id')
+            if original.get('error'):
+                result['error'] = original['error']
+    
+    saved = sum(1 for r in results if r['success'] and not r.get('duplicate'))
+    logger.info(f"Batch save: {saved} of {len(books)} books added to Notion")
+    return results
+
+def notion_page_payload(book_data, validated_url=None, mirrored_url=None):
+    """The Notion create-page payload for a book, with an already validated cover URL
+
+    With a mirrored_url, "Cover PNG" links the local copy; "Cover image" keeps the source URL.
+    """
+    # Core automatic data from Google Books API
+    properties = {
+        "BookName": {"title": [{"text": {"content": book_data['title']}}]},
+        "ISBN": {"rich_text": [{"text": {"content": book_data['isbn']}}]},
+        "Author": {"rich_text": [{"text": {"content": book_data['author']}}]}
+    }
+    
+    # Add Publisher (automatic)
+    if book_data.get('publisher'):
+        properties["Publisher"] = {"rich_text": [{"text": {"content": book_data['publisher']}}]}
+    
+    # Add Page Count (automatic)
+    if book_data.get('page_count'):
+        properties["Page Count"] = {"number": book_data['page_count']}
+    
+    # Add Cover images (both URL and Files & media types)
+    if book_data.get('cover_image') or book_data.get('cover_candidates'):
+        if validated_url:
+            # Original Cover image as URL type
+            properties["Cover image"] = {"url": validated_url}
+            
+            file_url = mirrored_url or validated_url
+            
+            # Create a clean filename
+            clean_title = "".join(c for c in book_data['title'] if c.isalnum() or c in (' ', '-', '_')).rstrip()
+            filename = f"{clean_title}_cover.jpg"
+            
+            # New Cover PNG as Files & media type with validated URL
+            properties["Cover PNG"] = {
+                "files": [
+                    {
+                        "name": filename,
+                        "type": "external",
+                        "external": {
+                            "url": file_url
+                        }
+                    }
+                ]
+            }
+            
+            logger.info(f"Added validated cover image: {file_url}")
+            logger.info(f"Cover filename: {filename}")
+        else:
+            logger.warning("Could not validate cover image URL, skipping cover images")
+    # Add Published Date (automatic)
+    if book_data.get('published_date'):
+        parsed_date = parse_date(book_data['published_date'])
+        if parsed_date:
+            properties["Published Date"] = {"date": {"start": parsed_date}}
+    
+    # Add Descriptions (automatic)
+    if book_data.get('description'):
+        properties["Descriptions"] = {"rich_text": [{"text": {"content": book_data['description']}}]}
+    
+    # Add Category (automatic)
+    if book_data.get('categories'):
+        properties["Category"] = {"rich_text": [{"text": {"content": book_data['categories']}}]}
+    
+    mapper = notion_schema.mapper() if NOTION_SCHEMA_ENABLED else None
+    if mapper is not None:
+        properties = mapper.map(properties)
+    
+    return {
+        "parent": {"database_id": NOTION_DATABASE_ID},
+        "properties": properties
+    }
+
+def book_from_notion_page(isbn, page):
+    """Book data rebuilt from a library page's properties; the inverse of notion_page_payload()"""
+    page_properties = page.get('properties', {})
+    properties = {name: page_properties.get(NOTION_PROPERTY_NAMES.get(name, name)) for name in BOOK_PROPERTY_TYPES}
+    if properties['BookName'] is None:
+        # The schema mapper writes the title into whatever the title column is called
+        properties['BookName'] = next((prop for prop in page_properties.values() if prop.get('type') == 'title'), None)
+    book_data = empty_book(isbn)
+    book_data.update({
+        'title': property_text(properties.get('BookName')) or book_data['title'],
+        'author': property_text(properties.get('Author')) or book_data['author'],
+        'publisher': property_text(properties.get('Publisher')),
+        'published_date': property_text(properties.get('Published Date')),
+        'categories': property_text(properties.get('Category')),
+        'description': property_text(properties.get('Descriptions'))
+    })
+    page_count = (properties.get('Page Count') or {}).get('number')
+    if page_count:
+        book_data['page_count'] = int(page_count)
+    
+    cover_url = property_text(properties.get('Cover image'))
+    if cover_url:
+        book_data['cover_image'] = cover_url
+        book_data['cover_candidates'] = [cover_url]
+    return add_fallback_cover(book_data, isbn)
+
+def warm_caches_from_page(isbn, page):
+    """Preload the lookup and cover caches from a page seen during the first ISBN index build
+
+    Existing cache entries win, so fresher provider data is never replaced.
+    """
+    if (not NOTION_WARMUP_ENABLED or notion_isbn_index.ready
+            or notion_warmup_stats['pages_seen'] >= NOTION_WARMUP_MAX_BOOKS):
+        return
+    notion_warmup_stats['pages_seen'] += 1
+    
+    book_data = book_from_notion_page(isbn, page)
+    if book_cache.set_default(isbn, book_data):
+        notion_warmup_stats['books_cached'] += 1
+    
+    # The cover was validated when the page was saved, so later saves needn't probe it again
+    if book_data['cover_image'] and cover_choices.get(isbn) is None:
+        cover_url = optimize_image_url(book_data['cover_image'])
+        cover_choices.set(isbn, cover_url)
+        if image_validation_cache.get(cover_url) is None:
+            image_validation_cache.set(cover_url, {'url': cover_url, 'reason': None})
+        notion_warmup_stats['covers_cached'] += 1
 
 def parse_date(date_string):
     """Parse date from Google Books"""
@@ -1366,22 +1826,96 @@ def test_image_url():
         if not url:
             return jsonify({'success': False, 'error': 'URL required'})
         
-        validated_url = validate_and_optimize_image_url(url)
-        
-        return jsonify({
-            'success': bool(validated_url),
-            'original_url': url,
-            'validated_url': validated_url,
-            'message': 'Image URL is accessible' if validated_url else 'Image URL is not accessible'
-        })
+        validated_url, reason = check_image_url(url)
+        return jsonify(image_check_response(url, validated_url, reason))
         
     except Exception as e:
         logger.error(f"Error testing image URL: {str(e)}")
         return jsonify({'success': False, 'error': str(e)})
 
+def image_check_response(url, validated_url, reason):
+    return {
+        'success': bool(validated_url),
+        'original_url': url,
+        'validated_url': validated_url,
+        'reason': reason,
+        'message': 'Image URL is accessible' if validated_url else 'Image URL is not accessible'
+    }
+
+@app.route('/covers/<name>')
+def mirrored_cover(name):
+    """Serve a mirrored cover or thumbnail; names are content hashes, so they never change"""
+    path = cover_store.path(name) if cover_store is not None else None
+    if path is None:
+        return jsonify({'success': False, 'error': 'Not found'}), 404
+    
+    response = send_file(path, mimetype=cover_store.mimetype(name), conditional=True, etag=name.split('.')[0])
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+@app.route('/telemetry', methods=['POST'])
+def record_telemetry():
+    """Accept a batch of scanner timings from the frontend
+
+    The body is ``{"events": [{"metric": "camera_init_ms", "value": 850}],
+    "device": {"cores": 8, "memory": 4}}``; it may arrive as a beacon with a
+    text/plain content type. Unknown metrics and out-of-range values are dropped.
+    """
+    if not TELEMETRY_ENABLED:
+        return jsonify({'success': False, 'error': 'Telemetry is disabled'})
+    
+    data = request.get_json(force=True, silent=True)
+    events = data.get('events') if isinstance(data, dict) else None
+    if not isinstance(events, list) or not events:
+        return jsonify({'success': False, 'error': 'No events provided'})
+    if len(events) > TELEMETRY_MAX_EVENTS:
+        return jsonify({'success': False, 'error': f'Too many events (maximum {TELEMETRY_MAX_EVENTS})'})
+    
+    device = data.get('device') if isinstance(data.get('device'), dict) else {}
+    device_name = device_class(request.headers.get('User-Agent'), device.get('cores'), device.get('memory'))
+    accepted = client_telemetry.record(device_name, events)
+    for metric in accepted:
+        client_telemetry_events.inc(metric=metric)
+    return jsonify({'success': True, 'accepted': len(accepted), 'device_class': device_name})
+
+@app.route('/telemetry')
+def telemetry_summary():
+    """Percentiles of the reported scanner timings, per device class"""
+    return jsonify({
+        'success': True,
+        'enabled': TELEMETRY_ENABLED,
+        'window': TELEMETRY_WINDOW,
+        'device_classes': client_telemetry.summary()
+    })
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus metrics in the text exposition format"""
+    return Response(metrics_registry.render(), content_type=metrics.CONTENT_TYPE)
+
 @app.route('/health')
 def health_check():
-    return jsonify({'status': 'healthy'})
+    breakers = circuit_breakers.stats()
+    return jsonify({
+        'status': 'degraded' if any(b['state'] != 'closed' for b in breakers.values()) else 'healthy',
+        'circuit_breakers': breakers,
+        'notion_scheduler': notion_api.stats(),
+        'notion_write_queue_depth': notion_write_queue.depth(),
+        'coalesced_requests': {
+            'book_lookups': book_lookup_flights.shared,
+            'image_checks': image_check_flights.shared
+        },
+        'notion_isbn_index': notion_isbn_index.stats(),
+        'notion_warmup': notion_warmup_stats,
+        'notion_schema': notion_schema.stats() if NOTION_SCHEMA_ENABLED else None,
+        'cover_mirror': cover_store.stats() if cover_store is not None else None,
+        'client_telemetry': client_telemetry.stats() if TELEMETRY_ENABLED else None,
+        'book_providers': book_lookup_engine.stats_snapshot()
+    })
+
+# Build the duplicate-detection index in the background so startup isn't delayed
+if NOTION_INDEX_ENABLED and is_notion_configured():
+    notion_isbn_index.start(refresh_interval=NOTION_INDEX_REFRESH)
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8080))
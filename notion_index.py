@@ -0,0 +1,124 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def property_text(prop):
+    """Plain text of a Notion title/rich_text/number/url/date property value"""
+    if not prop:
+        return ''
+    prop_type = prop.get('type')
+    if prop_type in ('title', 'rich_text'):
+        return ''.join(part.get('plain_text', '') for part in prop.get(prop_type, []))
+    if prop_type == 'number':
+        return '' if prop.get('number') is None else str(prop['number'])
+    if prop_type == 'url':
+        return prop.get('url') or ''
+    if prop_type == 'date':
+        return (prop.get('date') or {}).get('start') or ''
+    return ''
+
+
+class NotionIsbnIndex:
+    """In-memory ISBN -> Notion page id index of the library database
+
+    Built by paging through the database query API and kept current as the
+    app creates pages, so duplicate checks need no Notion round trip.
+    ``on_page(key, page)`` is called for every page with an ISBN during a
+    build, so other caches can be warmed from the same pass.
+    """
+
+    def __init__(self, notion_api, database_url, key_fn, isbn_property='ISBN', on_page=None):
+        self.notion_api = notion_api
+        self.database_url = database_url
+        self.key_fn = key_fn
+        self.isbn_property = isbn_property
+        self.on_page = on_page
+        self._pages = {}
+        self._added_during_build = {}
+        self._lock = threading.Lock()
+        self._ready = False
+        self._built_at = None
+        self._thread = None
+
+    @property
+    def ready(self):
+        return self._ready
+
+    def lookup(self, isbn):
+        """Return the Notion page id already holding this ISBN, or None"""
+        key = self.key_fn(isbn) if isbn else None
+        if not key:
+            return None
+        with self._lock:
+            return self._pages.get(key)
+
+    def add(self, isbn, page_id):
+        """Record a newly created page"""
+        key = self.key_fn(isbn) if isbn else None
+        if key and page_id:
+            with self._lock:
+                self._pages[key] = page_id
+                self._added_during_build[key] = page_id
+
+    def stats(self):
+        with self._lock:
+            return {'ready': self._ready, 'entries': len(self._pages), 'built_at': self._built_at}
+
+    def iter_pages(self, page_size=100, timeout=30):
+        """Yield every page of the database, following pagination cursors"""
+        payload = {'page_size': page_size}
+        while True:
+            response = self.notion_api.post(f"{self.database_url}/query", json=payload, timeout=timeout)
+            response.raise_for_status()
+            data = response.json()
+            for page in data.get('results', []):
+                yield page
+            if not data.get('has_more') or not data.get('next_cursor'):
+                break
+            payload['start_cursor'] = data['next_cursor']
+
+    def build(self):
+        """Rebuild the index from the Notion database"""
+        started = time.time()
+        with self._lock:
+            self._added_during_build = {}
+        pages = {}
+        for page in self.iter_pages():
+            isbn = property_text(page.get('properties', {}).get(self.isbn_property))
+            key = self.key_fn(isbn) if isbn else None
+            if key:
+                pages.setdefault(key, page['id'])
+                if self.on_page is not None:
+                    try:
+                        self.on_page(key, page)
+                    except Exception as e:
+                        logger.warning(f"Notion page callback failed for {key}: {str(e)}")
+
+        with self._lock:
+            # Keep pages created by this app while the build was running
+            pages.update(self._added_during_build)
+            self._pages = pages
+            self._ready = True
+            self._built_at = time.time()
+        logger.info(f"Notion ISBN index built with {len(pages)} entries in {time.time() - started:.1f}s")
+
+    def start(self, refresh_interval=3600):
+        """Build in a background thread and rebuild every refresh_interval seconds"""
+        if self._thread is not None:
+            return
+
+        def run():
+            while True:
+                try:
+                    self.build()
+                except Exception as e:
+                    logger.warning(f"Notion ISBN index build failed: {str(e)}")
+                if refresh_interval <= 0:
+                    return
+                time.sleep(refresh_interval)
+
+        self._thread = threading.Thread(target=run, name='notion-isbn-index', daemon=True)
+        self._thread.start()
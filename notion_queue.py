@@ -0,0 +1,129 @@
+import logging
+import queue
+import threading
+import time
+import uuid
+
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class NotionWriteQueue:
+    """Background queue that saves books to Notion off the request thread
+
+    ``write_fn`` takes a book_data dict and returns the created Notion page
+    (or None on failure). Job records are kept for ``job_ttl`` seconds so the
+    UI can poll for the outcome. ``hold_fn()``, if given, returns how many
+    seconds writes should wait (e.g. while Notion is down); jobs stay queued
+    until it returns 0.
+    """
+
+    def __init__(self, write_fn, workers=2, max_queued=1000, job_ttl=3600, max_jobs=10000, hold_fn=None):
+        self.write_fn = write_fn
+        self.hold_fn = hold_fn
+        self.workers = workers
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs = TTLCache(maxsize=max_jobs, ttl=job_ttl)
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def submit(self, book_data, **options):
+        """Queue a book for saving and return its job record; raises queue.Full when saturated
+
+        ``options`` are passed through to ``write_fn``.
+        """
+        self._ensure_workers()
+
+        job = {
+            'id': uuid.uuid4().hex,
+            'status': 'queued',
+            'title': book_data.get('title'),
+            'isbn': book_data.get('isbn'),
+            'notion_id': None,
+            'duplicate': False,
+            'error': None,
+            'created_at': time.time(),
+            'finished_at': None
+        }
+        self._jobs.set(job['id'], job)
+        try:
+            self._queue.put_nowait((job['id'], dict(book_data), options))
+        except queue.Full:
+            self._jobs.pop(job['id'])
+            raise
+
+        logger.info(f"Queued Notion write {job['id']} for: {job['title']}")
+        return dict(job)
+
+    def get(self, job_id):
+        """Return a copy of the job record, or None if unknown or expired"""
+        job = self._jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+    def depth(self):
+        """Number of writes waiting for a worker"""
+        return self._queue.qsize()
+
+    def _ensure_workers(self):
+        # Started lazily so threads are created in the serving process, not at import time
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'notion-writer-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _update(self, job_id, **fields):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        job = dict(job, **fields)
+        self._jobs.set(job_id, job)
+
+    def _hold_delay(self):
+        if self.hold_fn is None:
+            return 0
+        try:
+            return self.hold_fn()
+        except Exception as e:
+            logger.warning(f"Notion write hold check failed: {str(e)}")
+            return 0
+
+    def _hold(self):
+        while True:
+            delay = self._hold_delay()
+            if not delay:
+                return
+            time.sleep(min(delay, 5))
+
+    def _requeue(self, job_id, book_data, options):
+        """Put back a write that failed because Notion went down, rather than failing the job"""
+        try:
+            self._queue.put_nowait((job_id, book_data, options))
+        except queue.Full:
+            return False
+        self._update(job_id, status='queued')
+        logger.info(f"Notion is unavailable, requeued write {job_id}")
+        return True
+
+    def _run(self):
+        while True:
+            job_id, book_data, options = self._queue.get()
+            self._hold()
+            self._update(job_id, status='running')
+            try:
+                result = self.write_fn(book_data, **options)
+                if result:
+                    self._update(job_id, status='succeeded', notion_id=result.get('id'),
+                                 duplicate=bool(result.get('duplicate')), finished_at=time.time())
+                elif not (self._hold_delay() and self._requeue(job_id, book_data, options)):
+                    self._update(job_id, status='failed', error='Failed to add book to Notion database',
+                                 finished_at=time.time())
+            except Exception as e:
+                logger.error(f"Notion write {job_id} failed: {str(e)}")
+                if not (self._hold_delay() and self._requeue(job_id, book_data, options)):
+                    self._update(job_id, status='failed', error=str(e), finished_at=time.time())
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,145 @@
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerFull(Exception):
+    """Raised when too many Notion requests are already waiting for a slot"""
+
+
+class NotionScheduler:
+    """Rate-limited gateway for all Notion API requests
+
+    A token bucket keeps traffic under Notion's per-integration limit. HTTP 429
+    responses pause every caller until the Retry-After time (plus jitter) and
+    the request is retried, so bursts turn into short delays instead of
+    failed saves.
+    """
+
+    def __init__(self, session, rate=3.0, burst=3, max_waiting=50, max_wait=60,
+                 max_retries=4, base_backoff=1.0, max_backoff=30.0):
+        self.session = session
+        self.rate = rate
+        self.burst = burst
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._waiting = 0
+
+        self._requests = 0
+        self._rate_limited = 0
+        self._total_wait = 0.0
+        self._max_wait_seen = 0.0
+
+    def request(self, method, url, **kwargs):
+        """Send a request through the rate limiter, retrying on HTTP 429"""
+        attempt = 0
+        while True:
+            self._acquire()
+            response = self.session.request(method, url, **kwargs)
+            if response.status_code != 429 or attempt >= self.max_retries:
+                return response
+
+            attempt += 1
+            self.rate_limited(response, attempt)
+
+    def rate_limited(self, response, attempt):
+        """Pause every caller after a 429 response; returns the pause in seconds"""
+        delay = self._retry_delay(response, attempt)
+        logger.warning(f"Notion rate limited, retry {attempt}/{self.max_retries} in {delay:.2f}s")
+        with self._lock:
+            self._rate_limited += 1
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+            # Rate limited means the bucket was optimistic; start refilling from empty
+            self._tokens = 0.0
+        return delay
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request('PATCH', url, **kwargs)
+
+    def stats(self):
+        """Snapshot of queue depth, wait times and rate-limit counts"""
+        with self._lock:
+            return {
+                'queue_depth': self._waiting,
+                'requests': self._requests,
+                'rate_limited': self._rate_limited,
+                'avg_wait_seconds': round(self._total_wait / self._requests, 3) if self._requests else 0.0,
+                'max_wait_seconds': round(self._max_wait_seen, 3),
+                'paused_for_seconds': round(max(0.0, self._blocked_until - time.monotonic()), 3)
+            }
+
+    def _retry_delay(self, response, attempt):
+        """Delay before retrying: Retry-After if given, else exponential backoff, plus jitter"""
+        retry_after = response.headers.get('Retry-After')
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = self.base_backoff * (2 ** (attempt - 1))
+        delay = min(delay, self.max_backoff)
+        return delay + random.uniform(0, max(delay * 0.25, 0.1))
+
+    def _refill(self, now):
+        elapsed = now - self._last_refill
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._last_refill = now
+
+    def try_acquire(self):
+        """Take a token without blocking: 0 on success, else seconds to wait before trying again"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self._blocked_until:
+                return self._blocked_until - now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def begin_wait(self):
+        """Register a caller waiting for a token; raises SchedulerFull if too many are waiting"""
+        with self._lock:
+            if self._waiting >= self.max_waiting:
+                raise SchedulerFull(f"{self._waiting} Notion requests already waiting")
+            self._waiting += 1
+
+    def end_wait(self, waited, acquired):
+        with self._lock:
+            self._waiting -= 1
+            if acquired:
+                self._requests += 1
+                self._total_wait += waited
+                self._max_wait_seen = max(self._max_wait_seen, waited)
+
+    def _acquire(self):
+        start = time.monotonic()
+        self.begin_wait()
+        acquired = False
+        try:
+            while True:
+                delay = self.try_acquire()
+                if not delay:
+                    acquired = True
+                    return
+                waited = time.monotonic() - start
+                if waited + delay > self.max_wait:
+                    raise SchedulerFull(f"Timed out after {waited:.1f}s waiting for a Notion slot")
+                time.sleep(delay)
+        finally:
+            self.end_wait(time.monotonic() - start, acquired)
@@ -0,0 +1,177 @@
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DATE_PATTERN = re.compile(r'^\d{4}(-\d{2}(-\d{2})?)?$')
+
+
+def value_text(prop_type, value):
+    """Plain text of a property value in create-page payload form"""
+    if prop_type in ('title', 'rich_text'):
+        return ''.join(part.get('text', {}).get('content', '') for part in value.get(prop_type, []))
+    if prop_type == 'number':
+        return '' if value.get('number') is None else str(value['number'])
+    if prop_type == 'url':
+        return value.get('url') or ''
+    if prop_type == 'date':
+        return (value.get('date') or {}).get('start') or ''
+    if prop_type == 'files':
+        files = value.get('files') or []
+        return files[0].get('external', {}).get('url', '') if files else ''
+    return ''
+
+
+def text_value(prop_type, text):
+    """A payload value of prop_type holding text, or None if text doesn't fit that type"""
+    if prop_type in ('title', 'rich_text'):
+        return {prop_type: [{'text': {'content': text[:2000]}}]}
+    if prop_type == 'number':
+        try:
+            number = float(text)
+        except ValueError:
+            return None
+        return {'number': int(number) if number.is_integer() else number}
+    if prop_type == 'url':
+        return {'url': text} if text.startswith(('http://', 'https://')) else None
+    if prop_type == 'date':
+        return {'date': {'start': text}} if DATE_PATTERN.match(text) else None
+    if prop_type == 'select':
+        # Select option names can't contain commas
+        return {'select': {'name': text.replace(',', ' ')[:100]}}
+    if prop_type == 'multi_select':
+        names = [name.strip()[:100] for name in text.split(',') if name.strip()]
+        return {'multi_select': [{'name': name} for name in names]}
+    if prop_type == 'files':
+        if not text.startswith(('http://', 'https://')):
+            return None
+        name = text.rstrip('/').rsplit('/', 1)[-1].split('?')[0][:100] or 'file'
+        return {'files': [{'name': name, 'type': 'external', 'external': {'url': text}}]}
+    return None
+
+
+def converter(source_type, target_type):
+    """Function turning a source_type value into a target_type value (or None), or None if impossible"""
+    if target_type not in ('title', 'rich_text', 'number', 'url', 'date', 'select', 'multi_select', 'files'):
+        return None
+
+    def convert(value):
+        text = value_text(source_type, value)
+        return text_value(target_type, text) if text else None
+    return convert
+
+
+class PropertyMapper:
+    """Page properties rewritten to fit one database's schema, planned once per schema
+
+    Each property the app writes is matched to a database column by name
+    (after ``renames``), or for the title to whatever the title column is
+    called. Values are passed through when the types match, converted when
+    a conversion exists (e.g. text into a select), and dropped otherwise,
+    so a missing or retyped column never fails the whole save.
+    """
+
+    def __init__(self, schema, source_types, renames=None):
+        self.schema = schema
+        self.plan = {}
+        self.adapted = []
+        self.dropped = []
+        renames = renames or {}
+        title_column = next((name for name, prop_type in schema.items() if prop_type == 'title'), None)
+
+        for name, source_type in source_types.items():
+            target = renames.get(name, name)
+            if target not in schema and source_type == 'title':
+                target = title_column
+            target_type = schema.get(target)
+
+            if target_type == source_type:
+                self.plan[name] = (target, None)
+                if target != name:
+                    self.adapted.append(f"{name} -> {target}")
+            elif target_type is not None and converter(source_type, target_type):
+                self.plan[name] = (target, converter(source_type, target_type))
+                self.adapted.append(f"{name} -> {target} ({source_type} to {target_type})")
+            else:
+                self.dropped.append(name)
+
+        if self.adapted or self.dropped:
+            logger.info(f"Notion property mapping: adapted {self.adapted}, dropped {self.dropped}")
+
+    def map(self, properties):
+        mapped = {}
+        for name, value in properties.items():
+            target, convert = self.plan.get(name, (name, None) if name in self.schema else (None, None))
+            if target is None:
+                continue
+            if convert is not None:
+                value = convert(value)
+                if value is None:
+                    continue
+            mapped[target] = value
+        return mapped
+
+
+class NotionSchema:
+    """The database's property names and types, fetched once and refreshed periodically
+
+    ``mapper()`` returns a PropertyMapper compiled for the current schema, or
+    None (send properties unchanged) while the schema can't be fetched.
+    """
+
+    def __init__(self, notion_api, database_url, source_types, renames=None,
+                 refresh_interval=600, retry_interval=60):
+        self.notion_api = notion_api
+        self.database_url = database_url
+        self.source_types = source_types
+        self.renames = renames or {}
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._schema = None
+        self._mapper = None
+        self._loaded_at = None
+        self._next_refresh = 0
+
+    def is_fresh(self):
+        return time.monotonic() < self._next_refresh
+
+    def mapper(self):
+        if not self.is_fresh():
+            self.refresh()
+        return self._mapper
+
+    def invalidate(self):
+        """Refetch the schema on next use, e.g. after Notion rejected a page as invalid"""
+        self._next_refresh = 0
+
+    def refresh(self):
+        """Fetch the schema if it's due; concurrent callers wait for one fetch"""
+        with self._lock:
+            if self.is_fresh():
+                return
+            try:
+                response = self.notion_api.get(self.database_url, timeout=15)
+                response.raise_for_status()
+                schema = {name: prop.get('type') for name, prop in response.json().get('properties', {}).items()}
+            except Exception as e:
+                logger.warning(f"Could not fetch the Notion database schema: {str(e)}")
+                self._next_refresh = time.monotonic() + self.retry_interval
+                return
+
+            if schema != self._schema:
+                self._mapper = PropertyMapper(schema, self.source_types, self.renames)
+                self._schema = schema
+            self._loaded_at = time.time()
+            self._next_refresh = time.monotonic() + self.refresh_interval
+
+    def stats(self):
+        mapper = self._mapper
+        return {
+            'loaded_at': self._loaded_at,
+            'properties': len(self._schema) if self._schema is not None else None,
+            'adapted': mapper.adapted if mapper else [],
+            'dropped': mapper.dropped if mapper else []
+        }
@@ -0,0 +1,1136 @@
+var scanner = null;
+var currentBook = null;
+var manualBatch = [];
+var scannerInitialized = false;
+
+// Barcode reads must agree across frames before a code is accepted
+var SCAN_AGREEMENT = 3;
+var SCAN_WINDOW = 8;
+// In continuous mode a code just accepted is ignored while it's still in view
+var SCAN_REPEAT_MS = 2500;
+var SCAN_LOOKUP_CONCURRENCY = 4;
+var scanReads = [];
+var continuousScanning = false;
+var lastAcceptedScan = {isbn: null, at: 0};
+var scanBatch = [];
+var scanLookupQueue = [];
+var scanLookupsRunning = 0;
+// Timings of the current scanning session, reported through Telemetry
+var scanTiming = null;
+
+function showHome() {
+    document.getElementById('home-view').style.display = 'block';
+    document.getElementById('scanner-view').style.display = 'none';
+    document.getElementById('manual-view').style.display = 'none';
+    document.getElementById('manual-book-form').style.display = 'none';
+    stopScanner();
+    clearResults();
+}
+
+function showScanner() {
+    document.getElementById('home-view').style.display = 'none';
+    document.getElementById('scanner-view').style.display = 'block';
+    document.getElementById('manual-view').style.display = 'none';
+    document.getElementById('manual-book-form').style.display = 'none';
+    clearResults();
+}
+
+function showManualEntry() {
+    document.getElementById('home-view').style.display = 'none';
+    document.getElementById('scanner-view').style.display = 'none';
+    document.getElementById('manual-view').style.display = 'block';
+    document.getElementById('manual-book-form').style.display = 'none';
+    clearResults();
+    document.getElementById('isbn-input').value = '';
+}
+
+function showManualBookForm() {
+    document.getElementById('home-view').style.display = 'none';
+    document.getElementById('scanner-view').style.display = 'none';
+    document.getElementById('manual-view').style.display = 'none';
+    document.getElementById('manual-book-form').style.display = 'block';
+    clearManualForm();
+}
+
+function hideManualBookForm() {
+    var isbn = document.getElementById('isbn-input').value.trim();
+    if (isbn) {
+        showManualEntry();
+    } else {
+        showHome();
+    }
+}
+
+function clearManualForm() {
+    document.getElementById('manual-title').value = '';
+    document.getElementById('manual-author').value = '';
+    document.getElementById('manual-isbn').value = '';
+    document.getElementById('manual-publisher').value = '';
+    document.getElementById('manual-published-date').value = '';
+    document.getElementById('manual-page-count').value = '';
+    document.getElementById('manual-categories').value = '';
+    document.getElementById('manual-description').value = '';
+
+    var addButton = document.getElementById('manual-add-button');
+    addButton.disabled = false;
+    addButton.innerHTML = '<svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M12 5v14"></path><path d="M5 12h14"></path></svg>Add Book to Notion';
+}
+
+function clearResults() {
+    document.getElementById('results').innerHTML = '';
+    currentBook = null;
+    resetAddNotionButton();
+}
+
+function resetAddNotionButton() {
+    var addButton = document.getElementById('add-notion-button');
+    addButton.style.display = 'none';
+    addButton.disabled = false;
+    addButton.innerHTML = '<svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M12 5v14"></path><path d="M5 12h14"></path></svg>Add to Notion Library';
+
+    var scannerButton = document.getElementById('add-notion-scanner-button');
+    scannerButton.style.display = 'none';
+    scannerButton.disabled = false;
+    scannerButton.innerHTML = '<svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M12 5v14"></path><path d="M5 12h14"></path></svg>Add to Notion Library';
+}
+
+function handleEnterKey(event) {
+    if (event.key === 'Enter') {
+        lookupBook();
+    }
+}
+
+function startScanning() {
+    var container = document.getElementById('scanner-container');
+    var overlay = document.getElementById('scanner-overlay');
+    var scanButton = document.getElementById('scan-button');
+    var status = document.getElementById('scanner-status');
+    var progress = document.getElementById('scanner-progress');
+
+    if (typeof Quagga === 'undefined') {
+        showResult('Camera scanner not available. Please use manual ISBN entry instead.', 'error');
+        return;
+    }
+
+    continuousScanning = document.getElementById('continuous-scan').checked;
+    scanReads = [];
+    container.style.display = 'block';
+    overlay.style.display = 'none';
+    progress.style.display = 'block';
+    scanButton.disabled = true;
+    scanButton.innerHTML = '<svg class="animate-spin" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M21 12a9 9 0 11-6.219-8.56"/></svg>Starting...';
+    status.textContent = 'Starting camera...';
+
+    if (navigator.mediaDevices && navigator.mediaDevices.getUserMedia) {
+        var initStartedAt = performance.now();
+        Quagga.init({
+            inputStream: {
+                name: "Live",
+                type: "LiveStream",
+                target: container,
+                constraints: {
+                    width: 400,
+                    height: 300,
+                    facingMode: "environment"
+                },
+            },
+            locator: {
+                patchSize: "medium",
+                halfSample: true
+            },
+            numOfWorkers: 2,
+            decoder: {
+                readers: ["ean_reader", "ean_8_reader", "code_128_reader", "code_39_reader", "codabar_reader"]
+            },
+            locate: true
+        }, function(err) {
+            if (err) {
+                console.error('Quagga init error:', err);
+                showResult('Camera error: ' + err.message + '. Please try manual entry.', 'error');
+                resetScanButton();
+                overlay.style.display = 'flex';
+                container.style.display = 'none';
+                return;
+            }
+
+            console.log('Quagga initialized successfully');
+            Telemetry.record('camera_init_ms', performance.now() - initStartedAt);
+            scanTiming = {startedAt: performance.now(), frames: 0, detected: false};
+            Quagga.start();
+            simulateProgress();
+            scannerInitialized = true;
+
+            if (continuousScanning) {
+                status.textContent = 'Camera ready! Scan your books one after another.';
+                scanButton.disabled = false;
+                scanButton.onclick = stopScanner;
+                scanButton.innerHTML = '<svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><rect x="6" y="6" width="12" height="12" rx="1"></rect></svg>Stop Scanning';
+            } else {
+                status.textContent = 'Camera ready! Point at a barcode.';
+            }
+        });
+
+        // Handlers accumulate across restarts unless the previous one is removed
+        Quagga.offDetected(onBarcodeDetected);
+        Quagga.onDetected(onBarcodeDetected);
+        Quagga.offProcessed(onFrameProcessed);
+        Quagga.onProcessed(onFrameProcessed);
+    } else {
+        showResult('Camera not supported. Please use manual entry.', 'error');
+        resetScanButton();
+        overlay.style.display = 'flex';
+        container.style.display = 'none';
+    }
+}
+
+function onBarcodeDetected(result) {
+    var isbn = result.codeResult.code;
+    if (!isValidISBN(isbn)) {
+        // Misreads and non-book barcodes: keep scanning
+        console.log('Ignoring non-ISBN barcode:', isbn);
+        return;
+    }
+    if (!agreedBarcode(isbn)) {
+        return;
+    }
+    console.log('Barcode detected:', isbn);
+    if (scanTiming && !scanTiming.detected) {
+        scanTiming.detected = true;
+        Telemetry.record('first_detection_ms', performance.now() - scanTiming.startedAt);
+    }
+
+    if (continuousScanning) {
+        addScanToBatch(isbn);
+        return;
+    }
+
+    document.getElementById('isbn-input').value = isbn;
+    stopScanner();
+    showResult('Barcode detected: ' + isbn, 'success');
+    lookupBookByISBN(isbn, 'scanner');
+}
+
+function onFrameProcessed() {
+    if (scanTiming) {
+        scanTiming.frames++;
+    }
+}
+
+function recordScanTiming() {
+    // Frame rate over the whole session; very short sessions say little about the device
+    var seconds = (performance.now() - scanTiming.startedAt) / 1000;
+    if (seconds >= 2) {
+        Telemetry.record('decode_fps', scanTiming.frames / seconds);
+    }
+    scanTiming = null;
+}
+
+function agreedBarcode(isbn) {
+    // A single frame can misread a digit; accept a code once SCAN_AGREEMENT of the last SCAN_WINDOW reads match
+    scanReads.push(isbn);
+    if (scanReads.length > SCAN_WINDOW) {
+        scanReads.shift();
+    }
+    var matches = scanReads.filter(function(read) {
+        return read === isbn;
+    }).length;
+    if (matches < SCAN_AGREEMENT) {
+        return false;
+    }
+    scanReads = [];
+    return true;
+}
+
+function addScanToBatch(isbn) {
+    var now = Date.now();
+    if (isbn === lastAcceptedScan.isbn && now - lastAcceptedScan.at < SCAN_REPEAT_MS) {
+        return;
+    }
+    lastAcceptedScan = {isbn: isbn, at: now};
+
+    var status = document.getElementById('scanner-status');
+    var existing = scanBatch.filter(function(entry) {
+        return entry.isbn === isbn;
+    })[0];
+    if (existing) {
+        status.textContent = 'Already scanned: ' + (existing.book ? existing.book.title : isbn);
+        return;
+    }
+
+    var entry = {isbn: isbn, status: 'looking', book: null, error: null};
+    scanBatch.push(entry);
+    if (navigator.vibrate) {
+        navigator.vibrate(60);
+    }
+    status.textContent = 'Scanned ' + isbn + ' (' + scanBatch.length + ' in this stack)';
+    renderScanBatch();
+
+    // Look the book up right away, a few at a time, while scanning continues
+    scanLookupQueue.push(entry);
+    runScanLookups();
+}
+
+function runScanLookups() {
+    function done() {
+        scanLookupsRunning--;
+        renderScanBatch();
+        runScanLookups();
+    }
+
+    while (scanLookupsRunning < SCAN_LOOKUP_CONCURRENCY && scanLookupQueue.length) {
+        scanLookupsRunning++;
+        lookupScan(scanLookupQueue.shift()).then(done, done);
+    }
+}
+
+function lookupScan(entry) {
+    var startedAt = performance.now();
+    return fetch('/test-isbn', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({isbn: entry.isbn})
+    })
+    .then(function(response) {
+        Telemetry.record('lookup_ms', performance.now() - startedAt);
+        return response.json();
+    })
+    .then(function(result) {
+        if (result.success) {
+            entry.book = result;
+            entry.status = result.duplicate ? 'duplicate' : 'found';
+        } else {
+            entry.status = 'failed';
+            entry.error = result.error;
+        }
+    })
+    .catch(function(error) {
+        if (isOfflineError(error)) {
+            return queueScanOffline(entry);
+        }
+        entry.status = 'failed';
+        entry.error = error.message;
+    });
+}
+
+function queueScanOffline(entry) {
+    return ScanQueue.add({isbn: entry.isbn}).then(function() {
+        entry.status = 'queued';
+        updateSyncStatus();
+        requestBackgroundSync();
+    });
+}
+
+function removeFromScanBatch(entry) {
+    scanBatch.splice(scanBatch.indexOf(entry), 1);
+    renderScanBatch();
+}
+
+function scanStatusText(entry) {
+    switch (entry.status) {
+        case 'looking':
+            return 'Looking up...';
+        case 'found':
+            return entry.error ? 'Not saved: ' + entry.error : entry.book.author;
+        case 'duplicate':
+            return 'Already in your Notion library';
+        case 'saved':
+            return 'Added to Notion';
+        case 'queued':
+            return 'Offline: will be added when you\'re back online';
+        default:
+            return entry.error || 'Not found';
+    }
+}
+
+function renderScanBatch() {
+    var container = document.getElementById('scan-batch');
+    var list = document.getElementById('scan-batch-list');
+    var saveButton = document.getElementById('scan-batch-save-button');
+
+    list.innerHTML = '';
+    scanBatch.forEach(function(entry) {
+        var row = document.createElement('div');
+        row.className = 'scan-batch-item';
+
+        if (entry.book && entry.book.cover_image) {
+            var cover = document.createElement('img');
+            cover.src = entry.book.cover_image;
+            cover.alt = '';
+            row.appendChild(cover);
+        }
+
+        var info = document.createElement('span');
+        info.className = 'scan-batch-item-info';
+        info.textContent = entry.book ? entry.book.title : 'ISBN ' + entry.isbn;
+        var status = document.createElement('span');
+        status.className = 'scan-batch-item-status';
+        if (entry.status === 'failed' || entry.error) {
+            status.className += ' manual-batch-item-error';
+        }
+        status.textContent = scanStatusText(entry);
+        info.appendChild(status);
+        row.appendChild(info);
+
+        if (entry.status !== 'saved' && entry.status !== 'queued') {
+            var remove = document.createElement('button');
+            remove.type = 'button';
+            remove.title = 'Remove from stack';
+            remove.textContent = '\u00d7';
+            remove.onclick = function() {
+                removeFromScanBatch(entry);
+            };
+            row.appendChild(remove);
+        }
+        list.appendChild(row);
+    });
+
+    var savable = scanBatchToSave().length;
+    container.style.display = scanBatch.length ? 'block' : 'none';
+    saveButton.disabled = !savable;
+    saveButton.innerHTML = '<svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M12 5v14"></path><path d="M5 12h14"></path></svg>' +
+        'Save ' + savable + ' Book' + (savable === 1 ? '' : 's') + ' to Notion';
+}
+
+function scanBatchToSave() {
+    return scanBatch.filter(function(entry) {
+        return entry.status === 'found';
+    });
+}
+
+function saveScanBatch() {
+    var entries = scanBatchToSave();
+    if (!entries.length) {
+        return;
+    }
+
+    var saveButton = document.getElementById('scan-batch-save-button');
+    saveButton.disabled = true;
+    saveButton.innerHTML = '<svg class="animate-spin" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M21 12a9 9 0 11-6.219-8.56"/></svg>Saving ' + entries.length + ' books...';
+
+    fetch('/save-books', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            books: entries.map(function(entry) {
+                return {lookup_token: entry.book.lookup_token, isbn: entry.isbn};
+            }),
+            skip_duplicates: true
+        })
+    })
+    .then(function(response) {
+        return response.json();
+    })
+    .then(function(result) {
+        if (!result.success) {
+            showResult('Failed to save the stack: ' + result.error, 'error');
+            return;
+        }
+        // Failed books stay savable, with their error, for another try
+        result.results.forEach(function(item) {
+            var entry = entries[item.index];
+            if (item.success) {
+                entry.status = item.duplicate ? 'duplicate' : 'saved';
+                entry.error = null;
+            } else {
+                entry.error = item.error;
+            }
+        });
+
+        var message = 'Added ' + result.saved + ' book' + (result.saved === 1 ? '' : 's') + ' to your Notion library.';
+        if (result.failed) {
+            showResult(message + ' ' + result.failed + ' could not be saved; save again to retry them.', 'error');
+        } else {
+            showResult(message, 'success');
+        }
+    })
+    .catch(function(error) {
+        if (isOfflineError(error)) {
+            return Promise.all(entries.map(queueScanOffline)).then(function() {
+                showResult('You\'re offline. ' + entries.length + ' books will be added to Notion when you\'re back online.', 'success');
+            });
+        }
+        showResult('Network error: ' + error.message, 'error');
+    })
+    .then(renderScanBatch);
+}
+
+function simulateProgress() {
+    var progressBar = document.getElementById('progress-bar');
+    var width = 0;
+    var interval = setInterval(function() {
+        if (width >= 100 || !scannerInitialized) {
+            clearInterval(interval);
+            return;
+        }
+        width += Math.random() * 10;
+        if (width > 100) width = 100;
+        progressBar.style.width = width + '%';
+    }, 200);
+}
+
+function stopScanner() {
+    if (scanTiming) {
+        recordScanTiming();
+    }
+    try {
+        if (typeof Quagga !== 'undefined' && Quagga.stop) {
+            Quagga.stop();
+        }
+    } catch (e) {
+        console.log('Error stopping scanner:', e);
+    }
+
+    scannerInitialized = false;
+    document.getElementById('scanner-container').style.display = 'none';
+    document.getElementById('scanner-overlay').style.display = 'flex';
+    document.getElementById('scanner-progress').style.display = 'none';
+    resetScanButton();
+}
+
+function resetScanButton() {
+    var scanButton = document.getElementById('scan-button');
+    scanButton.disabled = false;
+    scanButton.onclick = startScanning;
+    scanButton.innerHTML = '<svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M14.5 4h-5L7 7H4a2 2 0 0 0-2 2v9a2 2 0 0 0 2 2h16a2 2 0 0 0 2-2V9a2 2 0 0 0-2-2h-3l-2.5-3z"></path><circle cx="12" cy="13" r="3"></circle></svg>Start Scanning';
+    document.getElementById('scanner-status').textContent = 'Position barcode within the frame';
+    document.getElementById('progress-bar').style.width = '0%';
+}
+
+function lookupBook() {
+    var isbn = document.getElementById('isbn-input').value.trim();
+    if (!isbn) {
+        showResult('Please enter an ISBN', 'error');
+        return;
+    }
+
+    if (!isValidISBN(isbn)) {
+        showResult('Invalid ISBN. Please check the 10 or 13 digit number.', 'error');
+        return;
+    }
+
+    lookupBookByISBN(isbn, 'manual');
+}
+
+function lookupBookByISBN(isbn, source) {
+    showResult('Looking up book details...', 'loading');
+    resetAddNotionButton();
+    var startedAt = performance.now();
+
+    fetch('/test-isbn', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({isbn: isbn})
+    })
+    .then(function(response) {
+        Telemetry.record('lookup_ms', performance.now() - startedAt);
+        return response.json();
+    })
+    .then(function(result) {
+        if (result.success) {
+            currentBook = result;
+            displayBook(result);
+
+            if (source === 'scanner') {
+                document.getElementById('add-notion-scanner-button').style.display = 'inline-flex';
+            } else {
+                document.getElementById('add-notion-button').style.display = 'inline-flex';
+            }
+        } else {
+            showBookNotFoundResult(result.error, source);
+        }
+    })
+    .catch(function(error) {
+        if (isOfflineError(error)) {
+            queueOfflineScan({isbn: isbn}, 'You\'re offline. ISBN ' + isbn + ' was saved and will be added to Notion when you\'re back online.');
+            return;
+        }
+        showResult('Network error: ' + error.message, 'error');
+    });
+}
+
+function decodePhoto(input) {
+    // Let the server decode the barcode when live scanning struggles on this device
+    var file = input.files && input.files[0];
+    if (!file) {
+        return;
+    }
+    stopScanner();
+    showResult('Reading barcode from photo...', 'loading');
+    resetAddNotionButton();
+
+    var formData = new FormData();
+    formData.append('image', file);
+
+    fetch('/decode-barcode', {
+        method: 'POST',
+        body: formData
+    })
+    .then(function(response) {
+        return response.json();
+    })
+    .then(function(result) {
+        input.value = '';
+        if (result.barcode) {
+            document.getElementById('isbn-input').value = result.barcode;
+        }
+        if (result.success) {
+            currentBook = result;
+            displayBook(result);
+            document.getElementById('add-notion-scanner-button').style.display = 'inline-flex';
+        } else if (result.barcode) {
+            showBookNotFoundResult(result.error, 'scanner');
+        } else {
+            showResult(result.error + '. Try again closer to the barcode, or enter the ISBN manually.', 'error');
+        }
+    })
+    .catch(function(error) {
+        input.value = '';
+        showResult('Network error: ' + error.message, 'error');
+    });
+}
+
+function showBookNotFoundResult(error, source) {
+    var results = document.getElementById('results');
+    var html = '<div class="result result-error">' +
+        '<strong>Book Not Found</strong>' +
+        '<p>' + error + '</p>' +
+        '<button class="button button-secondary" onclick="showManualBookForm()" style="margin-top: 1rem; width: auto; display: inline-flex;">' +
+        '<svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">' +
+        '<path d="M12 5v14"></path>' +
+        '<path d="M5 12h14"></path>' +
+        '</svg>' +
+        'Add Book Manually' +
+        '</button>' +
+        '</div>';
+
+    results.innerHTML = html;
+}
+
+function addToNotion() {
+    if (!currentBook) {
+        showResult('No book selected', 'error');
+        return;
+    }
+
+    var addButton = document.getElementById('add-notion-button');
+    var scannerAddButton = document.getElementById('add-notion-scanner-button');
+    var activeButton = addButton.style.display !== 'none' ? addButton : scannerAddButton;
+
+    activeButton.disabled = true;
+    activeButton.innerHTML = '<svg class="animate-spin" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M21 12a9 9 0 11-6.219-8.56"/></svg>Adding to Notion...';
+
+    saveCurrentBook()
+    .then(function(result) {
+        if (result.success && result.saved_to_notion) {
+            displayBookWithNotion(result, true);
+            activeButton.innerHTML = '<svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M20 6L9 17l-5-5"></path></svg>Added to Notion!';
+            activeButton.disabled = true;
+        } else {
+            showResult('Failed to add to Notion. Please check your configuration.', 'error');
+            activeButton.disabled = false;
+            activeButton.innerHTML = '<svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M12 5v14"></path><path d="M5 12h14"></path></svg>Add to Notion Library';
+        }
+    })
+    .catch(function(error) {
+        if (isOfflineError(error)) {
+            queueOfflineScan({isbn: currentBook.isbn}, 'You\'re offline. "' + currentBook.title + '" will be added to Notion when you\'re back online.');
+            activeButton.innerHTML = '<svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M20 6L9 17l-5-5"></path></svg>Queued for Notion';
+            return;
+        }
+        showResult('Network error: ' + error.message, 'error');
+        activeButton.disabled = false;
+        activeButton.innerHTML = '<svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M12 5v14"></path><path d="M5 12h14"></path></svg>Add to Notion Library';
+    });
+}
+
+function saveCurrentBook() {
+    // Save via the lookup token; fall back to a fresh lookup-and-save if it has expired
+    var request;
+    if (currentBook.lookup_token) {
+        request = fetch('/save-book', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                lookup_token: currentBook.lookup_token,
+                async: true
+            })
+        })
+        .then(function(response) {
+            return response.json();
+        });
+    } else {
+        request = Promise.resolve({success: false, expired: true});
+    }
+
+    return request.then(function(result) {
+        if (!result.expired) {
+            return result;
+        }
+        return fetch('/test-isbn', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                isbn: currentBook.isbn,
+                save_to_notion: true,
+                async: true
+            })
+        })
+        .then(function(response) {
+            return response.json();
+        });
+    })
+    .then(resolveQueuedSave);
+}
+
+function resolveQueuedSave(result) {
+    // Wait for a queued Notion write to finish and merge its outcome into the result
+    if (!result.queued) {
+        return result;
+    }
+    return waitForJob(result.job_id).then(function(job) {
+        result.saved_to_notion = job.status === 'succeeded';
+        result.success = result.saved_to_notion;
+        result.notion_id = job.notion_id;
+        if (job.error) {
+            result.error = job.error;
+        }
+        return result;
+    });
+}
+
+function waitForJob(jobId) {
+    return new Promise(function(resolve, reject) {
+        var delay = 500;
+
+        function poll() {
+            fetch('/jobs/' + encodeURIComponent(jobId))
+            .then(function(response) {
+                return response.json();
+            })
+            .then(function(result) {
+                if (!result.success) {
+                    reject(new Error(result.error));
+                    return;
+                }
+                if (result.job.status === 'succeeded' || result.job.status === 'failed') {
+                    resolve(result.job);
+                    return;
+                }
+                delay = Math.min(delay * 1.5, 3000);
+                setTimeout(poll, delay);
+            })
+            .catch(reject);
+        }
+
+        setTimeout(poll, delay);
+    });
+}
+
+function readManualBook() {
+    // The manual form as a book payload, or null (with a message) if required fields are missing
+    var title = document.getElementById('manual-title').value.trim();
+    var author = document.getElementById('manual-author').value.trim();
+
+    if (!title || !author) {
+        showResult('Please fill in the required fields (Title and Author)', 'error');
+        return null;
+    }
+
+    return {
+        title: title,
+        author: author,
+        isbn: document.getElementById('manual-isbn').value.trim() || 'Manual Entry',
+        publisher: document.getElementById('manual-publisher').value.trim(),
+        published_date: document.getElementById('manual-published-date').value.trim(),
+        page_count: parseInt(document.getElementById('manual-page-count').value) || null,
+        categories: document.getElementById('manual-categories').value.trim(),
+        description: document.getElementById('manual-description').value.trim(),
+        language: 'en',
+        cover_image: null
+    };
+}
+
+function addManualBookToNotion() {
+    var manualBook = readManualBook();
+    if (!manualBook) {
+        return;
+    }
+
+    var addButton = document.getElementById('manual-add-button');
+    addButton.disabled = true;
+    addButton.innerHTML = '<svg class="animate-spin" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M21 12a9 9 0 11-6.219-8.56"/></svg>Adding to Notion...';
+
+    fetch('/add-manual-book', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(Object.assign({async: true}, manualBook))
+    })
+    .then(function(response) {
+        return response.json();
+    })
+    .then(resolveQueuedSave)
+    .then(function(result) {
+        if (result.success) {
+            showResult('Successfully added "' + manualBook.title + '" to your Notion library!', 'success');
+            addButton.innerHTML = '<svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M20 6L9 17l-5-5"></path></svg>Added to Notion!';
+            addButton.disabled = true;
+        } else {
+            showResult('Failed to add book: ' + result.error, 'error');
+            addButton.disabled = false;
+            addButton.innerHTML = '<svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M12 5v14"></path><path d="M5 12h14"></path></svg>Add Book to Notion';
+        }
+    })
+    .catch(function(error) {
+        if (isOfflineError(error)) {
+            queueOfflineScan({book: manualBook}, 'You\'re offline. "' + manualBook.title + '" will be added to Notion when you\'re back online.');
+            addButton.innerHTML = '<svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M20 6L9 17l-5-5"></path></svg>Queued for Notion';
+            return;
+        }
+        showResult('Network error: ' + error.message, 'error');
+        addButton.disabled = false;
+        addButton.innerHTML = '<svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M12 5v14"></path><path d="M5 12h14"></path></svg>Add Book to Notion';
+    });
+}
+
+function addManualBookToBatch() {
+    // Collect several manual entries and save them with one request
+    var manualBook = readManualBook();
+    if (!manualBook) {
+        return;
+    }
+
+    manualBatch.push({book: manualBook, error: null});
+    clearManualForm();
+    renderManualBatch();
+    showResult('"' + manualBook.title + '" added to the batch. Enter the next book or save them all.', 'success');
+    document.getElementById('manual-title').focus();
+}
+
+function removeFromManualBatch(index) {
+    manualBatch.splice(index, 1);
+    renderManualBatch();
+}
+
+function renderManualBatch() {
+    var container = document.getElementById('manual-batch');
+    var list = document.getElementById('manual-batch-list');
+    var saveButton = document.getElementById('manual-batch-save-button');
+
+    list.innerHTML = '';
+    manualBatch.forEach(function(entry, index) {
+        var row = document.createElement('div');
+        row.className = 'manual-batch-item';
+
+        var label = document.createElement('span');
+        label.textContent = entry.book.title + ' by ' + entry.book.author;
+        if (entry.error) {
+            label.className = 'manual-batch-item-error';
+            label.textContent += ' (' + entry.error + ')';
+        }
+
+        var remove = document.createElement('button');
+        remove.type = 'button';
+        remove.title = 'Remove from batch';
+        remove.textContent = '\u00d7';
+        remove.onclick = function() {
+            removeFromManualBatch(index);
+        };
+
+        row.appendChild(label);
+        row.appendChild(remove);
+        list.appendChild(row);
+    });
+
+    container.style.display = manualBatch.length ? 'block' : 'none';
+    saveButton.disabled = false;
+    saveButton.innerHTML = '<svg width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M12 5v14"></path><path d="M5 12h14"></path></svg>' +
+        'Save ' + manualBatch.length + ' Book' + (manualBatch.length === 1 ? '' : 's') + ' to Notion';
+}
+
+function saveManualBatch() {
+    if (!manualBatch.length) {
+        return;
+    }
+
+    var saveButton = document.getElementById('manual-batch-save-button');
+    saveButton.disabled = true;
+    saveButton.innerHTML = '<svg class="animate-spin" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><path d="M21 12a9 9 0 11-6.219-8.56"/></svg>Saving ' + manualBatch.length + ' books...';
+
+    var entries = manualBatch.slice();
+    fetch('/add-manual-books', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            books: entries.map(function(entry) {
+                return entry.book;
+            })
+        })
+    })
+    .then(function(response) {
+        return response.json();
+    })
+    .then(function(result) {
+        if (!result.success) {
+            showResult('Failed to save the batch: ' + result.error, 'error');
+            renderManualBatch();
+            return;
+        }
+        // Keep only the books that failed, with their errors, so they can be fixed and retried
+        manualBatch = [];
+        result.results.forEach(function(item) {
+            if (!item.success) {
+                manualBatch.push({book: entries[item.index].book, error: item.error});
+            }
+        });
+        renderManualBatch();
+
+        var message = 'Added ' + result.saved + ' book' + (result.saved === 1 ? '' : 's') + ' to your Notion library.';
+        if (result.failed) {
+            showResult(message + ' ' + result.failed + ' could not be saved; they are still listed below.', 'error');
+        } else {
+            showResult(message, 'success');
+        }
+    })
+    .catch(function(error) {
+        if (isOfflineError(error)) {
+            Promise.all(entries.map(function(entry) {
+                return ScanQueue.add({book: entry.book});
+            })).then(function() {
+                manualBatch = [];
+                renderManualBatch();
+                showResult('You\'re offline. ' + entries.length + ' books will be added to Notion when you\'re back online.', 'success');
+                updateSyncStatus();
+                requestBackgroundSync();
+            });
+            return;
+        }
+        showResult('Network error: ' + error.message, 'error');
+        renderManualBatch();
+    });
+}
+
+function isOfflineError(error) {
+    // fetch() rejects with a TypeError when the request never reached the server
+    return typeof ScanQueue !== 'undefined' && (!navigator.onLine || error instanceof TypeError);
+}
+
+function queueOfflineScan(item, message) {
+    ScanQueue.add(item)
+    .then(function() {
+        showResult(message, 'success');
+        updateSyncStatus();
+        requestBackgroundSync();
+    })
+    .catch(function(error) {
+        showResult('Could not save the scan offline: ' + error.message, 'error');
+    });
+}
+
+function requestBackgroundSync() {
+    // Let the service worker upload the queue once connectivity returns, even if this tab is closed
+    if (!('serviceWorker' in navigator)) {
+        return;
+    }
+    navigator.serviceWorker.ready.then(function(registration) {
+        if (registration.sync) {
+            return registration.sync.register('sync-scans');
+        }
+    }).catch(function() {});
+}
+
+function syncQueuedScans() {
+    if (typeof ScanQueue === 'undefined' || !navigator.onLine) {
+        return;
+    }
+    ScanQueue.flush().then(showSyncSummary);
+}
+
+function showSyncSummary(summary) {
+    var message = '';
+    if (summary.synced) {
+        message += summary.synced + ' offline scan' + (summary.synced === 1 ? '' : 's') + ' added to Notion. ';
+    }
+    summary.failed.forEach(function(item) {
+        message += 'Could not add ' + (item.title || item.isbn || 'a book') + ': ' + item.error + '. ';
+    });
+    updateSyncStatus(message);
+}
+
+function updateSyncStatus(message) {
+    if (typeof ScanQueue === 'undefined') {
+        return;
+    }
+    ScanQueue.count().then(function(queued) {
+        var status = document.getElementById('sync-status');
+        var text = message || '';
+        if (queued) {
+            text += queued + ' scan' + (queued === 1 ? '' : 's') + ' waiting to sync' + (navigator.onLine ? '...' : ' when you\'re back online.');
+        }
+        status.textContent = text;
+        status.style.display = text ? 'block' : 'none';
+    }).catch(function() {});
+}
+
+function registerServiceWorker() {
+    if (!('serviceWorker' in navigator)) {
+        return;
+    }
+    var queueScript = document.getElementById('scan-queue-script');
+    var url = '/sw.js' + (queueScript ? '?queue=' + encodeURIComponent(new URL(queueScript.src).pathname) : '');
+    navigator.serviceWorker.register(url).catch(function(error) {
+        console.warn('Service worker registration failed:', error);
+    });
+    navigator.serviceWorker.addEventListener('message', function(event) {
+        if (event.data && event.data.type === 'scan-queue-synced') {
+            showSyncSummary(event.data.summary);
+        }
+    });
+}
+
+function isValidISBN(isbn) {
+    // Mirrors the server's checks so bad scans and typos never leave the device
+    var cleaned = isbn.replace(/[-\s]/g, '').toUpperCase();
+    var total = 0;
+    var i;
+
+    if (/^\d{9}[\dX]$/.test(cleaned)) {
+        for (i = 0; i < 10; i++) {
+            total += (10 - i) * (cleaned[i] === 'X' ? 10 : parseInt(cleaned[i], 10));
+        }
+        return total % 11 === 0;
+    }
+
+    if (/^97[89]\d{10}$/.test(cleaned)) {
+        for (i = 0; i < 13; i++) {
+            total += parseInt(cleaned[i], 10) * (i % 2 ? 3 : 1);
+        }
+        return total % 10 === 0;
+    }
+
+    return false;
+}
+
+function showResult(message, type) {
+    var results = document.getElementById('results');
+    var className = 'result result-' + type;
+    results.innerHTML = '<div class="' + className + '">' + message + '</div>';
+}
+
+function displayBook(book) {
+    var results = document.getElementById('results');
+    var coverImg = book.cover_image ? 
+        '<img src="' + book.cover_image + '" alt="Cover" class="book-cover">' : 
+        '<div class="book-cover-placeholder">No Cover</div>';
+
+    var html = '<div class="result result-success">' +
+        '<strong>Book Found!</strong>' +
+        '<div class="book-preview">' +
+        coverImg +
+        '<div class="book-info">' +
+        '<h3>' + book.title + '</h3>' +
+        '<p><strong>Author:</strong> ' + book.author + '</p>' +
+        '<p><strong>ISBN:</strong> ' + book.isbn + '</p>';
+
+    if (book.publisher) {
+        html += '<p><strong>Publisher:</strong> ' + book.publisher + '</p>';
+    }
+    if (book.published_date) {
+        html += '<p><strong>Published:</strong> ' + book.published_date + '</p>';
+    }
+    if (book.page_count) {
+        html += '<p><strong>Pages:</strong> ' + book.page_count + '</p>';
+    }
+
+    html += '</div></div>';
+
+    if (book.duplicate) {
+        html += '<p style="margin-top: 1rem; color: var(--destructive); font-size: 0.875rem;">This book is already in your Notion library. Adding it again will create a duplicate.</p>';
+    }
+
+    html += '</div>';
+
+    results.innerHTML = html;
+}
+
+function displayBookWithNotion(book, saved) {
+    var results = document.getElementById('results');
+    var coverImg = book.cover_image ? 
+        '<img src="' + book.cover_image + '" alt="Cover" class="book-cover">' : 
+        '<div class="book-cover-placeholder">No Cover</div>';
+
+    var message = saved ? 'Successfully added to your Notion library!' : 'Failed to save to Notion';
+    var statusClass = saved ? 'success' : 'error';
+
+    var html = '<div class="result result-' + statusClass + '">' +
+        '<strong>' + message + '</strong>' +
+        '<div class="book-preview">' +
+        coverImg +
+        '<div class="book-info">' +
+        '<h3>' + book.title + '</h3>' +
+        '<p><strong>Author:</strong> ' + book.author + '</p>';
+
+    if (book.publisher) {
+        html += '<p><strong>Publisher:</strong> ' + book.publisher + '</p>';
+    }
+
+    html += '</div></div>';
+
+    if (saved) {
+        html += '<p style="margin-top: 1rem; text-align: center; color: var(--muted-foreground); font-size: 0.875rem;">Check your Notion database to see the book!</p>';
+    }
+
+    html += '</div>';
+
+    results.innerHTML = html;
+}
+
+// Enhanced ISBN input handling
+document.addEventListener('DOMContentLoaded', function() {
+    var isbnInput = document.getElementById('isbn-input');
+
+    isbnInput.addEventListener('input', function() {
+        resetAddNotionButton();
+        currentBook = null;
+        document.getElementById('results').innerHTML = '';
+    });
+
+    isbnInput.addEventListener('input', function(e) {
+        var value = e.target.value.replace(/[^0-9Xx]/g, '').toUpperCase();
+        if (value.length <= 13) {
+            e.target.value = value;
+        }
+    });
+
+    registerServiceWorker();
+    updateSyncStatus();
+    syncQueuedScans();
+});
+
+window.addEventListener('online', syncQueuedScans);
+window.addEventListener('offline', function() {
+    updateSyncStatus();
+});
+
+window.addEventListener('beforeunload', function() {
+    stopScanner();
+});
+
+document.addEventListener('visibilitychange', function() {
+    if (document.hidden) {
+        stopScanner();
+    }
+});
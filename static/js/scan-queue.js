@@ -0,0 +1,158 @@
+// Offline scan queue in IndexedDB, shared by the page and the service worker
+var ScanQueue = (function() {
+    var DB_NAME = 'book-scanner';
+    var STORE = 'scan-queue';
+    var BATCH_SIZE = 10;
+    var dbPromise = null;
+    var flushing = null;
+
+    function openDb() {
+        if (!dbPromise) {
+            dbPromise = new Promise(function(resolve, reject) {
+                var request = indexedDB.open(DB_NAME, 1);
+                request.onupgradeneeded = function() {
+                    request.result.createObjectStore(STORE, {keyPath: 'id'});
+                };
+                request.onsuccess = function() {
+                    resolve(request.result);
+                };
+                request.onerror = function() {
+                    dbPromise = null;
+                    reject(request.error);
+                };
+            });
+        }
+        return dbPromise;
+    }
+
+    function withStore(mode, action) {
+        return openDb().then(function(db) {
+            return new Promise(function(resolve, reject) {
+                var transaction = db.transaction(STORE, mode);
+                var request = action(transaction.objectStore(STORE));
+                transaction.oncomplete = function() {
+                    resolve(request ? request.result : undefined);
+                };
+                transaction.onerror = function() {
+                    reject(transaction.error);
+                };
+                transaction.onabort = function() {
+                    reject(transaction.error);
+                };
+            });
+        });
+    }
+
+    function add(item) {
+        // item is {isbn: '...'} or {book: {...manual entry...}}
+        item.id = Date.now().toString(36) + '-' + Math.random().toString(36).slice(2, 8);
+        item.queued_at = new Date().toISOString();
+        return withStore('readwrite', function(store) {
+            return store.put(item);
+        }).then(function() {
+            return item;
+        });
+    }
+
+    function all() {
+        return withStore('readonly', function(store) {
+            return store.getAll();
+        });
+    }
+
+    function count() {
+        return withStore('readonly', function(store) {
+            return store.count();
+        });
+    }
+
+    function remove(ids) {
+        return withStore('readwrite', function(store) {
+            ids.forEach(function(id) {
+                store.delete(id);
+            });
+        });
+    }
+
+    function postBatch(items) {
+        return fetch('/sync', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                items: items.map(function(item) {
+                    return {id: item.id, isbn: item.isbn, book: item.book};
+                })
+            })
+        })
+        .then(function(response) {
+            return response.json();
+        });
+    }
+
+    function flushBatches(items, summary) {
+        if (!items.length) {
+            return Promise.resolve(summary);
+        }
+        var batch = items.slice(0, BATCH_SIZE);
+        return postBatch(batch).then(function(result) {
+            if (!result.success) {
+                throw new Error(result.error);
+            }
+            // Drop items that were saved or can never succeed; keep the rest for the next sync
+            var done = [];
+            result.results.forEach(function(item) {
+                if (!item.error) {
+                    done.push(item.id);
+                    summary.synced += 1;
+                } else if (!item.retryable) {
+                    done.push(item.id);
+                    summary.failed.push({isbn: item.isbn, title: item.title, error: item.error});
+                }
+            });
+            return remove(done);
+        }).then(function() {
+            return flushBatches(items.slice(BATCH_SIZE), summary);
+        });
+    }
+
+    function flushNow() {
+        var summary = {synced: 0, failed: []};
+        return all()
+            .then(function(items) {
+                return flushBatches(items, summary);
+            })
+            .catch(function(error) {
+                summary.error = error.message;
+            })
+            .then(function() {
+                return count();
+            })
+            .then(function(remaining) {
+                summary.remaining = remaining;
+                return summary;
+            });
+    }
+
+    function flush() {
+        // Upload queued scans in batches; the page and the service worker never flush at once
+        if (self.navigator && navigator.locks) {
+            return navigator.locks.request('scan-queue-flush', flushNow);
+        }
+        if (!flushing) {
+            flushing = flushNow().then(function(summary) {
+                flushing = null;
+                return summary;
+            });
+        }
+        return flushing;
+    }
+
+    return {
+        add: add,
+        all: all,
+        count: count,
+        flush: flush
+    };
+})();
@@ -0,0 +1,86 @@
+// Scanner timings collected in the field and sent to /telemetry in batches
+var Telemetry = (function() {
+    var ENDPOINT = '/telemetry';
+    var BATCH_SIZE = 20;
+    var FLUSH_INTERVAL_MS = 60000;
+    var events = [];
+    var timer = null;
+    var disabled = false;
+
+    function device() {
+        return {
+            cores: navigator.hardwareConcurrency || null,
+            memory: navigator.deviceMemory || null
+        };
+    }
+
+    function record(metric, value) {
+        if (disabled || typeof value !== 'number' || !isFinite(value) || value < 0) {
+            return;
+        }
+        events.push({metric: metric, value: Math.round(value * 10) / 10});
+        if (events.length >= BATCH_SIZE) {
+            flush();
+        } else if (!timer) {
+            timer = setTimeout(flush, FLUSH_INTERVAL_MS);
+        }
+    }
+
+    function flush(closing) {
+        clearTimeout(timer);
+        timer = null;
+        if (!events.length || disabled) {
+            return;
+        }
+        var body = JSON.stringify({events: events.splice(0, BATCH_SIZE), device: device()});
+
+        // A beacon still gets out while the page is being hidden or closed
+        if (closing && navigator.sendBeacon && navigator.sendBeacon(ENDPOINT, body)) {
+            return;
+        }
+        fetch(ENDPOINT, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: body,
+            keepalive: true
+        })
+        .then(function(response) {
+            return response.json();
+        })
+        .then(function(result) {
+            if (!result.success && result.error === 'Telemetry is disabled') {
+                disabled = true;
+                events = [];
+            }
+        })
+        .catch(function() {
+            // Timings are best effort; a lost batch is not worth retrying
+        });
+        if (events.length && !timer) {
+            timer = setTimeout(flush, FLUSH_INTERVAL_MS);
+        }
+    }
+
+    function flushAll() {
+        while (events.length && !disabled) {
+            flush(true);
+        }
+    }
+
+    // Registered after the page's own handlers, so the timings of a scan stopped on hide go out too
+    document.addEventListener('DOMContentLoaded', function() {
+        document.addEventListener('visibilitychange', function() {
+            if (document.hidden) {
+                flushAll();
+            }
+        });
+        window.addEventListener('pagehide', flushAll);
+    });
+
+    return {
+        record: record,
+        flush: flush
+    };
+})();
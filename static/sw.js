@@ -0,0 +1,123 @@
+// Service worker: keeps the app shell available offline and uploads queued scans when back online
+var SHELL_CACHE = 'book-scanner-shell';
+var SYNC_TAG = 'sync-scans';
+// Quagga is loaded from here when it isn't vendored; the URL is versioned, so it's cached like a hashed asset
+var CDN_PREFIX = 'https://cdnjs.cloudflare.com/ajax/libs/';
+
+// The page passes the hashed scan queue script URL, so a deploy that changes it updates this worker
+var queueScript = new URL(self.location).searchParams.get('queue');
+if (queueScript) {
+    importScripts(queueScript);
+}
+
+function assetUrls(html) {
+    var urls = (html.match(/\/assets\/[^"'\s]+/g) || [])
+        .concat(html.match(/https:\/\/cdnjs\.cloudflare\.com\/ajax\/libs\/[^"'\s]+/g) || []);
+    return urls.filter(function(url, index, urls) {
+        return urls.indexOf(url) === index;
+    });
+}
+
+function cachePage(response) {
+    // Store the page and the assets it references, dropping assets from older deploys
+    return response.clone().text().then(function(html) {
+        var assets = assetUrls(html);
+        return caches.open(SHELL_CACHE).then(function(cache) {
+            return cache.put('/', response)
+                .then(function() {
+                    return Promise.all(assets.map(function(url) {
+                        return cache.match(url).then(function(cached) {
+                            return cached || cache.add(url);
+                        });
+                    }));
+                })
+                .then(function() {
+                    return cache.keys();
+                })
+                .then(function(requests) {
+                    return Promise.all(requests.map(function(request) {
+                        var url = new URL(request.url);
+                        var key = url.origin === self.location.origin ? url.pathname : url.href;
+                        if (key !== '/' && assets.indexOf(key) === -1) {
+                            return cache.delete(request);
+                        }
+                    }));
+                });
+        });
+    });
+}
+
+self.addEventListener('install', function(event) {
+    event.waitUntil(
+        fetch('/', {cache: 'no-cache'})
+            .then(cachePage)
+            .then(function() {
+                return self.skipWaiting();
+            })
+    );
+});
+
+self.addEventListener('activate', function(event) {
+    event.waitUntil(self.clients.claim());
+});
+
+self.addEventListener('fetch', function(event) {
+    var request = event.request;
+    var url = new URL(request.url);
+    var sameOrigin = url.origin === self.location.origin;
+    if (request.method !== 'GET' || (!sameOrigin && url.href.indexOf(CDN_PREFIX) !== 0)) {
+        return;
+    }
+
+    if (sameOrigin && (request.mode === 'navigate' || url.pathname === '/')) {
+        // Network first so deploys show up immediately; the cached page when offline
+        event.respondWith(
+            fetch(request)
+                .then(function(response) {
+                    if (response.ok) {
+                        event.waitUntil(cachePage(response.clone()));
+                    }
+                    return response;
+                })
+                .catch(function() {
+                    return caches.match('/');
+                })
+        );
+    } else if (!sameOrigin || url.pathname.indexOf('/assets/') === 0) {
+        // Hashed assets and versioned CDN scripts never change, so the cached copy is always right
+        event.respondWith(
+            caches.match(request).then(function(cached) {
+                return cached || fetch(request).then(function(response) {
+                    if (response.ok) {
+                        var copy = response.clone();
+                        event.waitUntil(caches.open(SHELL_CACHE).then(function(cache) {
+                            return cache.put(request, copy);
+                        }));
+                    }
+                    return response;
+                });
+            })
+        );
+    }
+});
+
+function notifyClients(summary) {
+    return self.clients.matchAll().then(function(clients) {
+        clients.forEach(function(client) {
+            client.postMessage({type: 'scan-queue-synced', summary: summary});
+        });
+    });
+}
+
+self.addEventListener('sync', function(event) {
+    if (event.tag === SYNC_TAG && typeof ScanQueue !== 'undefined') {
+        event.waitUntil(ScanQueue.flush().then(function(summary) {
+            return notifyClients(summary).then(function() {
+                if (summary.error) {
+                    // Rejecting makes the browser retry the sync later
+                    throw new Error(summary.error);
+                }
+            });
+        }));
+    }
+});
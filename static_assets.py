@@ -0,0 +1,114 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Files smaller than this aren't worth compressing
+MIN_COMPRESS_SIZE = 512
+
+
+class CompressedBody:
+    """A response body with precomputed gzip/brotli variants and ETags"""
+
+    def __init__(self, content, mimetype, digest=None):
+        self.mimetype = mimetype
+        self.digest = digest or hashlib.sha256(content).hexdigest()[:16]
+        self.variants = {'identity': content}
+        if len(content) >= MIN_COMPRESS_SIZE:
+            self.variants['gzip'] = gzip.compress(content, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.variants['br'] = brotli.compress(content, quality=11)
+
+    def etag(self, encoding):
+        return f'"{self.digest}-{encoding}"' if encoding != 'identity' else f'"{self.digest}"'
+
+    def choose_encoding(self, accept_encoding):
+        accepted = [part.split(';')[0].strip().lower() for part in (accept_encoding or '').split(',')]
+        for encoding in ['br', 'gzip']:
+            if encoding in self.variants and encoding in accepted:
+                return encoding
+        return 'identity'
+
+    def response(self, request, cache_control):
+        """Build a response for this body, honouring Accept-Encoding and If-None-Match"""
+        encoding = self.choose_encoding(request.headers.get('Accept-Encoding'))
+        etag = self.etag(encoding)
+
+        if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+            response = Response(status=304)
+        else:
+            response = Response(self.variants[encoding], content_type=self.mimetype)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+
+        response.headers['ETag'] = etag
+        response.headers['Cache-Control'] = cache_control
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
+
+
+class StaticAssets:
+    """Content-hashed, precompressed static files loaded once at startup
+
+    ``css/app.css`` is served as ``/assets/css/app.<hash>.css`` so it can be
+    cached forever; a changed file gets a new URL.
+    """
+
+    def __init__(self, root, url_prefix='/assets'):
+        self.root = root
+        self.url_prefix = url_prefix.rstrip('/')
+        self._urls = {}
+        self._hashed_names = {}
+        self._files = {}
+        self.load()
+
+    def load(self):
+        for directory, _, filenames in os.walk(self.root):
+            for filename in sorted(filenames):
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, self.root).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    content = f.read()
+
+                mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                if mimetype.startswith('text/') or mimetype.endswith('javascript'):
+                    mimetype += '; charset=utf-8'
+                body = CompressedBody(content, mimetype)
+
+                base, ext = os.path.splitext(name)
+                hashed_name = f"{base}.{body.digest[:10]}{ext}"
+                self._urls[name] = f"{self.url_prefix}/{hashed_name}"
+                self._hashed_names[name] = hashed_name
+                self._files[hashed_name] = body
+        logger.info(f"Loaded {len(self._files)} static assets from {self.root}")
+
+    def has(self, name):
+        return name in self._urls
+
+    def url(self, name):
+        """Content-hashed URL for a static file"""
+        return self._urls[name]
+
+    def serve(self, request, hashed_name):
+        """Response for a hashed asset name, or None if unknown"""
+        body = self._files.get(hashed_name)
+        if body is None:
+            return None
+        return body.response(request, 'public, max-age=31536000, immutable')
+
+    def serve_unhashed(self, request, name, cache_control='no-cache'):
+        """Response for a file under its original name, for URLs that must stay fixed (e.g. a service worker)"""
+        hashed_name = self._hashed_names.get(name)
+        if hashed_name is None:
+            return None
+        return self._files[hashed_name].response(request, cache_control)
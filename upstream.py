@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from circuit_breaker import is_failure
+
+logger = logging.getLogger(__name__)
+
+NOTION_VERSION = '2022-06-28'
+
+
+def upstream_breaker(breakers, name, url, per_host):
+    """Circuit breaker for a call: the upstream's, or name:host's for multi-host upstreams (None without breakers)"""
+    if not breakers:
+        return None
+    if per_host:
+        return breakers.get(f"{name}:{urlsplit(url).hostname}", shared=name)
+    return breakers.get(name)
+
+
+class ObservedAdapter(HTTPAdapter):
+    """HTTPAdapter that reports each call's duration and status, and guards it with a circuit breaker
+
+    The observer is called as ``observer(name, seconds, status)``, with
+    status ``'error'`` when no response was received. With ``breakers``,
+    calls to an upstream whose breaker is open raise CircuitOpenError
+    without touching the network; ``per_host`` keeps a breaker per host.
+    """
+
+    def __init__(self, name, observer=None, breakers=None, per_host=False, **kwargs):
+        self.name = name
+        self.observer = observer
+        self.breakers = breakers
+        self.per_host = per_host
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        breaker = upstream_breaker(self.breakers, self.name, request.url, self.per_host)
+        if breaker is not None:
+            breaker.before_call()
+
+        started = time.monotonic()
+        status = 'error'
+        try:
+            response = super().send(request, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            if breaker is not None:
+                if status == 'error' or is_failure(status):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            if self.observer is not None:
+                try:
+                    self.observer(self.name, time.monotonic() - started, status)
+                except Exception as e:
+                    logger.warning(f"Upstream observer failed: {e}")
+
+
+def create_session(pool_size, pool_hosts=1, headers=None, name=None, observer=None, breakers=None, per_host=False):
+    """Create a requests Session with a keep-alive connection pool
+
+    ``pool_hosts`` is the number of distinct hosts whose pools are kept, and
+    ``pool_size`` the number of connections kept open per host. With an
+    ``observer``, every call is reported under ``name``; with ``breakers``
+    (a CircuitBreakers), calls go through the upstream's circuit breaker.
+    """
+    session = requests.Session()
+    if observer is not None or breakers is not None:
+        adapter = ObservedAdapter(name, observer, breakers, per_host,
+                                  pool_connections=pool_hosts, pool_maxsize=pool_size)
+    else:
+        adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+class UpstreamClients:
+    """Shared pooled HTTP sessions for Google Books, Open Library, Notion and cover image hosts"""
+
+    def __init__(self, google_books_url, notion_url, notion_token='', pool_size=8,
+                 image_pool_hosts=10, open_library_url='https://openlibrary.org', observer=None, breakers=None):
+        self.google_books_url = google_books_url.rstrip('/')
+        self.open_library_url = open_library_url.rstrip('/')
+        self.notion_url = notion_url.rstrip('/')
+        self.pool_size = pool_size
+
+        self.google_books = create_session(pool_size, name='google_books', observer=observer, breakers=breakers)
+        self.open_library = create_session(pool_size, name='open_library', observer=observer, breakers=breakers)
+        self.notion = create_session(pool_size, headers={
+            'Authorization': f'Bearer {notion_token}',
+            'Content-Type': 'application/json',
+            'Notion-Version': NOTION_VERSION
+        }, name='notion', observer=observer, breakers=breakers)
+        # Cover images come from several hosts (books.google.com, covers.openlibrary.org, ...), each with its own breaker
+        self.images = create_session(pool_size, pool_hosts=image_pool_hosts, name='images', observer=observer,
+                                     breakers=breakers, per_host=True)
+
+    def warm_up(self, connections=1, timeout=5):
+        """Open connections to each upstream in the background so first requests skip TLS setup"""
+        targets = [
+            (self.google_books, self.google_books_url),
+            (self.open_library, self.open_library_url),
+            (self.notion, self.notion_url),
+            (self.images, 'https://books.google.com/')
+        ]
+
+        def warm(session, url):
+            try:
+                session.head(url, timeout=timeout)
+            except requests.RequestException as e:
+                logger.warning(f"Connection warm-up to {url} failed: {e}")
+
+        threads = []
+        for session, url in targets:
+            for _ in range(connections):
+                thread = threading.Thread(target=warm, args=(session, url), daemon=True)
+                thread.start()
+                threads.append(thread)
+        logger.info(f"Warming up {len(threads)} upstream connections")
+        return threads